@@ -0,0 +1,280 @@
+#! /usr/bin/python3
+
+# benchmarks for the stcalc engines
+#
+#   python3 bench.py                 run all of them
+#   python3 bench.py prefixtable     run the named ones
+
+import asyncio
+import ipaddress
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+
+import stcalc
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print ('  {:<40} {:9.3f} s'.format(label, time.perf_counter()-start))
+    return result
+
+def randomPrefixes(count, bits=32):
+    prefixes = []
+    for x in range(count):
+        prefixlen = random.randint(8, bits) if bits == 32 else random.randint(16, 64)
+        prefixes.append((random.getrandbits(prefixlen) << (bits-prefixlen), prefixlen, bits))
+    return prefixes
+
+# text parsing vs opening the mmap'd binary table
+def benchPrefixTable(count=1000000):
+    print ('prefix table, {} prefixes'.format(count))
+    prefixes = randomPrefixes(count)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        textPath = os.path.join(tmp, 'table.txt')
+        binPath = os.path.join(tmp, 'table.stp')
+        with open(textPath, 'w') as f:
+            for prefix in prefixes:
+                f.write(stcalc.formatNetwork(*prefix) + '\n')
+        timed('write binary', stcalc.writePrefixTable, binPath, prefixes)
+        print ('  text {:.1f} MB, binary {:.1f} MB'.format(os.path.getsize(textPath)/1e6, os.path.getsize(binPath)/1e6))
+
+        with open(textPath) as f:
+            timed('parse text', stcalc.parsePrefixList, f)
+
+        table = timed('open binary (mmap)', stcalc.PrefixFile, binPath)
+        addrs = [random.getrandbits(32) for x in range(10000)]
+        timed('10000 longest-prefix lookups', lambda: [table.longestMatch(a) for a in addrs])
+        table.close()
+
+# address extraction from a synthetic firewall log
+def benchExtract(lines=500000):
+    print ('log extraction, {} lines'.format(lines))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'fw.log')
+        with open(path, 'w') as f:
+            for x in range(lines):
+                f.write('Oct 11 12:34:56 fw kernel: IN=eth0 SRC={} DST={} MAC=00:11:22:33:44:55 SRC6={} LEN=60\n'.format(
+                    stcalc.formatAddr(random.getrandbits(32)), stcalc.formatAddr(random.getrandbits(32)),
+                    stcalc.formatAddr(random.getrandbits(128), 128)))
+        size = os.path.getsize(path) / 1e6
+
+        for processes in sorted({1, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            v4, v6 = stcalc.extractFile(path, processes, chunkSize=8 << 20)
+            elapsed = time.perf_counter() - start
+            print ('  {} process(es): {} IPv4, {} IPv6, {:.1f} MB/s'.format(processes, len(v4), len(v6), size/elapsed))
+
+# per-subnet usage counts from a big observed host list
+def benchUtilization(count=2000000, subnets=4096):
+    print ('utilization, {} addresses over {} subnets'.format(count, subnets))
+    start, prefixlen, bits = stcalc.parseNetwork('10.0.0.0/8')
+    addrs = stcalc.intArray(32, (start + random.getrandbits(24) for x in range(count)))
+    hosts = timed('build set from addresses', stcalc.AddressSet.fromAddresses, addrs)
+    newprefix = prefixlen + subnets.bit_length() - 1
+    counts = timed('count per subnet', hosts.blockCounts, start, newprefix, subnets)
+    print ('  {} distinct addresses, busiest subnet {}'.format(hosts.size(), max(counts)))
+
+# bounded-memory heavy hitter summaries over a skewed address stream
+def benchHeavyHitters(count=1000000, capacity=1000):
+    print ('heavy hitters, {} addresses, capacity {}'.format(count, capacity))
+    hot = [random.getrandbits(32) for x in range(100)]
+    addrs = stcalc.intArray(32, (random.choice(hot) if random.random() < 0.3 else random.getrandbits(32) for x in range(count)))
+    hitters = stcalc.HeavyHitters(32, capacity)
+    timed('summarize in 100k batches', lambda: [hitters.add(addrs[x:x+100000]) for x in range(0, count, 100000)])
+    print ('  worst /32 error {}, top /32 count {}'.format(hitters.error(32), hitters.top(32, 1)[0][1]))
+
+# geometry for a full-resolution Hilbert map of the IPv4 space
+def benchHilbert(size=4096, hosts=200000, allocations=2000):
+    print ('hilbert map {0}x{0}, {1} hosts, {2} allocations'.format(size, hosts, allocations))
+    hmap = stcalc.HilbertMap('0.0.0.0/0', size)
+    allocated = stcalc.AddressSet.fromPrefixes(randomPrefixes(allocations))
+    observed = stcalc.AddressSet.fromAddresses(random.getrandbits(32) for x in range(hosts))
+    rects = timed('allocation rectangles', lambda: [hmap.rects(first, last) for first, last in allocated.intervals()])
+    full, cells = timed('host density', hmap.density, observed)
+    print ('  {} rectangles, {} partly used pixels'.format(sum(map(len, rects)) + len(full), len(cells)))
+
+# customer /56 delegations out of a /32
+def benchDelegation(count=4000000):
+    print ('prefix delegation, {} customers'.format(count))
+    pool = stcalc.DelegationPool('2001:db8::/32', 56)
+    timed('bulk allocate', pool.allocateMany, ['cust{}'.format(x) for x in range(count)])
+    timed('100k single allocations', lambda: [pool.allocate('single{}'.format(x)) for x in range(100000)])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'pool.stp')
+        timed('save', pool.save, path)
+        print ('  {:.1f} MB on disk'.format(os.path.getsize(path)/1e6))
+        timed('load', stcalc.DelegationPool.load, path)
+
+# bulk EUI-64 conversion, packed and through files
+def benchEUI64(count=2000000):
+    print ('EUI-64, {} MACs'.format(count))
+    macs = array('Q', (random.getrandbits(48) for x in range(count)))
+    iids = timed('MACs to interface IDs', stcalc.interfaceIDs, macs)
+    timed('interface IDs to MACs', stcalc.interfaceMACs, iids)
+    with tempfile.TemporaryDirectory() as tmp:
+        macPath = os.path.join(tmp, 'macs.txt')
+        with open(macPath, 'w') as f:
+            f.writelines(stcalc.formatMAC(mac) + '\n' for mac in macs)
+        timed('MAC file to SLAAC file', stcalc.slaacFile, macPath, os.path.join(tmp, 'slaac.csv'), stcalc.parseIPv6('2001:db8::'))
+
+# IPv4 addresses into and out of NAT64 prefixes
+def benchEmbedding(count=2000000):
+    print ('IPv4 embedding, {} addresses'.format(count))
+    v4s = array('I', (random.getrandbits(32) for x in range(count)))
+    prefix = stcalc.parseIPv6('2001:db8:100::')
+    for prefixlen in (96, 40):
+        v6s = timed('embed in a /{} NAT64 prefix'.format(prefixlen), stcalc.embedIPv4Many, v4s, 'nat64', prefix, prefixlen)
+        timed('extract from a /{} NAT64 prefix'.format(prefixlen), stcalc.extractIPv4Many, v6s, 'nat64', prefixlen)
+    with tempfile.TemporaryDirectory() as tmp:
+        v4Path = os.path.join(tmp, 'v4.txt')
+        with open(v4Path, 'w') as f:
+            f.writelines(stcalc.formatAddr(v4) + '\n' for v4 in v4s)
+        timed('IPv4 file to NAT64 file', stcalc.embedFile, v4Path, os.path.join(tmp, 'nat64.csv'))
+
+# IPv6 text handling against the ipaddress module
+def benchIPv6Text(count=500000):
+    print ('IPv6 text, {} addresses'.format(count))
+    values = [random.getrandbits(64) << 64 | random.getrandbits(random.choice((8, 16, 64))) for x in range(count)]
+    texts = timed('format with ipaddress', lambda: [str(ipaddress.IPv6Address(value)) for value in values])
+    timed('formatIPv6Many', stcalc.formatIPv6Many, values)
+    timed('parse with ipaddress', lambda: [int(ipaddress.IPv6Address(text)) for text in texts])
+    timed('parseIPv6Many', stcalc.parseIPv6Many, texts)
+    exploded = timed('explodeIPv6Many', stcalc.explodeIPv6Many, values)
+    timed('parseIPv6Many, exploded', stcalc.parseIPv6Many, exploded)
+
+# a million-row split held as ipaddress objects vs compact columns
+def benchSubnetTable(network='10.0.0.0/12', newprefix=32):
+    prefixlen = stcalc.parseNetwork(network)[1]
+    print ('subnet table, {} rows'.format(1 << (newprefix-prefixlen)))
+    tracemalloc.start()
+    subnets = timed('ipaddress subnets + text', lambda: [(net, str(net.network_address)) for net in ipaddress.ip_network(network).subnets(new_prefix=newprefix)])
+    print ('  {:.1f} MB'.format(tracemalloc.get_traced_memory()[0]/1e6))
+    del subnets
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    table = timed('SubnetTable.split', stcalc.SubnetTable.split, network, newprefix)
+    print ('  {:.1f} MB ({:.1f} MB of columns)'.format((tracemalloc.get_traced_memory()[0]-base)/1e6, table.nbytes()/1e6))
+    tracemalloc.stop()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'subnets.csv')
+        timed('write CSV', table.writeCSV, path)
+        print ('  {:.1f} MB on disk'.format(os.path.getsize(path)/1e6))
+
+# sharded CSV export of a split too big to hold, across core counts
+def benchSplitFile(network='10.0.0.0/10', newprefix=32):
+    print ('split export, {} into /{}'.format(network, newprefix))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'split.csv')
+        for processes in sorted({1, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            rows = stcalc.splitFile(network, newprefix, path, processes)
+            elapsed = time.perf_counter() - start
+            print ('  {} process(es): {} rows, {:.0f} rows/s'.format(processes, rows, rows/elapsed))
+
+# a mixed JSON-lines job file through the batch runner
+def benchJobs(count=200000):
+    print ('batch jobs, {} jobs'.format(count))
+    kinds = (
+        lambda: {'job': 'split', 'network': '10.{}.0.0/16'.format(random.randrange(256)), 'newprefix': 24, 'limit': 16},
+        lambda: {'job': 'classify', 'address': stcalc.formatAddr(random.getrandbits(32))},
+        lambda: {'job': 'convert', 'value': random.getrandbits(32)},
+        lambda: {'job': 'vlsm', 'network': '172.16.0.0/20', 'hosts': [random.randint(1, 500) for x in range(8)]},
+        lambda: {'job': 'ipv6', 'address': stcalc.formatAddr(random.getrandbits(128), 128), 'prefixlen': 64},
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jobs.jsonl')
+        with open(path, 'w') as f:
+            f.writelines(json.dumps(random.choice(kinds)()) + '\n' for x in range(count))
+        for processes in sorted({1, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            jobs, errors = stcalc.runJobFile(path, os.path.join(tmp, 'results.jsonl'), processes)
+            elapsed = time.perf_counter() - start
+            print ('  {} process(es): {} jobs, {} errors, {:.0f} jobs/s'.format(processes, jobs, errors, jobs/elapsed))
+
+# round trips to a resident stserve.py from many keep-alive connections
+def benchService(connections=64, requests=200):
+    print ('local JSON service, {} connections x {} requests'.format(connections, requests))
+    server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stserve.py'), '--port', '0'],
+                              stderr=subprocess.PIPE, text=True)
+    try:
+        port = int(server.stderr.readline().rstrip().rstrip('/').rpartition(':')[2])
+        latencies = []
+
+        async def client():
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            for x in range(requests):
+                body = json.dumps({'job': 'classify', 'address': stcalc.formatAddr(random.getrandbits(32))}).encode()
+                start = time.perf_counter()
+                writer.write(b'POST / HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s' % (len(body), body))
+                head = await reader.readuntil(b'\r\n\r\n')
+                await reader.readexactly(int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0]))
+                latencies.append(time.perf_counter() - start)
+            writer.close()
+
+        async def load():
+            await asyncio.gather(*(client() for x in range(connections)))
+
+        start = time.perf_counter()
+        asyncio.run(load())
+        elapsed = time.perf_counter() - start
+        async def stats():
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'GET /stats HTTP/1.0\r\n\r\n')
+            return (await reader.read()).partition(b'\r\n\r\n')[2].decode()
+
+        print ('  server', asyncio.run(stats()))
+        latencies.sort()
+        print ('  {:.0f} requests/s, client p50 {:.2f} ms, p99 {:.2f} ms'.format(len(latencies)/elapsed,
+            latencies[len(latencies)//2]*1000, latencies[int(len(latencies)*0.99)]*1000))
+    finally:
+        server.terminate()
+        server.wait()
+
+# a router-sized wildcard ACL: matching, shadow/redundancy checks, generation
+def benchACL(entries=30000, count=1000000):
+    print ('wildcard ACL, {} entries, {} addresses'.format(entries, count))
+    acl = stcalc.WildcardACL()
+    for x in range(entries):
+        if (random.random() < 0.05):    #non-contiguous, e.g. host .x in every /16 of a /8
+            acl.append(True, 10 << 24 | random.getrandbits(24), 0x00FF00FF)
+        else:
+            prefixlen = random.choice((16, 20, 24, 24, 28, 32))
+            acl.append(random.random() < 0.7, random.getrandbits(32), (1 << (32-prefixlen)) - 1)
+    acl.append(False, 0, stcalc.ALL_BITS)
+    addrs = array('I', (random.getrandbits(32) for x in range(count)))
+    timed('first-match for every address', acl.match, addrs)
+    findings = timed('shadowed/redundant check', acl.check)
+    print ('  {} shadowed, {} redundant'.format(sum(1 for f in findings if f[1] == 'shadowed'), sum(1 for f in findings if f[1] == 'redundant')))
+    hosts = stcalc.AddressSet.fromAddresses(sorted(set(addrs[:200000])))
+    cover = timed('ACL for 200k hosts', stcalc.wildcardCover, hosts)
+    print ('  {} entries, {} as CIDR blocks'.format(len(cover), sum(1 for block in hosts.cidrs())))
+
+benchmarks = {
+    'prefixtable': benchPrefixTable,
+    'extract': benchExtract,
+    'utilization': benchUtilization,
+    'heavyhitters': benchHeavyHitters,
+    'hilbert': benchHilbert,
+    'delegation': benchDelegation,
+    'eui64': benchEUI64,
+    'embedding': benchEmbedding,
+    'ipv6text': benchIPv6Text,
+    'subnettable': benchSubnetTable,
+    'splitfile': benchSplitFile,
+    'jobs': benchJobs,
+    'service': benchService,
+    'acl': benchACL,
+}
+
+if __name__ == '__main__':
+    names = sys.argv[1:] or list(benchmarks)
+    for name in names:
+        benchmarks[name]()
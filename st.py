@@ -10,11 +10,14 @@ from PyQt5.QtWidgets import ( QMainWindow, QApplication, QComboBox,
         QDialog, QGridLayout, QGroupBox, QHBoxLayout, QLabel, QLineEdit,
         QScrollBar, QTableWidget, QTabWidget, QTextEdit, QVBoxLayout, 
         QWidget, QTableWidgetItem, QPlainTextEdit, QFrame, QMessageBox,
-        QAction, QHeaderView, QTreeView, QTableView, QAbstractItemView)
-from PyQt5.QtGui import QIcon, QPixmap, QRegExpValidator, QStandardItemModel, QStandardItem, QFont, QFontInfo
-from PyQt5.QtCore import QRegExp, QItemSelectionModel, QFile, QTextStream
+        QAction, QHeaderView, QTreeView, QTableView, QAbstractItemView, QMenu,
+        QFileDialog, QInputDialog, QPushButton, QTreeWidget, QTreeWidgetItem, QCheckBox)
+from PyQt5.QtGui import QIcon, QPixmap, QRegExpValidator, QStandardItemModel, QStandardItem, QFont, QFontInfo, QImage, QPainter, QColor
+from PyQt5.QtCore import QRegExp, QItemSelectionModel, QFile, QTextStream, QAbstractTableModel
 from PyQt5 import QtCore
 
+import stcalc
+
 appPath = os.path.dirname(os.path.abspath(__file__))
 iniFile = appPath+'/st.ini'
 pngFile = appPath+'/st.png'
@@ -562,6 +565,14 @@ class MyClassesTab(QWidget):
 
         classesGrid.addWidget(self.diagramGroup,6,0,1,2)    #help diagrams
 
+        self.logButton = QPushButton('Classify Log File...')
+        self.logButton.clicked.connect(self._classifyLog)
+        classesGrid.addWidget(self.logButton,7,1)
+
+        self.macButton = QPushButton('Multicast MACs...')
+        self.macButton.clicked.connect(lambda: MyMulticastDialog(self).exec_())
+        classesGrid.addWidget(self.macButton,7,0)
+
         classesGrid.addWidget(self.fillerLabel,9,0)
         classesGrid.setRowStretch(9,1)
 
@@ -638,6 +649,8 @@ class MyClassesTab(QWidget):
             if (self.addr.is_private):
                 debug('is private')
                 self.addrblockLabel2.setText('[Private]')
+            elif (self.addr.is_multicast):
+                self.addrblockLabel2.setText('[MAC ' + stcalc.formatMAC(stcalc.multicastMAC(int(self.addr))) + ']')
             else:
                 self.addrblockLabel2.setText('')
 
@@ -662,6 +675,22 @@ class MyClassesTab(QWidget):
             self.classbitTextEdit.clear()
             self.addrblockLineEdit.clear()
 
+    # extract every address from a log and break the IPv4 ones down by class
+    def _classifyLog(self):
+        path, filter = QFileDialog.getOpenFileName(self, 'Classify Log File', '', 'Log files (*.log *.txt);;All files (*)')
+        if not path:
+            return
+        try:
+            v4, v6 = stcalc.extractFile(path)
+        except OSError as e:
+            QMessageBox.warning(self, 'Classify Log File', str(e))
+            return
+
+        text = '{} IPv4 and {} IPv6 addresses in {}\n\n'.format(len(v4), len(v6), os.path.basename(path))
+        for name, count in stcalc.classifyIPv4(v4).items():
+            text += '{}: {}\n'.format(name, count)
+        QMessageBox.information(self, 'Classify Log File', text)
+
     def _classChanged(self):
         debug('_classChanged', self.classComboBox.currentIndex(), self.classComboBox.currentText())
         self.addrComboBox.setCurrentIndex(self.classComboBox.currentIndex())
@@ -745,6 +774,51 @@ class MyClassesTab(QWidget):
         self.diagramLayout.addWidget(gb,5,3)
 
 
+class MySubnetTableModel(QAbstractTableModel):
+
+    # virtual table over a stcalc.SubnetTable; cells(row) makes a row's text
+    # and is only called for the rows the view paints
+    def __init__(self, headers, cells):
+        super().__init__()
+        self.headers = headers
+        self.cells = cells
+        self.table = stcalc.SubnetTable()
+        self.cached = (None, None)
+
+    def setTable(self, table):
+        self.beginResetModel()
+        self.table = table
+        self.cached = (None, None)
+        self.endResetModel()
+
+    # status columns changed, repaint without rebuilding
+    def refresh(self):
+        self.cached = (None, None)
+        if len(self.table):
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.table)-1, len(self.headers)-1))
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.table)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if (role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal):
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if (role == QtCore.Qt.TextAlignmentRole):
+            return QtCore.Qt.AlignCenter
+        if (role != QtCore.Qt.DisplayRole or not index.isValid()):
+            return None
+        row = index.row()
+        if (self.cached[0] != row):
+            self.cached = (row, self.cells(row))
+        return self.cached[1][index.column()]
+
+
 class MySubnetsTab(QWidget):
 
     def __init__(self, parent):
@@ -768,8 +842,7 @@ class MySubnetsTab(QWidget):
         self.net = ipaddress.ip_network('{}/{}'.format(self.addrComboBox.currentText(), str(n)), strict=False)
 
         for x in range(2, h+1):
-            # debug (ipaddress.ip_address(2**32-2**x))
-            self.maskComboBox.addItem('{}  (/{})'.format(ipaddress.ip_address(2**32-2**x), 32-x))
+            self.maskComboBox.addItem(stcalc.PREFIXES4[32-x].label)
         self.maskComboBox.setCurrentIndex(self.maskComboBox.count()-1)
         self.maskComboBox.setMaxVisibleItems(self.maskComboBox.count())
         self.maskComboBox.activated.connect(self._maskChanged)
@@ -820,13 +893,27 @@ class MySubnetsTab(QWidget):
         self.subnetUsageTextEdit.setMaximumHeight(22)
         self.subnetUsageTextEdit.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
 
-        #results table
-        self.resultsTable = QTableWidget(1, 4)
-        self.resultsTable.setHorizontalHeaderLabels(('Subnet', 'Mask', 'Host Range', 'Broadcast'))
+        #results table, rows are kept as columns and formatted when painted
+        self.subnets = stcalc.SubnetTable()
+        self.resultsModel = MySubnetTableModel(('Subnet', 'Mask', 'Host Range', 'Broadcast', 'Status', 'Used', 'Free', '%'), self._rowCells)
+        self.resultsTable = QTableView()
+        self.resultsTable.setModel(self.resultsModel)
         self.resultsTable.horizontalHeader().setStyleSheet('::section {font-weight: bold; padding: 1px}')
         self.resultsTable.verticalHeader().setStyleSheet('::section { padding: 0px 1px;}')
+        self.resultsTable.verticalHeader().setDefaultSectionSize(18)
         self.resultsTable.setAlternatingRowColors(True)
         self.resultsTable.setCornerButtonEnabled(False)
+        self.resultsTable.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
+        self.resultsTable.customContextMenuRequested.connect(self._tableMenu)
+
+        # IPAM allocations, one tracker per address block so switching masks keeps the plan
+        self.ipamBlocks = {}
+        self.ipam = None
+        self.ipamLabel = QLabel('')
+
+        # imported or observed used hosts and per-row host bitmaps
+        self.usedHosts = stcalc.AddressSet()
+        self.hostMaps = {}
 
         #add all the widgets to the grid
         subnetsGrid = QGridLayout()
@@ -853,6 +940,7 @@ class MySubnetsTab(QWidget):
         subnetsGrid.addWidget(self.subnetUsageTextEdit,7,0,1,4)
 
         subnetsGrid.addWidget(self.resultsTable,8,0,1,4)
+        subnetsGrid.addWidget(self.ipamLabel,9,0,1,4)
 
 
         self.setLayout(subnetsGrid)
@@ -860,52 +948,184 @@ class MySubnetsTab(QWidget):
         self._updatePulldowns('subnetMask')
         self._updateAll()
 
-    def _clearTable(self, rows):
-        self.resultsTable.setRowCount(rows)
+    def _clearTable(self):
+        self.subnets = stcalc.SubnetTable()
+        self.resultsModel.setTable(self.subnets)
 
     def _updateTable(self):
         debug ('_updateTable')
         mask = 30 - self.maskComboBox.currentIndex()
         net = ipaddress.ip_network('{}/{}'.format(self.addrComboBox.currentText(), str(mask)), strict=False)
-        debug ('maxsubnets:', self.maxsubnetsComboBox.currentText())
-        rows = int(self.maxsubnetsComboBox.currentText())
         subnetbits = int(self.subnetbitsComboBox.currentText())
 
         newprefix = mask + subnetbits
 
-        r = 0
-        tableList = list(net.subnets(new_prefix=newprefix))
-        tableLen = len(tableList)
-
-        if (tableLen > 1024):
-            buttonReply = QMessageBox.question(self, 'Large Table', 'The subnet table has '+str(tableLen)+' entries\n Continue?', QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-            if buttonReply == QMessageBox.Yes:
-                self.resultsTable.setRowCount(0)
-                return
-            else:
-                debug('No clicked.')
+        if str(net) not in self.ipamBlocks:
+            self.ipamBlocks[str(net)] = stcalc.BuddyAllocator(str(net))
+        self.ipam = self.ipamBlocks[str(net)]
+        self.subnets = stcalc.SubnetTable.split(str(net), newprefix)
+        self.resultsModel.setTable(self.subnets)
 
-        self._clearTable(rows)
+        self._updateIpamStatus()
+        self.resultsTable.resizeColumnsToContents()
 
-        for n in tableList:
-            self.resultsTable.setRowHeight(r, 18)
+    def _updateIpamStatus(self):
+        self.resultsModel.refresh()
+        self._updateIpamLabel()
+
+    # first and last usable host of a row
+    def _hostRange(self, row):
+        return self.subnets.firsts[row], self.subnets.lasts[row]
+
+    # bitmap for a row, seeded from the imported host list on first use
+    def _hostMap(self, row):
+        network = self.subnets.network(row)
+        if network not in self.hostMaps:
+            hostMap = stcalc.HostBitmap(network)
+            hostMap.reserveSet(self.usedHosts)
+            self.hostMaps[network] = hostMap
+        return self.hostMaps[network]
+
+    # Used/Free/% of a row; rows without a bitmap are counted straight off the used host set
+    def _hostUsage(self, row):
+        network = self.subnets.network(row)
+        if network in self.hostMaps:
+            used, usable = self.hostMaps[network].utilization()
+        elif self.usedHosts:
+            first, last = self._hostRange(row)
+            used, usable = self.usedHosts.countRange(first, last), last-first+1
+        else:
+            return ['', '', '']
+        return [str(used), str(usable-used), '{:.0%}'.format(used/usable)]
+
+    # text of one results row, only asked for by the model for rows being painted
+    def _rowCells(self, row):
+        subnets = self.subnets
+        start, prefixlen = subnets.starts[row], subnets.prefixlens[row]
+        if (prefixlen == 32):
+            hostRange = subnets.network(row)
+        else:
+            hostRange = stcalc.formatAddr(subnets.firsts[row])+' - '+stcalc.formatAddr(subnets.lasts[row])
+        broadcast = subnets.broadcast(row)
+        state = self.ipam.blockState(start, prefixlen) if self.ipam is not None else ''
+        return [stcalc.formatAddr(start), stcalc.PREFIXES4[prefixlen].maskText+' (/'+str(prefixlen)+')', hostRange,
+                'N/A' if broadcast is None else stcalc.formatAddr(broadcast), state.capitalize()] + self._hostUsage(row)
+
+    def _addUsedHosts(self, hosts):
+        self.usedHosts = self.usedHosts | hosts
+        for hostMap in self.hostMaps.values():     #keep manual reservations, add the new hosts
+            hostMap.reserveSet(hosts)
+        self.resultsModel.refresh()
+        self.resultsTable.resizeColumnsToContents()
 
-            self.resultsTable.setItem(r, 0, QTableWidgetItem(str(n.network_address)))
-            self.resultsTable.setItem(r, 1, QTableWidgetItem(str(n.netmask)+' (/'+str(n.prefixlen)+')'))
-            if (newprefix == 32):
-                self.resultsTable.setItem(r, 2, QTableWidgetItem(str(n)))
-                self.resultsTable.setItem(r, 3, QTableWidgetItem('N/A'))
+    def _importUsedHosts(self):
+        path, filter = QFileDialog.getOpenFileName(self, 'Import Used Hosts', '', 'Text files (*.txt *.csv);;All files (*)')
+        if not path:
+            return
+        try:
+            with open(path) as f:
+                ranges = [(first, last) for first, last, bits in stcalc.parseHostRanges(f) if bits == 32]
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, 'Import Used Hosts', str(e))
+            return
+        self._addUsedHosts(stcalc.AddressSet(ranges))
+
+    # pull every IPv4 address out of a host list or log file
+    def _loadObservedHosts(self):
+        path, filter = QFileDialog.getOpenFileName(self, 'Load Observed Hosts', '', 'Text and log files (*.txt *.csv *.log);;All files (*)')
+        if not path:
+            return
+        try:
+            v4, v6 = stcalc.extractFile(path)
+        except OSError as e:
+            QMessageBox.warning(self, 'Load Observed Hosts', str(e))
+            return
+        self._addUsedHosts(stcalc.AddressSet.fromAddresses(v4))
+
+    def _reserveHostRange(self, row):
+        text, ok = QInputDialog.getText(self, 'Reserve Hosts', 'Host range in '+self.subnets.network(row)+' (first - last):')
+        if not (ok and text):
+            return
+        try:
+            for first, last, bits in stcalc.parseHostRanges([text]):
+                self._hostMap(row).reserveRange(first, last)
+        except ValueError as e:
+            QMessageBox.warning(self, 'Reserve Hosts', str(e))
+
+    def _updateIpamLabel(self):
+        if (self.ipam is None or len(self.ipam) == 0):
+            self.ipamLabel.setText('')
+            return
+
+        start, prefixlen = self.ipam.largestFree() or (None, None)
+        text = '{} allocated in {}'.format(len(self.ipam), self.ipam.network())
+        if (prefixlen is not None):
+            text += '; largest free ' + stcalc.formatNetwork(start, prefixlen)
+        if len(self.subnets):
+            rowPrefix = self.subnets.prefixlens[0]
+            frag = self.ipam.fragmentation().get(rowPrefix)
+            if (frag is not None):
+                text += '; /{} fragmentation {:.0%}'.format(rowPrefix, frag)
+        self.ipamLabel.setText(text)
+
+    def _tableMenu(self, pos):
+        row = self.resultsTable.rowAt(pos.y())
+        if (row < 0 or row >= len(self.subnets)):
+            return
+
+        n = self.subnets.network(row)
+        start, prefixlen = self.subnets.starts[row], self.subnets.prefixlens[row]
+        state = self.ipam.blockState(start, prefixlen)
+
+        menu = QMenu(self)
+        allocAction = menu.addAction('Allocate ' + n)
+        allocAction.setEnabled(state == 'free')
+        nextAction = menu.addAction('Allocate Next Free /' + str(prefixlen))
+        releaseAction = menu.addAction('Release ' + n)
+        releaseAction.setEnabled(n in self.ipam)
+        menu.addSeparator()
+        nextHostAction = menu.addAction('Reserve Next Free Host')
+        nextHostAction.setEnabled(prefixlen >= 16)
+        rangeAction = menu.addAction('Reserve Host Range...')
+        rangeAction.setEnabled(prefixlen >= 16)
+        importAction = menu.addAction('Import Used Hosts...')
+        observedAction = menu.addAction('Load Observed Hosts...')
+        menu.addSeparator()
+        zoneAction = menu.addAction('Reverse DNS Zone...')
+        exportAction = menu.addAction('Export Table...')
+
+        action = menu.exec_(self.resultsTable.viewport().mapToGlobal(pos))
+        if (action == allocAction):
+            self.ipam.allocatePrefix(start, prefixlen)
+        elif (action == nextAction):
+            start = self.ipam.allocate(prefixlen)
+            if start is None:
+                QMessageBox.information(self, 'IPAM', 'No free /{} left in {}'.format(prefixlen, self.ipam.network()))
             else:
-                self.resultsTable.setItem(r, 2, QTableWidgetItem(str(n[1])+' - '+str(n[-2])))
-                self.resultsTable.setItem(r, 3, QTableWidgetItem(str(n.broadcast_address)))
-
-            #center the text
-            for c in range(4):
-                self.resultsTable.item(r,c).setTextAlignment(QtCore.Qt.AlignCenter)
-
-            r += 1
+                debug ('allocated', stcalc.formatNetwork(start, prefixlen))
+        elif (action == releaseAction):
+            self.ipam.release(start)
+        elif (action == nextHostAction):
+            addr = self._hostMap(row).nextFree()
+            if addr is None:
+                QMessageBox.information(self, 'Hosts', 'No free host left in ' + n)
+            else:
+                self._hostMap(row).use(addr)
+                QMessageBox.information(self, 'Hosts', 'Reserved ' + stcalc.formatAddr(addr))
+        elif (action == rangeAction):
+            self._reserveHostRange(row)
+        elif (action == importAction):
+            self._importUsedHosts()
+        elif (action == observedAction):
+            self._loadObservedHosts()
+        elif (action == zoneAction):
+            exportReverseZones(self, n)
+        elif (action == exportAction):
+            exportSubnetTable(self, self.subnets)
+        else:
+            return
 
-        self.resultsTable.resizeColumnsToContents()
+        self._updateIpamStatus()
 
 
     def _updateUsage(self):
@@ -1045,8 +1265,7 @@ class MySubnetsTab(QWidget):
 
             self.maskComboBox.clear()
             for x in range(2, h+1):
-                # debug (ipaddress.ip_address(2**32-2**x))
-                self.maskComboBox.addItem('{}  (/{})'.format(ipaddress.ip_address(2**32-2**x), 32-x))
+                self.maskComboBox.addItem(stcalc.PREFIXES4[32-x].label)
             self.maskComboBox.setCurrentIndex(self.maskComboBox.count()-1)
             self.maskComboBox.setMaxVisibleItems(self.maskComboBox.count())
 
@@ -1062,7 +1281,7 @@ class MySubnetsTab(QWidget):
             self.hostbitsComboBox.setEnabled(False)
             self.maxhostsComboBox.setEnabled(False)
 
-            self._clearTable(0)
+            self._clearTable()
 
     def _maskChanged(self):
         bits = 30 - self.maskComboBox.currentIndex()
@@ -1147,11 +1366,11 @@ class MySubnetsTab(QWidget):
             self.maxsubnetsComboBox.clear()
             if (requestor == 'subnetMask'):
                 for x in range(0, subnetBits+hostBits-1):
-                    self.maxsubnetsComboBox.addItem(str(2**x))
+                    self.maxsubnetsComboBox.addItem(stcalc.PREFIXES4[32-x].sizeText)
                 self.maxsubnetsComboBox.setCurrentIndex(0)
             else:
                 for x in range(0, subnetBits+hostBits-1):  #
-                    self.maxsubnetsComboBox.addItem(str(2**x))
+                    self.maxsubnetsComboBox.addItem(stcalc.PREFIXES4[32-x].sizeText)
                 self.maxsubnetsComboBox.setCurrentIndex(int(self.subnetbitsComboBox.currentText()))
             self.maxsubnetsComboBox.setMaxVisibleItems(self.maxsubnetsComboBox.count())
 
@@ -1172,11 +1391,11 @@ class MySubnetsTab(QWidget):
             self.maxhostsComboBox.clear()
             if (requestor == 'subnetMask'):
                 for x in range(1, subnetBits+hostBits+1):
-                    self.maxhostsComboBox.addItem(str(2**x-2))
+                    self.maxhostsComboBox.addItem(stcalc.PREFIXES4[32-x].hostsText)
                 self.maxhostsComboBox.setCurrentIndex(subnetBits+hostBits-1)
             else:
                 for x in range(1, hostBits+1):
-                    self.maxhostsComboBox.addItem(str(2**x-2))
+                    self.maxhostsComboBox.addItem(stcalc.PREFIXES4[32-x].hostsText)
                 self.maxhostsComboBox.setCurrentIndex(hostBits-1)
             self.maxhostsComboBox.setMaxVisibleItems(self.maxhostsComboBox.count())
 
@@ -1252,6 +1471,7 @@ class MyIPv6Tab(QWidget):
         self.Unformatted = self.addItem(self.Global, 'Unformatted','::/3','')
         self.ipv4compat = self.addItem(self.Unformatted, 'IPv4-Compatible','::/96','Deprecated')
         self.ipv4 = self.addItem(self.Unformatted, 'IPv4-Mapped','::FFFF:0.0.0.0/96','')
+        self.nat64 = self.addItem(self.Unformatted, 'NAT64 Well-Known','64:FF9B::/96','')
 
         self.EUI64 = self.addItem(self.Global, 'EUI-64 Formatted','','Abstract')
         self.IANADelegated = self.addItem(self.EUI64,'IANA Delegated','2000::/3','')
@@ -1298,6 +1518,22 @@ class MyIPv6Tab(QWidget):
         ipv6Grid.addWidget(self.formatLabel, 4,0)
         ipv6Grid.addWidget(self.addrGroup,    5,0)
 
+        self.toolsLayout = QHBoxLayout()
+        self.delegationButton = QPushButton('Prefix Delegation...')
+        self.delegationButton.clicked.connect(lambda: MyDelegationDialog(self).exec_())
+        self.toolsLayout.addWidget(self.delegationButton)
+        self.slaacButton = QPushButton('SLAAC / EUI-64...')
+        self.slaacButton.clicked.connect(lambda: MySlaacDialog(self).exec_())
+        self.toolsLayout.addWidget(self.slaacButton)
+        self.embeddingButton = QPushButton('IPv4 Embedding...')
+        self.embeddingButton.clicked.connect(lambda: MyEmbeddingDialog(self).exec_())
+        self.toolsLayout.addWidget(self.embeddingButton)
+        self.toolsLayout.addStretch(1)
+        self.zoneButton = QPushButton('Reverse DNS Zone...')
+        self.zoneButton.clicked.connect(self._reverseZone)
+        self.toolsLayout.addWidget(self.zoneButton)
+        ipv6Grid.addLayout(self.toolsLayout,  6,0)
+
         self.setLayout(ipv6Grid)
 
         self._addrChanged()
@@ -1357,7 +1593,8 @@ class MyIPv6Tab(QWidget):
 
     def _addrChanged(self):
         debug ('_addrChanged')
-        if ipv6Valid(self.addrComboBox.currentText()):
+        value = ipv6Parse(self.addrComboBox.currentText())
+        if (value is not None):
 
             debug ('')
             self.treeView.setEnabled(True)
@@ -1368,73 +1605,79 @@ class MyIPv6Tab(QWidget):
                 except:
                     continue
 
-            ipaddr = self.addrComboBox.currentText()
-            #debug ('ipaddr',ipaddr)
-            match = re.search(r'^([a-fA-F0-9:]+)[\/ ]?',ipaddr)
-            #debug ('ipaddr', match.group(1))
-            addr = ipaddress.IPv6Address(match.group(1))
+            bIPv6 = '{:0128b}'.format(value)
+            exploded = stcalc.explodeIPv6(value)
+            compressed = stcalc.formatIPv6(value)
 
-            bIPv6 = '{:0128b}'.format(int(addr))
-            exploded = addr.exploded
-
-            debug (exploded, str(addr))
+            debug (exploded, compressed)
             debug ('012345678901234567890123456789012345678')
             debug ('          1         2         3       ')
             debug ('bIPv6', re.sub(r'(.{8})(?!$)', r'\1.', bIPv6))  #binary with '.'
 
-            debug ('6to4:[{}] ipv4_mapped:[{}] is_link_local:[{}] is_site_local:[{}] is_global:[{}]'.format(
-                addr.sixtofour, addr.ipv4_mapped, addr.is_link_local, addr.is_site_local, addr.is_global))
-
             selmod = self.treeView.selectionModel()
+            mac = stcalc.interfaceIDToMAC(value & 0xFFFFFFFFFFFFFFFF)
+            embedding, v4 = stcalc.findEmbedding(value) or (None, None)
+            debug ('embedding', embedding)
+            self.formatLabel.setText('Address Format' if mac is None else 'Address Format (EUI-64 from MAC ' + stcalc.formatMAC(mac) + ')')
 
-            if (addr.is_unspecified):
+            if (value == 0):
                 debug ('unspecified')
                 index = self.model.index(0,0)
                 selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
                 self.updateAddressFormat(['128 bits'],['0000...0000<sub>2</sub>'],['Unspecified Address Constant'])
 
-            elif (addr.is_loopback):
+            elif (value == 1):
                 debug ('loopback')
                 index = self.model.index(1,0)
                 selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
                 self.updateAddressFormat(['128 bits'],['0000...0001<sub>2</sub>'],['Loopback Address Constant'])
 
-            elif (addr.ipv4_mapped is not None):
-                debug ('ipv4_mapped', addr.ipv4_mapped)
+            elif (embedding == 'mapped'):
+                debug ('ipv4_mapped', v4)
                 index = self.model.indexFromItem(self.ipv4)
                 selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
 
                 self.updateAddressFormat(
                     ['3 bits','77 bits','16 bits','32 bits'],
-                    ['000<sub>2</sub>','0', 'FFFF', Int2IP(int(exploded[30:34]+exploded[35:],16))],
+                    ['000<sub>2</sub>','0', 'FFFF', stcalc.formatAddr(v4)],
                     ['6to4 Prefix','Embedded IPv4 Address Prefix','IPv4-\nMapped\nConstant','IPv4 Address']
                 )
 
+            elif (embedding == 'nat64'):
+                debug ('nat64', v4)
+                index = self.model.indexFromItem(self.nat64)
+                selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
+
+                self.updateAddressFormat(
+                    ['96 bits','32 bits'],
+                    ['64:FF9B::', stcalc.formatAddr(v4)],
+                    ['NAT64 Well-Known Prefix','IPv4 Address']
+                )
+
         #unicast
         # ------
 
-            elif (addr.is_link_local):      #FE80:/10 link-local
-                if (addr.compressed[:10] == 'fe80::5efe'):   #ISATAP
+            elif (value >> 118 == 0x3FA):      #FE80:/10 link-local
+                if (embedding == 'isatap'):   #ISATAP
                     debug ('ISATAP')
                     index = self.model.indexFromItem(self.isatap)
                     selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
                     self.updateAddressFormat(['10 bits','86 bits','32 bits'],
-                                            ['0xFE80','0',Int2IP(int(exploded[30:34]+exploded[35:],16))],
+                                            ['0xFE80','0',stcalc.formatAddr(v4)],
                                             ['Link-\nLocal\nPrefix','ISATAP Constant','IPv4 Address'])
-                elif (exploded[:29] == 'fe80:0000:0000:0000:0000:0000'):         #6over4 FE80::/96
+                elif (embedding == '6over4'):         #6over4 FE80::/96
                     debug ('6over4')
                     index = self.model.indexFromItem(self.sixover4)
                     selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
                     self.updateAddressFormat(['10 bits','86 bits','32 bits'],
-                                            ['0xFE80','0',Int2IP(int(exploded[30:34]+exploded[35:],16))],
+                                            ['0xFE80','0',stcalc.formatAddr(v4)],
                                             ['Link-\nLocal\nPrefix','6over4 Constant','IPv4 Address'])
                 else:
                     debug ('link_local')
                     index = self.model.indexFromItem(self.LinkLocal)
                     selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
 
-                    eui64 = re.sub(':', '', exploded[20:])
-                    eui64 = re.sub('(.{2})(?!$)', r'\1:', eui64) #insert a ':' every 2 chars
+                    eui64 = stcalc.formatInterfaceID(value & 0xFFFFFFFFFFFFFFFF)
 
                     subid = str(hex(int(bIPv6[10:64],2)))
 
@@ -1447,13 +1690,12 @@ class MyIPv6Tab(QWidget):
                                             ['0xFE80',subid,eui64],
                                             ['Link-\nLocal\nPrefix',label,'EUI-64 Interface ID'])
 
-            elif (addr.is_site_local):
+            elif (value >> 118 == 0x3FB):     #FEC0::/10
                 debug ('is_site_local')
                 index = self.model.indexFromItem(self.siteLocal)
                 selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
 
-                eui64 = re.sub(':', '', exploded[20:])
-                eui64 = re.sub('(.{2})(?!$)', r'\1:', eui64) #insert a ':' every 2 chars
+                eui64 = stcalc.formatInterfaceID(value & 0xFFFFFFFFFFFFFFFF)
 
                 subid = str(hex(int(bIPv6[10:64],2)))
 
@@ -1463,32 +1705,28 @@ class MyIPv6Tab(QWidget):
                     ['Site-\nLocal\nPrefix','Subnet ID','EUI-64 InterfaceID']
                 )
 
-            elif (addr.sixtofour):
+            elif (embedding == '6to4'):
                 debug ('6to4')
                 index = self.model.indexFromItem(self.sixtofour)
                 selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
 
-                eui64 = re.sub(':', '', exploded[20:])
-                eui64 = re.sub('(.{2})(?!$)', r'\1:', eui64) #insert a ':' every 2 chars
+                eui64 = stcalc.formatInterfaceID(value & 0xFFFFFFFFFFFFFFFF)
 
                 self.updateAddressFormat(
                     ['16 bits','32 bits','16 bits','64 bits'],
-                    ['2001',Int2IP(int(exploded[5:9]+exploded[10:14],16)), '0x'+exploded[15:19].upper(), eui64],
+                    ['2002',stcalc.formatAddr(v4), '0x'+exploded[15:19].upper(), eui64],
                     ['6to4 Prefix','IPv4 Address','Subnet ID','EUI-64 InterfaceID']
                 )
 
-            elif (addr.teredo):
-                debug ('teredo',addr.teredo,addr.teredo[1].exploded)
+            elif (embedding == 'teredo'):
+                server, flags, port, client = stcalc.teredoFields(value)
+                debug ('teredo', server, client)
                 index = self.model.indexFromItem(self.Toredo)
                 selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
 
-                #2001:0000:0000:0001:60c0:9f23
-                #01234567890123456789012345
-                # print ('flags',addr.exploded[20:24])
-                # print ('port', addr.exploded[25:29], int(addr.exploded[25:29],16) )
                 self.updateAddressFormat(
                     ['32 bits','32 bits','16 bits','16 bits','32 bits'],
-                    ['2001:0000',addr.teredo[0].exploded,'0x'+addr.exploded[20:24].upper(), str(int(addr.exploded[25:29],16)), addr.teredo[1].exploded],
+                    ['2001:0000',stcalc.formatAddr(server),'0x{:04X}'.format(flags), str(port ^ 0xFFFF), stcalc.formatAddr(client)],
                     ['Teredo Prefix','Teredo Server Address','Teredo\nFlags','Obfuscated\nNAT UDP\nPort','Obfuscated NAT Public\nIPv4 Address']
                 )
 
@@ -1502,8 +1740,7 @@ class MyIPv6Tab(QWidget):
                 bits61 = bits61[2:] #strip 0x
                 bits61 = re.sub('(.{4})(?!$)', r'\1.', bits61) #add a '.' every 4 chars
 
-                eui64 = re.sub(':', '', exploded[20:])
-                eui64 = re.sub('(.{2})(?!$)', r'\1:', eui64) #insert a ':' every 2 chars
+                eui64 = stcalc.formatInterfaceID(value & 0xFFFFFFFFFFFFFFFF)
 
                 self.updateAddressFormat(
                     ['3 bits','61 bits','64 bits'],
@@ -1513,12 +1750,13 @@ class MyIPv6Tab(QWidget):
 
         # multicast
         # ---------
-            elif (addr.is_multicast):
+            elif (value >> 120 == 0xFF):
                 debug ('multicast')
+                self.formatLabel.setText('Address Format (MAC ' + stcalc.formatMAC(stcalc.multicastMAC(value, 128)) + ')')
 
-                if (re.search(r'^ff.1',addr.compressed)):   #Interface-local
+                if (re.search(r'^ff.1',compressed)):   #Interface-local
 
-                    if (addr.compressed == 'ff01::1'):      #all nodes
+                    if (compressed == 'ff01::1'):      #all nodes
 
                         index = self.model.indexFromItem(self.allNodes1)
                         selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
@@ -1526,7 +1764,7 @@ class MyIPv6Tab(QWidget):
                                                 ['0xFF','....<sub>2</sub>', '0x1', '0000:0000:0000:0000:0000:0000:0001'],
                                                 ['Multicast\nPrefix','Flags','Intf-\nLocal\nScope', 'All Nodes Group ID'])
 
-                    elif (addr.compressed == 'ff01::2'):    #all routers
+                    elif (compressed == 'ff01::2'):    #all routers
 
                         index = self.model.indexFromItem(self.allRouters1)
                         selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
@@ -1541,9 +1779,9 @@ class MyIPv6Tab(QWidget):
                                                 ['0xFF','....<sub>2</sub>', '0x1', exploded[5:]],
                                                 ['Multicast\nPrefix','Flags','Intf-\nLocal\nScope', 'Group ID'])
 
-                elif (re.search('^ff.2',addr.compressed)):   #Link-local
+                elif (re.search('^ff.2',compressed)):   #Link-local
 
-                    if (addr.compressed == 'ff02::1'):      #all nodes
+                    if (compressed == 'ff02::1'):      #all nodes
 
                         index = self.model.indexFromItem(self.allNodes2)
                         selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
@@ -1551,7 +1789,7 @@ class MyIPv6Tab(QWidget):
                                                 ['0xFF','....<sub>2</sub>', '0x2', '0000:0000:0000:0000:0000:0000:0001'],
                                                 ['Multicast\nPrefix','Flags','Link-\nLocal\nScope', 'All Nodes Group ID'])
 
-                    elif (addr.compressed == 'ff02::2'):    #all routers
+                    elif (compressed == 'ff02::2'):    #all routers
 
                         index = self.model.indexFromItem(self.allRouters2)
                         selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
@@ -1566,7 +1804,7 @@ class MyIPv6Tab(QWidget):
                                                 ['0xFF','....<sub>2</sub>', '0x2', exploded[5:]],
                                                 ['Multicast\nPrefix','Flags','Link-\nLocal\nScope', 'Group ID'])
 
-                elif (re.search('^ff.4',addr.compressed)):   #Admin-local
+                elif (re.search('^ff.4',compressed)):   #Admin-local
 
                     index = self.model.indexFromItem(self.adminLocal)
                     selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
@@ -1574,9 +1812,9 @@ class MyIPv6Tab(QWidget):
                                             ['0xFF','....<sub>2</sub>', '0x4', exploded[5:]],
                                             ['Multicast\nPrefix','Flags','Admin-\nLocal\nScope', 'Group ID'])
 
-                elif (re.search('^ff.5',addr.compressed)):   #Site-local
+                elif (re.search('^ff.5',compressed)):   #Site-local
 
-                    if (addr.compressed == 'ff05::2'):    #all routers
+                    if (compressed == 'ff05::2'):    #all routers
 
                         index = self.model.indexFromItem(self.allRouters3)
                         selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
@@ -1592,7 +1830,7 @@ class MyIPv6Tab(QWidget):
                                                 ['Multicast\nPrefix','Flags','Site-\nLocal\nScope', 'Group ID'])
 
 
-                elif (re.search('^ff.8',addr.compressed)):   #Org-local
+                elif (re.search('^ff.8',compressed)):   #Org-local
 
                     index = self.model.indexFromItem(self.orgLocal)
                     selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
@@ -1601,7 +1839,7 @@ class MyIPv6Tab(QWidget):
                                             ['Multicast\nPrefix','Flags','Org-\nLocal\nScope', 'Group ID'])
 
 
-                elif (re.search('^ff.e',addr.compressed)):   #global
+                elif (re.search('^ff.e',compressed)):   #global
 
                     index = self.model.indexFromItem(self.GlobalM)
                     selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
@@ -1618,13 +1856,13 @@ class MyIPv6Tab(QWidget):
                                             ['Multicast\nPrefix','Flags','Reserved\nScope', 'Group ID'])
 
 
-            elif (bIPv6[:96]=='0'*96):  #ipv4-compat
+            elif (embedding == 'compatible'):  #ipv4-compat
 
                 debug ('IPv4 compatible')
                 index = self.model.indexFromItem(self.ipv4compat)
                 selmod.select(index,QItemSelectionModel.ClearAndSelect|QItemSelectionModel.Rows)
                 self.updateAddressFormat(['3 bits','77 bits','16 bits','32 bits'],
-                                        ['000<sub>2</sub>','0', '0000', Int2IP(int(exploded[30:34]+exploded[35:],16)) ],
+                                        ['000<sub>2</sub>','0', '0000', stcalc.formatAddr(v4) ],
                                         ['Unformatted\nPrefix','Embedded IPv4 Address Prefix','IPv4-\nCompatible\nConstant', 'IPv4 Address'])
 
             elif (bIPv6[:3]=='000'):    #unformatted
@@ -1650,6 +1888,14 @@ class MyIPv6Tab(QWidget):
                 except:
                     continue
 
+    def _reverseZone(self):
+        match = re.search(r'^([a-fA-F0-9:]+(/\d+)?)',self.addrComboBox.currentText())
+        try:
+            net = ipaddress.ip_network(match.group(1), strict=False)
+        except (AttributeError, ValueError):
+            return
+        exportReverseZones(self, str(net))
+
     def createModel(self, parent):
         model = QStandardItemModel(0, 3, parent)
         model.setHeaderData(0, QtCore.Qt.Horizontal, 'Type')
@@ -1694,7 +1940,7 @@ class MyVLSMTab(QWidget):
         # debug (c,n,s,h)
 
         for x in range(0, 32):
-            self.maskComboBox.addItem('{}  (/{})'.format(ipaddress.ip_address(2**32-2**x), 32-x))
+            self.maskComboBox.addItem(stcalc.PREFIXES4[32-x].label)
         self.maskComboBox.setCurrentIndex(32-n)
         self.maskComboBox.setMaxVisibleItems(self.maskComboBox.count())
         self.maskComboBox.activated.connect(self._maskChanged)
@@ -1729,7 +1975,7 @@ class MyVLSMTab(QWidget):
         self.maxsubnetLabel = QLabel('Maximum Subnets')
         self.maxsubnetsComboBox = QComboBox()
         for x in range(32-1,0,-1):
-            self.maxsubnetsComboBox.addItem(str(2**x))
+            self.maxsubnetsComboBox.addItem(stcalc.PREFIXES4[32-x].sizeText)
         self.maxsubnetsComboBox.setMaxVisibleItems(32)
         self.maxsubnetsComboBox.activated.connect(self._maxsubnetsChanged)
 
@@ -1737,7 +1983,7 @@ class MyVLSMTab(QWidget):
 
         self.maxaddrComboBox = QComboBox()
         for x in range(32-1,0,-1):
-            self.maxaddrComboBox.addItem(str(2**x-2))
+            self.maxaddrComboBox.addItem(stcalc.PREFIXES4[32-x].hostsText)
         self.maxaddrComboBox.setMaxVisibleItems(32)
         self.maxaddrComboBox.activated.connect(self._maxaddrChanged)
 
@@ -1786,8 +2032,12 @@ class MyVLSMTab(QWidget):
         vlsmGrid.addWidget(self.vlsmrangeTextEdit,7,4,1,2)
 
 
-        vlsmGrid.addWidget(self.fillerLabel,8,0)
-        vlsmGrid.setRowStretch(8,1)
+        self.excludeButton = QPushButton('Exclude Prefixes...')
+        self.excludeButton.clicked.connect(lambda: MyExcludeDialog(self, str(self.net)).exec_())
+        vlsmGrid.addWidget(self.excludeButton,8,4,1,2)
+
+        vlsmGrid.addWidget(self.fillerLabel,9,0)
+        vlsmGrid.setRowStretch(9,1)
 
         self.setLayout(vlsmGrid)
 
@@ -1969,8 +2219,7 @@ class MyCIDRTab(QWidget):
         debug (c,n,s,h)
 
         for x in range(0, 32):
-            # debug (ipaddress.ip_address(2**32-2**x))
-            self.maskComboBox.addItem('{}  (/{})'.format(ipaddress.ip_address(2**32-2**x), 32-x))
+            self.maskComboBox.addItem(stcalc.PREFIXES4[32-x].label)
         self.maskComboBox.setCurrentIndex(32-n)
         self.maskComboBox.setMaxVisibleItems(self.maskComboBox.count())
         self.maskComboBox.activated.connect(self._maskChanged)
@@ -2016,10 +2265,15 @@ class MyCIDRTab(QWidget):
         self.usageTextEdit.setVerticalScrollBarPolicy(QtCore.Qt.ScrollBarAlwaysOff)
 
         #results table
-        self.resultsTable = QTableWidget(1, 2)
-        self.resultsTable.setHorizontalHeaderLabels(('Route', 'Address Range'))
+        self.routes = stcalc.SubnetTable()
+        self.resultsModel = MySubnetTableModel(('Route', 'Address Range'), self._rowCells)
+        self.resultsTable = QTableView()
+        self.resultsTable.setModel(self.resultsModel)
         self.resultsTable.horizontalHeader().setStyleSheet('::section {font-weight: bold; padding: 1px}')
         self.resultsTable.verticalHeader().setStyleSheet('::section { padding: 0px 1px;}')
+        self.resultsTable.verticalHeader().setDefaultSectionSize(18)
+        self.resultsTable.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
+        self.resultsTable.customContextMenuRequested.connect(self._tableMenu)
         self.resultsTable.setAlternatingRowColors(True)
         self.resultsTable.setContentsMargins(0,0,0,0) #top, left, right, bottom
         self.resultsTable.setCornerButtonEnabled(False)
@@ -2048,6 +2302,35 @@ class MyCIDRTab(QWidget):
             
         cidrGrid.addWidget(self.resultsTable,8,0,1,4)
 
+        # list tools
+        self.toolsLayout = QHBoxLayout()
+        self.compareButton = QPushButton('Compare Lists...')
+        self.compareButton.clicked.connect(lambda: MyJoinDialog(self).exec_())
+        self.toolsLayout.addWidget(self.compareButton)
+        self.rangeButton = QPushButton('Range to CIDR...')
+        self.rangeButton.clicked.connect(lambda: MyRangeDialog(self).exec_())
+        self.toolsLayout.addWidget(self.rangeButton)
+        self.excludeButton = QPushButton('Exclude Prefixes...')
+        self.excludeButton.clicked.connect(lambda: MyExcludeDialog(self, str(self.net)).exec_())
+        self.toolsLayout.addWidget(self.excludeButton)
+        self.aclButton = QPushButton('Wildcard ACL...')
+        self.aclButton.clicked.connect(lambda: MyACLDialog(self).exec_())
+        self.toolsLayout.addWidget(self.aclButton)
+        self.tableButton = QPushButton('Prefix Table...')
+        self.tableButton.clicked.connect(lambda: MyPrefixTableDialog(self).exec_())
+        self.toolsLayout.addWidget(self.tableButton)
+        self.diffButton = QPushButton('Diff Plans...')
+        self.diffButton.clicked.connect(lambda: MyPlanDiffDialog(self).exec_())
+        self.toolsLayout.addWidget(self.diffButton)
+        self.clusterButton = QPushButton('Cluster Hosts...')
+        self.clusterButton.clicked.connect(lambda: MyClusterDialog(self).exec_())
+        self.toolsLayout.addWidget(self.clusterButton)
+        self.hittersButton = QPushButton('Heavy Hitters...')
+        self.hittersButton.clicked.connect(lambda: MyHeavyHittersDialog(self).exec_())
+        self.toolsLayout.addWidget(self.hittersButton)
+        self.toolsLayout.addStretch(1)
+        cidrGrid.addLayout(self.toolsLayout,9,0,1,4)
+
         self.setLayout(cidrGrid)
 
         self._maskChanged() #force pulldowns to update
@@ -2080,7 +2363,7 @@ class MyCIDRTab(QWidget):
             self.maxroutesComboBox.setEnabled(False)
             self.cidrmaskComboBox.setEnabled(False)
 
-            self.resultsTable.setRowCount(0)
+            self._clearTable()
 
     def _maskChanged(self):
         bits = 32 - self.maskComboBox.currentIndex()
@@ -2102,14 +2385,13 @@ class MyCIDRTab(QWidget):
         #update max routes
         self.maxroutesComboBox.clear()
         for x in range(1, self.cidrbitsComboBox.count()+1):  #always same # of entries as cidrbits list
-            self.maxroutesComboBox.addItem(str(2**x))
+            self.maxroutesComboBox.addItem(stcalc.PREFIXES4[32-x].sizeText)
         self.maxroutesComboBox.setMaxVisibleItems(self.maxroutesComboBox.count())
         self.maxroutesComboBox.setCurrentIndex(self.cidrbitsComboBox.currentIndex())
 
         #update CIDR mask
         self.cidrmaskComboBox.clear()
-        for x in range(32-self.maskComboBox.currentIndex()+1, 33):
-            self.cidrmaskComboBox.addItem('{}  (/{})'.format(ipaddress.ip_address(2**32-2**(32-x)), x))
+        self.cidrmaskComboBox.addItems([info.label for info in stcalc.PREFIXES4[32-self.maskComboBox.currentIndex()+1:]])
         self.cidrmaskComboBox.setMaxVisibleItems(self.cidrmaskComboBox.count())
         self.cidrmaskComboBox.setCurrentIndex(self.cidrbitsComboBox.currentIndex())
 
@@ -2127,8 +2409,7 @@ class MyCIDRTab(QWidget):
 
         #update CIDR mask
         self.cidrmaskComboBox.clear()
-        for x in range(32-self.maskComboBox.currentIndex()+1,33):
-            self.cidrmaskComboBox.addItem('{}  (/{})'.format(ipaddress.ip_address(2**32-2**(32-x)), x))
+        self.cidrmaskComboBox.addItems([info.label for info in stcalc.PREFIXES4[32-self.maskComboBox.currentIndex()+1:]])
         self.cidrmaskComboBox.setMaxVisibleItems(self.cidrmaskComboBox.count())
         self.cidrmaskComboBox.setCurrentIndex(self.maxroutesComboBox.currentIndex())
 
@@ -2147,7 +2428,7 @@ class MyCIDRTab(QWidget):
         #update max routes
         self.maxroutesComboBox.clear()
         for x in range(1,self.cidrbitsComboBox.count()+1):  #always same # of entries as cidrbits list
-            self.maxroutesComboBox.addItem(str(2**x))
+            self.maxroutesComboBox.addItem(stcalc.PREFIXES4[32-x].sizeText)
         self.maxroutesComboBox.setMaxVisibleItems(self.maxroutesComboBox.count())
         self.maxroutesComboBox.setCurrentIndex(self.cidrmaskComboBox.currentIndex())
 
@@ -2182,8 +2463,7 @@ class MyCIDRTab(QWidget):
         prefixlen = 32 -self.maskComboBox.currentIndex()
         debug ('_updateAddrBlockRange mask:', prefixlen)
         net = ipaddress.ip_network('{}/{}'.format(self.addrComboBox.currentText(), str(prefixlen)), strict=False)
-        addr = IP2Int(str(net.netmask)) ^ 0xFFFFFFFF    #xor
-        addr = addr | IP2Int (str(net.network_address))
+        addr = int(net.network_address) | stcalc.PREFIXES4[prefixlen].wildcard
         self.addrblockLineEdit.setPlainText( str(net.network_address) + ' - ' + Int2IP(addr) )
 
 
@@ -2195,51 +2475,1407 @@ class MyCIDRTab(QWidget):
 
         newprefix = mask + subnetbits
         debug ('newprefix:',newprefix)
-        rows = int(self.maxroutesComboBox.currentText())
 
-        r = 0
-        tableList = list(net.subnets(new_prefix=newprefix))
-        tableLen = len(tableList)
+        self.routes = stcalc.SubnetTable.split(str(net), newprefix)
+        self.resultsModel.setTable(self.routes)
+        self.resultsTable.resizeColumnsToContents()
 
-        if (tableLen > 1024):
-            buttonReply = QMessageBox.question(self, 'Large Table', 'The subnet table has '+str(tableLen)+' entries\n Continue?', QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-            if buttonReply == QMessageBox.No:
-                self.resultsTable.setRowCount(0)
-                return
-            else:
-                debug('Yes clicked.')
+    # text of one route row, only asked for by the model for rows being painted
+    def _rowCells(self, row):
+        start = stcalc.formatAddr(self.routes.starts[row])
+        if (self.routes.prefixlens[row] == 32):
+            return [start, self.routes.network(row)]
+        return [start, start + ' - ' + stcalc.formatAddr(self.routes.lasts[row])]
+
+    def _tableMenu(self, pos):
+        if not len(self.routes):
+            return
+        menu = QMenu(self)
+        exportAction = menu.addAction('Export Table...')
+        if (menu.exec_(self.resultsTable.viewport().mapToGlobal(pos)) == exportAction):
+            exportSubnetTable(self, self.routes)
+
+    def _clearTable(self):
+        self.routes = stcalc.SubnetTable()
+        self.resultsModel.setTable(self.routes)
 
-        self._clearTable(rows)
+    def _updateAll(self):
+        self._updateAddrBlockRange()
+        self._updateUsage()
+        self._updateTable()
 
-        for n in tableList:
 
-            item =  QTableWidgetItem(str(n.network_address))
-            item.setTextAlignment(QtCore.Qt.AlignCenter)
-            self.resultsTable.setItem(r, 0,item)
+class MyHilbertView(QWidget):
+
+    # paints the tab's QImage scaled to fit, no pixmap copy; mouse and keys go back to the tab
+    def __init__(self, tab):
+        super().__init__(tab)
+        self.tab = tab
+        self.image = None
+        self.setMouseTracking(True)
+        self.setFocusPolicy(QtCore.Qt.StrongFocus)
+        self.setMinimumSize(256, 256)
+
+    def setImage(self, image):
+        self.image = image
+        self.update()
+
+    # square the image is drawn into
+    def target(self):
+        side = min(self.width(), self.height())
+        return QtCore.QRect((self.width()-side)//2, (self.height()-side)//2, side, side)
+
+    # widget position to image pixel, or None off the map
+    def pixelAt(self, pos):
+        target = self.target()
+        if (self.image is None or not target.contains(pos)):
+            return None
+        scale = self.image.width() / target.width()
+        return int((pos.x()-target.x()) * scale), int((pos.y()-target.y()) * scale)
+
+    def paintEvent(self, event):
+        if self.image is not None:
+            painter = QPainter(self)
+            painter.drawImage(self.target(), self.image)
+            painter.end()
+
+    def mouseMoveEvent(self, event):
+        self.tab._hover(self.pixelAt(event.pos()))
+
+    def mousePressEvent(self, event):
+        pixel = self.pixelAt(event.pos())
+        if (event.button() == QtCore.Qt.LeftButton and pixel):
+            self.tab._zoomIn(pixel)
+        elif (event.button() == QtCore.Qt.RightButton):
+            self.tab._zoomOut()
+
+    def keyPressEvent(self, event):
+        moves = {QtCore.Qt.Key_Left: (-1, 0), QtCore.Qt.Key_Right: (1, 0), QtCore.Qt.Key_Up: (0, -1), QtCore.Qt.Key_Down: (0, 1)}
+        if event.key() in moves:
+            self.tab._pan(*moves[event.key()])
+        else:
+            super().keyPressEvent(event)
 
-            if (newprefix == 32):
-                item = QTableWidgetItem(str(n))
-                item.setTextAlignment(QtCore.Qt.AlignCenter)
-                self.resultsTable.setItem(r, 1, item)
-            else:
-                item = QTableWidgetItem(str(n.network_address) + ' - ' + str(n[-2]))
+
+class MyMapTab(QWidget):
+
+    def __init__(self, parent):
+        super().__init__(parent)
+
+        debug ('\ninit map')
+
+        # address block
+        self.addrLabel = QLabel('Address Block')
+        self.addrComboBox = QComboBox()
+        self.addrComboBox.setEditable(True)
+        self.addrComboBox.addItems(['0.0.0.0/0', '10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16', '2000::/3', '2001:db8::/32'])
+        self.addrComboBox.activated.connect(self._blockChanged)
+        self.addrComboBox.lineEdit().returnPressed.connect(self._blockChanged)
+
+        # image size
+        self.sizeLabel = QLabel('Resolution')
+        self.sizeComboBox = QComboBox()
+        self.sizeComboBox.addItems(['256', '512', '1024', '2048', '4096'])
+        self.sizeComboBox.setCurrentIndex(2)
+        self.sizeComboBox.activated.connect(self._render)
+
+        self.planButton = QPushButton('Load Plan...')
+        self.planButton.clicked.connect(self._loadPlan)
+        self.hostsButton = QPushButton('Load Hosts...')
+        self.hostsButton.clicked.connect(self._loadHosts)
+
+        labelText  = f'<font color="#{themes[themeName][N_COLOR]}">Allocated</font>; '
+        labelText += f'<font color="#{themes[themeName][S_COLOR]}">Special-Purpose</font>; '
+        labelText += f'<font color="#{themes[themeName][H_COLOR]}">Observed Hosts</font>; '
+        labelText += 'Free'
+        self.legendLabel = QLabel(labelText + '  (click = zoom in, right click = zoom out, arrows = pan)')
+        self.legendLabel.setObjectName('multiColor')
+
+        self.view = MyHilbertView(self)
+        self.positionLabel = QLabel('')
+
+        # allocated subnets and observed hosts by address width
+        self.allocated = {32: stcalc.AddressSet(bits=32), 128: stcalc.AddressSet(bits=128)}
+        self.hosts = {32: stcalc.AddressSet(bits=32), 128: stcalc.AddressSet(bits=128)}
+        self.specials = {bits: stcalc.AddressSet.fromPrefixes([stcalc.parseNetwork(network) for network in networks], bits)
+                         for bits, networks in stcalc.SPECIAL_RANGES.items()}
+        self.map = None
+        self.level, self.x, self.y = 0, 0, 0
+
+        # rendered tiles by (order, tx, ty), oldest first; panning and zooming
+        # back only draws the tiles not seen yet
+        self.tiles = {}
+
+        # grid
+        mapGrid = QGridLayout()
+        mapGrid.addWidget(self.addrLabel,0,0,1,2)       #row, col[, rowspan, colspan]
+        mapGrid.addWidget(self.addrComboBox,1,0,1,2)
+        mapGrid.addWidget(self.sizeLabel,0,2)
+        mapGrid.addWidget(self.sizeComboBox,1,2)
+        mapGrid.addWidget(self.planButton,1,3)
+        mapGrid.addWidget(self.hostsButton,1,4)
+        mapGrid.addWidget(self.legendLabel,2,0,1,5)
+        mapGrid.addWidget(self.view,3,0,1,5)
+        mapGrid.addWidget(self.positionLabel,4,0,1,5)
+        mapGrid.setRowStretch(3,1)
+
+        self.setLayout(mapGrid)
+
+        self._blockChanged()
+
+    tileSide = 256
+    cachedTiles = 320
+
+    def _blockChanged(self):
+        self.level, self.x, self.y = 0, 0, 0
+        self.tiles = {}
+        self._render()
+
+    # the visible square put together from tileSide tiles, drawing only the
+    # ones not in the cache
+    def _render(self):
+        network = self.addrComboBox.currentText().strip()
+        try:
+            hmap = stcalc.HilbertMap(network, int(self.sizeComboBox.currentText()), self.level, self.x, self.y)
+        except ValueError as e:
+            self.positionLabel.setText(str(e))
+            return
+        self.map = hmap
+
+        side = min(self.tileSide, hmap.side)
+        across = hmap.side // side
+        tileLevel = hmap.order - (side.bit_length() - 1)
+        image = QImage(hmap.side, hmap.side, QImage.Format_RGB32)
+        painter = QPainter(image)
+        for ty in range(across):
+            for tx in range(across):
+                key = (hmap.order, hmap.x0 // side + tx, hmap.y0 // side + ty)
+                tile = self.tiles.pop(key, None)
+                if tile is None:
+                    tile = self._renderTile(stcalc.HilbertMap(network, side, tileLevel, key[1], key[2]))
+                self.tiles[key] = tile
+                painter.drawImage(tx * side, ty * side, tile)
+        painter.end()
+        while len(self.tiles) > self.cachedTiles:
+            del self.tiles[next(iter(self.tiles))]
+
+        self.view.setImage(image)
+        self.positionLabel.setText('Showing {} - {}, {} address(es) per pixel'.format(
+            stcalc.formatAddr(hmap.first, hmap.bits), stcalc.formatAddr(hmap.last, hmap.bits), 1 << hmap.cellShift))
+
+    # draw one tile: free background, then special, allocated and observed
+    # ranges as rectangles, so the cost follows the ranges not the pixels
+    def _renderTile(self, hmap):
+        image = QImage(hmap.side, hmap.side, QImage.Format_RGB32)
+        image.fill(QColor('#303030' if darkMode else '#e8e8e8'))
+        painter = QPainter(image)
+        for ranges, color in ((self.specials, S_COLOR), (self.allocated, N_COLOR)):
+            fill = QColor('#' + themes[themeName][color])
+            for first, last in ranges[hmap.bits].intervalsIn(hmap.first, hmap.last):
+                for x, y, width, height in hmap.rects(first, last):
+                    painter.fillRect(x, y, width, height, fill)
+
+        fill = QColor('#' + themes[themeName][H_COLOR])
+        full, cells = hmap.density(self.hosts[hmap.bits])
+        for x, y, width, height in full:
+            painter.fillRect(x, y, width, height, fill)
+        painter.end()
+
+        # partly used cells are blended straight into the image's own pixel buffer
+        pixels = image.bits()
+        pixels.setsize(image.byteCount())
+        pixels = memoryview(pixels).cast('I')
+        stride = image.bytesPerLine() // 4
+        red, green, blue = fill.red(), fill.green(), fill.blue()
+        for x, y, fraction in cells:
+            alpha = 0.25 + 0.75 * fraction
+            old = pixels[y*stride + x]
+            r, g, b = (old >> 16) & 255, (old >> 8) & 255, old & 255
+            pixels[y*stride + x] = 0xff000000 | int(r + (red-r)*alpha) << 16 | int(g + (green-g)*alpha) << 8 | int(b + (blue-b)*alpha)
+        pixels.release()
+        return image
+
+    def _hover(self, pixel):
+        if (self.map is None or pixel is None):
+            return
+        first, last = self.map.cellAt(*pixel)
+        prefix = stcalc.formatNetwork(first, self.map.bits - self.map.cellShift, self.map.bits)
+        notes = [name for name, ranges in (('special-purpose', self.specials), ('allocated', self.allocated)) if first in ranges[self.map.bits]]
+        used = self.hosts[self.map.bits].countRange(first, last)
+        if used:
+            notes.append('{} observed'.format(used))
+        self.positionLabel.setText(prefix + ('  ' + ', '.join(notes) if notes else ''))
+
+    # the quadrant under the pointer becomes the view
+    def _zoomIn(self, pixel):
+        if (self.map is None or self.level >= self.map.maxLevel or self.map.side < 32):
+            return
+        half = max(self.map.side // 2, 1)
+        self.level += 1
+        self.x = self.x * 2 + min(pixel[0] // half, 1)
+        self.y = self.y * 2 + min(pixel[1] // half, 1)
+        self._render()
+
+    def _zoomOut(self):
+        if (self.level > 0):
+            self.level -= 1
+            self.x //= 2
+            self.y //= 2
+            self._render()
+
+    def _pan(self, dx, dy):
+        x, y = self.x + dx, self.y + dy
+        if (0 <= x < 1 << self.level and 0 <= y < 1 << self.level):
+            self.x, self.y = x, y
+            self._render()
+
+    def _loadPlan(self):
+        path, filter = QFileDialog.getOpenFileName(self, 'Load Plan', '', 'Text files (*.txt *.csv);;All files (*)')
+        if not path:
+            return
+        try:
+            plan = stcalc.loadPlan(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, 'Load Plan', str(e))
+            return
+        for bits in self.allocated:
+            self.allocated[bits] = stcalc.AddressSet.fromPrefixes([row[:3] for row in plan], bits)
+        self.tiles = {}
+        self._render()
+
+    def _loadHosts(self):
+        path, filter = QFileDialog.getOpenFileName(self, 'Load Hosts', '', 'Text and log files (*.txt *.csv *.log);;All files (*)')
+        if not path:
+            return
+        try:
+            v4, v6 = stcalc.extractFile(path)
+        except OSError as e:
+            QMessageBox.warning(self, 'Load Hosts', str(e))
+            return
+        self.hosts = {32: stcalc.AddressSet.fromAddresses(v4, 32), 128: stcalc.AddressSet.fromAddresses(v6, 128)}
+        self.tiles = {}
+        self._render()
+
+
+class MySubnetNode:
+
+    # one loaded row of the subnet tree; children are filled in by fetchMore
+    __slots__ = ('start', 'prefixlen', 'parent', 'row', 'children')
+
+    def __init__(self, start, prefixlen, parent, row):
+        self.start = start
+        self.prefixlen = prefixlen
+        self.parent = parent
+        self.row = row
+        self.children = []
+
+
+class MySubnetTreeModel(QtCore.QAbstractItemModel):
+
+    # lazy tree over a block: a node's 2**split children are worked out from
+    # its start and prefix length when the view asks for them, a batch at a time
+    headers = ('Subnet', 'Addresses', 'Allocation', 'Used')
+    batch = 256
+
+    def __init__(self, network, split=1):
+        super().__init__()
+        start, prefixlen, self.bits = stcalc.parseNetwork(network)
+        self.split = split
+        self.root = MySubnetNode(0, -1, None, 0)
+        self.root.children.append(MySubnetNode(start, prefixlen, self.root, 0))
+
+        # plan rows by (start, prefixlen), plus the allocated and observed address sets
+        self.labels = {}
+        self.allocated = stcalc.AddressSet(bits=self.bits)
+        self.hosts = stcalc.AddressSet(bits=self.bits)
+
+    def setPlan(self, plan):
+        rows = [row for row in plan if row[2] == self.bits]
+        self.labels = {(start, prefixlen): label for start, prefixlen, bits, label in rows}
+        self.allocated = stcalc.AddressSet.fromPrefixes([row[:3] for row in rows], self.bits)
+        self._refresh()
+
+    def setHosts(self, hosts):
+        self.hosts = hosts
+        self._refresh()
+
+    # the tree's shape does not change, only the Allocation and Used columns
+    # of the rows fetched so far
+    def _refresh(self):
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            if node.children:
+                parent = QtCore.QModelIndex() if node is self.root else self.createIndex(node.row, 0, node)
+                self.dataChanged.emit(self.index(0, 2, parent), self.index(len(node.children)-1, 3, parent))
+                nodes.extend(node.children)
+
+    def _node(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def _childCount(self, node):
+        return 1 << min(self.split, self.bits - node.prefixlen)
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        node = self._node(parent)
+        if (row < 0 or row >= len(node.children)):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        parent = index.internalPointer().parent
+        if (parent is self.root):
+            return QtCore.QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if (parent.column() > 0):
+            return 0
+        return len(self._node(parent).children)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self.headers)
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        node = self._node(parent)
+        return node is self.root or node.prefixlen < self.bits
+
+    def canFetchMore(self, parent):
+        node = self._node(parent)
+        return node is not self.root and node.prefixlen < self.bits and len(node.children) < self._childCount(node)
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        first = len(node.children)
+        last = min(self._childCount(node), first + self.batch) - 1
+        childlen = node.prefixlen + min(self.split, self.bits - node.prefixlen)
+        size = stcalc.blockSize(childlen, self.bits)
+        self.beginInsertRows(parent, first, last)
+        node.children.extend(MySubnetNode(node.start + row*size, childlen, node, row) for row in range(first, last+1))
+        self.endInsertRows()
+
+    # forget a collapsed node's children so memory follows what is on screen
+    def dropChildren(self, parent):
+        node = self._node(parent)
+        if node.children:
+            self.beginRemoveRows(parent, 0, len(node.children)-1)
+            node.children = []
+            self.endRemoveRows()
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if (role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal):
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    # label of the plan row that is, or most closely contains, this node
+    def _label(self, node):
+        for prefixlen in range(node.prefixlen, -1, -1):
+            start = node.start & ~(stcalc.blockSize(prefixlen, self.bits) - 1)
+            if (start, prefixlen) in self.labels:
+                return self.labels[(start, prefixlen)] or stcalc.formatNetwork(start, prefixlen, self.bits)
+        return ''
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if (role == QtCore.Qt.TextAlignmentRole and index.column() > 0):
+            return QtCore.Qt.AlignCenter
+        if (role != QtCore.Qt.DisplayRole or not index.isValid()):
+            return None
+        node = index.internalPointer()
+        column = index.column()
+        size = stcalc.blockSize(node.prefixlen, self.bits)
+        if (column == 0):
+            return stcalc.formatNetwork(node.start, node.prefixlen, self.bits)
+        if (column == 1):
+            return stcalc.PREFIXES[self.bits][node.prefixlen].sizeText
+        if (column == 2):
+            allocated = self.allocated.countRange(node.start, node.start + size - 1)
+            if (allocated == size):
+                return self._label(node)
+            return 'Partial ({:.0%})'.format(allocated / size) if allocated else ''
+        used = self.hosts.countRange(node.start, node.start + size - 1)
+        return '{} ({:.1%})'.format(used, used / size) if used else ''
+
+
+class MyTreeTab(QWidget):
+
+    def __init__(self, parent):
+        super().__init__(parent)
+
+        debug ('\ninit tree')
+
+        # address block
+        self.addrLabel = QLabel('Address Block')
+        self.addrComboBox = QComboBox()
+        self.addrComboBox.setEditable(True)
+        self.addrComboBox.addItems(['10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16', '0.0.0.0/0', '2001:db8::/32', '::/0'])
+        self.addrComboBox.activated.connect(self._blockChanged)
+        self.addrComboBox.lineEdit().returnPressed.connect(self._blockChanged)
+
+        # children per node
+        self.splitLabel = QLabel('Children per Node')
+        self.splitComboBox = QComboBox()
+        for x in (1, 2, 4, 8):
+            self.splitComboBox.addItem('{} (/+{})'.format(2**x, x), x)
+        self.splitComboBox.activated.connect(self._blockChanged)
+
+        self.planButton = QPushButton('Load Plan...')
+        self.planButton.clicked.connect(self._loadPlan)
+        self.hostsButton = QPushButton('Load Hosts...')
+        self.hostsButton.clicked.connect(self._loadHosts)
+
+        self.treeView = QTreeView()
+        self.treeView.setAlternatingRowColors(True)
+        self.treeView.setUniformRowHeights(True)
+        self.treeView.header().setStyleSheet('::section {font-weight: bold; padding: 1px}')
+        self.treeView.collapsed.connect(lambda index: self.model.dropChildren(index))
+
+        self.plan = []
+        self.hosts = {32: stcalc.AddressSet(bits=32), 128: stcalc.AddressSet(bits=128)}
+        self.model = None
+
+        # grid
+        treeGrid = QGridLayout()
+        treeGrid.addWidget(self.addrLabel,0,0,1,2)       #row, col[, rowspan, colspan]
+        treeGrid.addWidget(self.addrComboBox,1,0,1,2)
+        treeGrid.addWidget(self.splitLabel,0,2)
+        treeGrid.addWidget(self.splitComboBox,1,2)
+        treeGrid.addWidget(self.planButton,1,3)
+        treeGrid.addWidget(self.hostsButton,1,4)
+        treeGrid.addWidget(self.treeView,2,0,1,5)
+        treeGrid.setRowStretch(2,1)
+
+        self.setLayout(treeGrid)
+
+        self._blockChanged()
+
+    def _blockChanged(self):
+        try:
+            model = MySubnetTreeModel(self.addrComboBox.currentText().strip(), self.splitComboBox.currentData())
+        except ValueError as e:
+            QMessageBox.warning(self, 'Subnet Tree', str(e))
+            return
+        model.setPlan(self.plan)
+        model.setHosts(self.hosts[model.bits])
+        self.model = model
+        self.treeView.setModel(model)
+        self.treeView.expand(model.index(0, 0))
+        self.treeView.resizeColumnToContents(0)
+
+    def _loadPlan(self):
+        path, filter = QFileDialog.getOpenFileName(self, 'Load Plan', '', 'Text files (*.txt *.csv);;All files (*)')
+        if not path:
+            return
+        try:
+            self.plan = stcalc.loadPlan(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, 'Load Plan', str(e))
+            return
+        self.model.setPlan(self.plan)
+
+    def _loadHosts(self):
+        path, filter = QFileDialog.getOpenFileName(self, 'Load Hosts', '', 'Text and log files (*.txt *.csv *.log);;All files (*)')
+        if not path:
+            return
+        try:
+            v4, v6 = stcalc.extractFile(path)
+        except OSError as e:
+            QMessageBox.warning(self, 'Load Hosts', str(e))
+            return
+        self.hosts = {32: stcalc.AddressSet.fromAddresses(v4, 32), 128: stcalc.AddressSet.fromAddresses(v6, 128)}
+        self.model.setHosts(self.hosts[self.model.bits])
+
+
+class MyListDialog(QDialog):
+
+    # base for the tools that work on pasted or loaded prefix lists
+    def __init__(self, parent, title):
+        super().__init__(parent)
+
+        self.setWindowTitle(title)
+        self.resize(640, 560)
+        self.grid = QGridLayout()
+        self.setLayout(self.grid)
+
+    # input list and output csv for the file to file conversions
+    def _paths(self, title, output):
+        inPath, filter = QFileDialog.getOpenFileName(self, title, '', 'Text files (*.txt *.csv);;All files (*)')
+        if not inPath:
+            return None, None
+        outPath, filter = QFileDialog.getSaveFileName(self, title, output, 'CSV files (*.csv);;All files (*)')
+        return inPath, outPath
+
+    # label + load button over an editable list, returns the edit box
+    def listEditor(self, label, row, col, colspan=1):
+        edit = QPlainTextEdit()
+        edit.setFont(getMonospaceFont())
+        loadButton = QPushButton('Load...')
+        loadButton.clicked.connect(lambda: self._loadFile(edit))
+
+        header = QHBoxLayout()
+        header.addWidget(QLabel(label))
+        header.addStretch(1)
+        header.addWidget(loadButton)
+        self.grid.addLayout(header,row,col,1,colspan)
+        self.grid.addWidget(edit,row+1,col,1,colspan)
+        return edit
+
+    def resultsTable(self, headers, row, colspan=2):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.horizontalHeader().setStyleSheet('::section {font-weight: bold; padding: 1px}')
+        table.verticalHeader().setStyleSheet('::section { padding: 0px 1px;}')
+        table.setAlternatingRowColors(True)
+        table.setCornerButtonEnabled(False)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.grid.addWidget(table,row,0,1,colspan)
+        return table
+
+    def fillTable(self, table, rows):
+        table.setRowCount(len(rows))
+        for r in range(len(rows)):
+            for c in range(len(rows[r])):
+                item = QTableWidgetItem(str(rows[r][c]))
                 item.setTextAlignment(QtCore.Qt.AlignCenter)
-                self.resultsTable.setItem(r, 1, item)
+                table.setItem(r, c, item)
+        table.resizeColumnsToContents()
 
-            self.resultsTable.resizeRowToContents(r)
-            r += 1
+    # parse an edit box as a prefix list, None (after telling the user) if it is bad
+    def prefixes(self, edit, name):
+        try:
+            return stcalc.parsePrefixList(edit.toPlainText().splitlines())
+        except ValueError as e:
+            QMessageBox.warning(self, self.windowTitle(), '{}: {}'.format(name, e))
+            return None
+
+    def _loadFile(self, edit):
+        path, filter = QFileDialog.getOpenFileName(self, 'Load List', '', 'Text files (*.txt *.csv);;All files (*)')
+        if path:
+            try:
+                with open(path) as f:
+                    edit.setPlainText(f.read())
+            except (OSError, UnicodeDecodeError) as e:
+                QMessageBox.warning(self, self.windowTitle(), str(e))
 
-        self.resultsTable.resizeColumnsToContents()
-        self.resultsTable.resizeRowsToContents()
 
+class MyJoinDialog(MyListDialog):
 
-    def _clearTable(self, rows):
-        self.resultsTable.setRowCount(rows)
+    def __init__(self, parent):
+        super().__init__(parent, 'Compare Prefix Lists')
 
-    def _updateAll(self):
-        self._updateAddrBlockRange()
-        self._updateUsage()
-        self._updateTable()
+        self.aEdit = self.listEditor('List A (e.g. planned subnets)', 0, 0)
+        self.bEdit = self.listEditor('List B (e.g. existing routes, empty = check A)', 0, 1)
+
+        self.compareButton = QPushButton('Compare')
+        self.compareButton.clicked.connect(self._compare)
+        self.grid.addWidget(self.compareButton,2,1)
+
+        self.summaryLabel = QLabel('')
+        self.grid.addWidget(self.summaryLabel,2,0)
+
+        self.table = self.resultsTable(('A', 'Relation', 'B'), 3)
+
+    def _compare(self):
+        a = self.prefixes(self.aEdit, 'List A')
+        b = self.prefixes(self.bEdit, 'List B')
+        if a is None or b is None:
+            return
+
+        if b:
+            pairs = stcalc.prefixJoin(a, b)
+            left, right = a, b
+            self.summaryLabel.setText('{} conflicts between {} and {} prefixes'.format(len(pairs), len(a), len(b)))
+        else:
+            pairs = stcalc.planOverlaps(a)
+            left, right = a, a
+            self.summaryLabel.setText('{} overlaps inside {} prefixes'.format(len(pairs), len(a)))
+
+        self.fillTable(self.table, [(stcalc.formatNetwork(*left[i]), relation, stcalc.formatNetwork(*right[j]))
+                                    for i, relation, j in pairs])
+
+
+class MyRangeDialog(MyListDialog):
+
+    def __init__(self, parent):
+        super().__init__(parent, 'Range to CIDR')
+
+        self.rangeEdit = self.listEditor('Ranges (first - last, start count, RIR delegated stats)', 0, 0)
+
+        self.cidrEdit = QPlainTextEdit()
+        self.cidrEdit.setFont(getMonospaceFont())
+        self.cidrEdit.setReadOnly(True)
+        self.grid.addWidget(QLabel('CIDR Blocks'),0,1)
+        self.grid.addWidget(self.cidrEdit,1,1)
+
+        self.summaryLabel = QLabel('')
+        self.grid.addWidget(self.summaryLabel,2,0)
+
+        buttons = QHBoxLayout()
+        self.fileButton = QPushButton('Convert File...')
+        self.fileButton.clicked.connect(self._convertFile)
+        buttons.addWidget(self.fileButton)
+        self.convertButton = QPushButton('Convert')
+        self.convertButton.clicked.connect(self._convert)
+        buttons.addWidget(self.convertButton)
+        self.grid.addLayout(buttons,2,1)
+
+    def _convert(self):
+        lines = self.rangeEdit.toPlainText().splitlines()
+        try:
+            blocks = [stcalc.formatNetwork(*block) for block in stcalc.rangesToCIDRs(lines)]
+        except ValueError as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+        self.cidrEdit.setPlainText('\n'.join(blocks))
+        self.summaryLabel.setText('{} CIDR blocks'.format(len(blocks)))
+
+    # large files stream straight from disk to disk
+    def _convertFile(self):
+        inPath, filter = QFileDialog.getOpenFileName(self, 'Range File', '', 'All files (*)')
+        if not inPath:
+            return
+        outPath, filter = QFileDialog.getSaveFileName(self, 'Save CIDR Blocks', inPath+'.cidr', 'All files (*)')
+        if not outPath:
+            return
+        try:
+            count = stcalc.convertRangeFile(inPath, outPath)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+        self.summaryLabel.setText('{} CIDR blocks written to {}'.format(count, os.path.basename(outPath)))
+
+
+class MyExcludeDialog(MyListDialog):
+
+    def __init__(self, parent, network):
+        super().__init__(parent, 'Exclude Prefixes')
+
+        self.grid.addWidget(QLabel('Address Block'),0,0)
+        self.blockLineEdit = QLineEdit(network)
+        self.grid.addWidget(self.blockLineEdit,1,0)
+
+        self.excludeEdit = self.listEditor('Prefixes to exclude', 2, 0)
+
+        self.summaryLabel = QLabel('')
+        self.grid.addWidget(self.summaryLabel,4,0)
+
+        self.calcButton = QPushButton('Calculate')
+        self.calcButton.clicked.connect(self._calculate)
+        self.grid.addWidget(self.calcButton,4,1)
+
+        self.table = self.resultsTable(('Remaining Block', 'Address Range'), 5)
+
+    def _calculate(self):
+        exclude = self.prefixes(self.excludeEdit, 'Exclude list')
+        if exclude is None:
+            return
+        try:
+            left = stcalc.excludePrefixes(self.blockLineEdit.text(), exclude)
+        except ValueError as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+
+        rows = []
+        for start, prefixlen in left.cidrs():
+            last = start + stcalc.blockSize(prefixlen, left.bits) - 1
+            rows.append((stcalc.formatNetwork(start, prefixlen, left.bits),
+                         stcalc.formatAddr(start, left.bits) + ' - ' + stcalc.formatAddr(last, left.bits)))
+            if (len(rows) > 1024):
+                break
+
+        self.fillTable(self.table, rows[:1024])
+        text = '{} addresses left in {} blocks'.format(left.size(), sum(1 for block in left.cidrs()))
+        if (len(rows) > 1024):
+            text += ' (first 1024 shown)'
+        self.summaryLabel.setText(text)
+
+
+class MyACLDialog(MyListDialog):
+
+    def __init__(self, parent):
+        super().__init__(parent, 'Wildcard ACL')
+
+        self.rangeEdit = self.listEditor('Addresses, ranges or prefixes', 0, 0)
+        self.aclEdit = self.listEditor('ACL (permit/deny address wildcard)', 0, 1)
+
+        options = QHBoxLayout()
+        self.contiguousCheckBox = QCheckBox('CIDR wildcards only')
+        options.addWidget(self.contiguousCheckBox)
+        self.generateButton = QPushButton('Generate ACL')
+        self.generateButton.clicked.connect(self._generate)
+        options.addWidget(self.generateButton)
+        self.grid.addLayout(options,2,0)
+
+        buttons = QHBoxLayout()
+        self.checkButton = QPushButton('Check ACL')
+        self.checkButton.clicked.connect(self._check)
+        buttons.addWidget(self.checkButton)
+        self.hitsButton = QPushButton('Count Hits...')
+        self.hitsButton.clicked.connect(self._countHits)
+        buttons.addWidget(self.hitsButton)
+        self.grid.addLayout(buttons,2,1)
+
+        self.summaryLabel = QLabel('')
+        self.grid.addWidget(self.summaryLabel,3,0,1,2)
+
+        self.table = self.resultsTable(('Entry', 'ACL Entry', 'Result', 'Detail'), 4)
+
+    # permit entries matching exactly the listed addresses
+    def _generate(self):
+        try:
+            ranges = list(stcalc.parseHostRanges(self.rangeEdit.toPlainText().splitlines()))
+            if any(bits != 32 for first, last, bits in ranges):
+                raise ValueError('wildcard ACLs are IPv4 only')
+        except ValueError as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+        ranges = [(first, last) for first, last, bits in ranges]
+        acl = stcalc.WildcardACL.fromRanges(ranges, contiguous=self.contiguousCheckBox.isChecked())
+        cidrs = sum(len(stcalc.rangeToCIDRs(first, last)) for first, last in stcalc.mergeRanges(ranges))
+        self.aclEdit.setPlainText('\n'.join(acl.lines()))
+        self.summaryLabel.setText('{} entries ({} as CIDR blocks)'.format(len(acl), cidrs))
+
+    # the ACL box as a WildcardACL, None (after telling the user) if it is bad
+    def _acl(self):
+        try:
+            return stcalc.WildcardACL.fromLines(self.aclEdit.toPlainText().splitlines())
+        except ValueError as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return None
+
+    def _check(self):
+        acl = self._acl()
+        if acl is None:
+            return
+        findings = acl.check()
+        lines = acl.lines()
+        rows = []
+        for index, kind, by in findings[:1024]:
+            detail = ('matched first by ' if kind == 'shadowed' else 'same result from ') + \
+                     ', '.join(str(entry+1) if entry < len(acl) else 'implicit deny' for entry in by[:8])
+            rows.append((index+1, lines[index], kind, detail + (', ...' if len(by) > 8 else '')))
+        self.fillTable(self.table, rows)
+        text = '{} of {} entries shadowed, {} redundant'.format(sum(1 for finding in findings if finding[1] == 'shadowed'),
+                                                               len(acl), sum(1 for finding in findings if finding[1] == 'redundant'))
+        if (len(findings) > 1024):
+            text += ' (first 1024 shown)'
+        self.summaryLabel.setText(text)
+
+    # match an address file against the ACL, hits per entry
+    def _countHits(self):
+        acl = self._acl()
+        if acl is None:
+            return
+        path, filter = QFileDialog.getOpenFileName(self, 'Address File', '', 'Text files (*.txt *.csv *.log);;All files (*)')
+        if not path:
+            return
+        try:
+            counts, skipped = stcalc.aclHitsFile(acl, path)
+        except OSError as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+        total = sum(counts) or 1
+        lines = acl.lines() + ['deny any (implicit)']
+        self.fillTable(self.table, [(index+1 if index < len(acl) else '', lines[index], count, '{:.1f}%'.format(100*count/total))
+                                    for index, count in enumerate(counts[:1024])])
+        self.summaryLabel.setText('{} addresses, {} permitted, {} lines skipped'.format(
+            sum(counts), sum(count for count, permit in zip(counts, acl.permits) if permit), skipped))
+
+
+class MyPrefixTableDialog(MyListDialog):
+
+    # route lookups against a memory-mapped binary prefix table
+    def __init__(self, parent):
+        super().__init__(parent, 'Prefix Table')
+        self.resize(520, 160)
+
+        self.table = None
+
+        self.openButton = QPushButton('Open Table...')
+        self.openButton.clicked.connect(self._open)
+        self.grid.addWidget(self.openButton,0,0)
+        self.convertButton = QPushButton('Convert Text List...')
+        self.convertButton.clicked.connect(self._convert)
+        self.grid.addWidget(self.convertButton,0,1)
+
+        self.tableLabel = QLabel('No table open')
+        self.grid.addWidget(self.tableLabel,1,0,1,2)
+
+        self.grid.addWidget(QLabel('Address'),2,0)
+        self.addrLineEdit = QLineEdit()
+        self.addrLineEdit.textChanged.connect(self._lookup)
+        self.grid.addWidget(self.addrLineEdit,3,0)
+        self.matchLineEdit = QLineEdit()
+        self.matchLineEdit.setReadOnly(True)
+        self.grid.addWidget(self.matchLineEdit,3,1)
+
+    def _open(self, path=None):
+        if not path:
+            path, filter = QFileDialog.getOpenFileName(self, 'Open Prefix Table', '', 'Prefix tables (*.stp);;All files (*)')
+            if not path:
+                return
+        try:
+            table = stcalc.PrefixFile(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+        if self.table:
+            self.table.close()
+        self.table = table
+        self.tableLabel.setText('{}: {} entries'.format(os.path.basename(path), len(table)))
+        self._lookup()
+
+    def _convert(self):
+        inPath, filter = QFileDialog.getOpenFileName(self, 'Prefix List', '', 'Text files (*.txt *.csv);;All files (*)')
+        if not inPath:
+            return
+        outPath, filter = QFileDialog.getSaveFileName(self, 'Save Prefix Table', os.path.splitext(inPath)[0]+'.stp', 'Prefix tables (*.stp)')
+        if not outPath:
+            return
+        try:
+            stcalc.writePrefixTable(outPath, stcalc.loadPrefixes(inPath))
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+        self._open(outPath)
+
+    def _lookup(self):
+        self.matchLineEdit.clear()
+        if not (self.table and self.addrLineEdit.text()):
+            return
+        try:
+            addr, bits = stcalc.parseAddr(self.addrLineEdit.text())
+        except ValueError:
+            return
+        if (bits != self.table.bits):
+            return
+
+        if (self.table.kind == stcalc.KIND_SET):
+            self.matchLineEdit.setText('in set' if addr in self.table else 'not in set')
+            return
+        index = self.table.longestMatch(addr)
+        if index is None:
+            self.matchLineEdit.setText('no match')
+        else:
+            self.matchLineEdit.setText(stcalc.formatNetwork(*self.table[index]))
+
+    def done(self, result):
+        if self.table:
+            self.table.close()
+            self.table = None
+        super().done(result)
+
+
+class MyDiffModel(QAbstractTableModel):
+
+    # virtual table over plan diff records, cells are formatted on demand
+    headers = ('Change', 'Old', 'New', 'Label')
+
+    def __init__(self, records=()):
+        super().__init__()
+        self.records = list(records)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return len(self.records)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if (role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal):
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if (role == QtCore.Qt.TextAlignmentRole):
+            return QtCore.Qt.AlignCenter
+        if (role != QtCore.Qt.DisplayRole):
+            return None
+        kind, oldRows, newRows = self.records[index.row()]
+        column = index.column()
+        if (column == 0):
+            return kind
+        if (column == 1):
+            return stcalc.formatPlanRows(oldRows)
+        if (column == 2):
+            return stcalc.formatPlanRows(newRows)
+        return stcalc.planDiffLabel(kind, oldRows, newRows)
+
+
+class MyPlanDiffDialog(MyListDialog):
+
+    def __init__(self, parent):
+        super().__init__(parent, 'Diff Addressing Plans')
+
+        self.oldEdit = self.listEditor('Old plan (prefix [label] per line)', 0, 0)
+        self.newEdit = self.listEditor('New plan', 0, 1)
+
+        self.summaryLabel = QLabel('')
+        self.grid.addWidget(self.summaryLabel,2,0)
+
+        buttons = QHBoxLayout()
+        self.filesButton = QPushButton('Diff Files...')
+        self.filesButton.clicked.connect(self._diffFiles)
+        buttons.addWidget(self.filesButton)
+        self.diffButton = QPushButton('Diff')
+        self.diffButton.clicked.connect(self._diff)
+        buttons.addWidget(self.diffButton)
+        self.grid.addLayout(buttons,2,1)
+
+        self.model = MyDiffModel()
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setAlternatingRowColors(True)
+        self.table.horizontalHeader().setStyleSheet('::section {font-weight: bold; padding: 1px}')
+        self.table.verticalHeader().setDefaultSectionSize(18)
+        self.grid.addWidget(self.table,3,0,1,2)
+
+    def _show(self, records, counts=None):
+        self.model.beginResetModel()
+        self.model.records = records
+        self.model.endResetModel()
+        self.table.resizeColumnsToContents()
+
+        if counts is None:
+            counts = {}
+            for record in records:
+                counts[record[0]] = counts.get(record[0], 0) + 1
+        self.summaryLabel.setText(', '.join('{} {}'.format(counts[kind], kind) for kind in sorted(counts)) or 'No changes')
+
+    def _diff(self):
+        try:
+            old = stcalc.parsePlan(self.oldEdit.toPlainText().splitlines())
+            new = stcalc.parsePlan(self.newEdit.toPlainText().splitlines())
+        except ValueError as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+        self._show(list(stcalc.planDiff(old, new)))
+
+    # large plans: diff two files straight to a CSV, then view it
+    def _diffFiles(self):
+        oldPath, filter = QFileDialog.getOpenFileName(self, 'Old Plan', '', 'All files (*)')
+        if not oldPath:
+            return
+        newPath, filter = QFileDialog.getOpenFileName(self, 'New Plan', os.path.dirname(oldPath), 'All files (*)')
+        if not newPath:
+            return
+        outPath, filter = QFileDialog.getSaveFileName(self, 'Save Diff', os.path.splitext(newPath)[0]+'-diff.csv', 'CSV files (*.csv)')
+        if not outPath:
+            return
+        try:
+            records = list(stcalc.planDiff(stcalc.loadPlan(oldPath), stcalc.loadPlan(newPath)))
+            counts = stcalc.writePlanDiff(records, outPath)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+        self._show(records, counts)
+
+
+class MyClusterDialog(MyListDialog):
+
+    def __init__(self, parent):
+        super().__init__(parent, 'Cluster Observed Hosts')
+
+        self.hostEdit = self.listEditor('Observed host addresses', 0, 0, 2)
+
+        self.grid.addWidget(QLabel('Waste Budget (addresses)'),2,0)
+        self.wasteLineEdit = QLineEdit('0')
+        self.wasteLineEdit.setValidator(QRegExpValidator(QRegExp(r'\d*'), self.wasteLineEdit))
+        self.grid.addWidget(self.wasteLineEdit,3,0)
+
+        self.grid.addWidget(QLabel('Max Prefixes (empty = no cap)'),2,1)
+        self.maxLineEdit = QLineEdit('')
+        self.maxLineEdit.setValidator(QRegExpValidator(QRegExp(r'\d*'), self.maxLineEdit))
+        self.grid.addWidget(self.maxLineEdit,3,1)
+
+        self.summaryLabel = QLabel('')
+        self.grid.addWidget(self.summaryLabel,4,0)
+        self.clusterButton = QPushButton('Cluster')
+        self.clusterButton.clicked.connect(self._cluster)
+        self.grid.addWidget(self.clusterButton,4,1)
+
+        self.table = self.resultsTable(('Prefix', 'Observed', 'Unobserved'), 5)
+
+    def _cluster(self):
+        try:
+            ranges = list(stcalc.parseHostRanges(self.hostEdit.toPlainText().splitlines()))
+        except ValueError as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+        bits = ranges[0][2] if ranges else 32
+
+        waste = int(self.wasteLineEdit.text() or 0)
+        maxPrefixes = int(self.maxLineEdit.text()) if self.maxLineEdit.text() else None
+        clusters = stcalc.clusterRanges([(first, last) for first, last, rbits in ranges if rbits == bits], bits, waste, maxPrefixes)
+
+        rows = [(stcalc.formatNetwork(start, prefixlen, bits), observed, stcalc.blockSize(prefixlen, bits)-observed)
+                for start, prefixlen, observed in clusters]
+        self.fillTable(self.table, rows)
+        self.summaryLabel.setText('{} prefixes, {} unobserved addresses'.format(len(rows), sum(row[2] for row in rows)))
+
+
+class MyHeavyHittersDialog(MyListDialog):
+
+    def __init__(self, parent):
+        super().__init__(parent, 'Heavy Hitter Prefixes')
+
+        self.hitters = {}
+        self.hierarchical = set()
+
+        self.loadButton = QPushButton('Load Log File...')
+        self.loadButton.clicked.connect(self._loadLog)
+        self.grid.addWidget(self.loadButton,0,0)
+
+        self.familyComboBox = QComboBox()
+        self.familyComboBox.addItems(('IPv4', 'IPv6'))
+        self.familyComboBox.activated.connect(self._fillTree)
+        self.grid.addWidget(self.familyComboBox,0,1)
+
+        self.topComboBox = QComboBox()
+        self.topComboBox.addItems(('10', '20', '50', '100'))
+        self.topComboBox.activated.connect(self._fillTree)
+        self.grid.addWidget(self.topComboBox,0,2)
+
+        self.summaryLabel = QLabel('')
+        self.grid.addWidget(self.summaryLabel,1,0,1,3)
+
+        # drill-down tree, laid out like the CIDR route table
+        self.tree = QTreeWidget()
+        self.tree.setHeaderLabels(('Route', 'Address Range', 'Count', 'Share'))
+        self.tree.header().setStyleSheet('::section {font-weight: bold; padding: 1px}')
+        self.tree.setAlternatingRowColors(True)
+        self.tree.itemExpanded.connect(self._expand)
+        self.grid.addWidget(self.tree,2,0,1,3)
+
+    def _loadLog(self):
+        path, filter = QFileDialog.getOpenFileName(self, 'Load Log File', '', 'Text and log files (*.txt *.csv *.log);;All files (*)')
+        if not path:
+            return
+        try:
+            hitters4, hitters6 = stcalc.heavyHittersFile(path)
+        except OSError as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+        self.hitters = {'IPv4': hitters4, 'IPv6': hitters6}
+        self.familyComboBox.setCurrentIndex(0 if hitters4.total or not hitters6.total else 1)
+        self._fillTree()
+
+    def _item(self, hitters, start, prefixlen, count):
+        end = start + stcalc.blockSize(prefixlen, hitters.bits) - 1
+        item = QTreeWidgetItem((stcalc.formatNetwork(start, prefixlen, hitters.bits),
+                                stcalc.formatAddr(start, hitters.bits) + ' - ' + stcalc.formatAddr(end, hitters.bits),
+                                str(count), '{:.1%}'.format(count / hitters.total)))
+        for c in range(4):
+            item.setTextAlignment(c, QtCore.Qt.AlignCenter)
+        if (start, prefixlen) in self.hierarchical:
+            font = item.font(0)
+            font.setBold(True)
+            item.setFont(0, font)
+        item.setData(0, QtCore.Qt.UserRole, (start, prefixlen))
+        if (prefixlen != hitters.levels[-1]):
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+        return item
+
+    def _fillTree(self):
+        self.tree.clear()
+        hitters = self.hitters.get(self.familyComboBox.currentText())
+        if not (hitters and hitters.total):
+            self.summaryLabel.setText('No addresses' if hitters else '')
+            return
+
+        # bold rows are hierarchical heavy hitters: >= 1% after removing the hitters below them
+        self.hierarchical = {(start, prefixlen) for start, prefixlen, count, residual in hitters.hierarchical(hitters.total / 100)}
+        top = int(self.topComboBox.currentText())
+        prefixlen = hitters.levels[0]
+        for start, count in hitters.top(prefixlen, top):
+            self.tree.addTopLevelItem(self._item(hitters, start, prefixlen, count))
+        for c in range(4):
+            self.tree.resizeColumnToContents(c)
+        self.summaryLabel.setText('{} addresses, counts may be high by up to {}'.format(
+            hitters.total, max(hitters.error(level) for level in hitters.levels)))
+
+    def _expand(self, item):
+        if item.childCount():
+            return
+        hitters = self.hitters[self.familyComboBox.currentText()]
+        start, prefixlen = item.data(0, QtCore.Qt.UserRole)
+        childlen = hitters.levels[hitters.levels.index(prefixlen) + 1]
+        for child, count in hitters.children(start, prefixlen, int(self.topComboBox.currentText())):
+            item.addChild(self._item(hitters, child, childlen, count))
+        if not item.childCount():
+            item.setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicator)
+
+
+class MyMulticastDialog(MyListDialog):
+
+    def __init__(self, parent):
+        super().__init__(parent, 'Multicast MAC Collisions')
+
+        self.groupEdit = self.listEditor('Multicast groups (addresses, ranges or CIDRs)', 0, 0, 2)
+
+        self.summaryLabel = QLabel('')
+        self.grid.addWidget(self.summaryLabel,2,0)
+        self.checkButton = QPushButton('Check')
+        self.checkButton.clicked.connect(self._check)
+        self.grid.addWidget(self.checkButton,2,1)
+
+        self.table = self.resultsTable(('MAC', 'Groups', 'Group Addresses'), 3)
+
+    def _check(self):
+        try:
+            ranges = list(stcalc.parseHostRanges(self.groupEdit.toPlainText().splitlines()))
+        except ValueError as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+        bits = ranges[0][2] if ranges else 32
+
+        # worked out on the ranges, so 224.0.0.0/4 or ff00::/8 cost no more than a few groups
+        collisions, macs, groups, skipped = stcalc.multicastRangeCollisions(
+            [(first, last) for first, last, rbits in ranges if rbits == bits], bits)
+        rows = []
+        for mac, count, shared in collisions:
+            names = ', '.join(stcalc.formatAddr(group, bits) for group in shared)
+            rows.append((stcalc.formatMAC(mac), count, names + (', ...' if count > len(shared) else '')))
+        self.fillTable(self.table, rows)
+        text = '{} MACs shared by {} groups, {} non-multicast skipped'.format(macs, groups, skipped)
+        if (macs > len(rows)):
+            text += ' (first {} shown)'.format(len(rows))
+        self.summaryLabel.setText(text)
+
+
+class MyDelegationDialog(MyListDialog):
+
+    def __init__(self, parent):
+        super().__init__(parent, 'IPv6 Prefix Delegation')
+        self.resize(560, 260)
+
+        self.pool = None
+
+        # provider block and delegation size
+        self.grid.addWidget(QLabel('Provider Block'),0,0)
+        self.blockLineEdit = QLineEdit('2001:db8::/32')
+        self.grid.addWidget(self.blockLineEdit,1,0)
+        self.grid.addWidget(QLabel('Delegation Size'),0,1)
+        self.sizeComboBox = QComboBox()
+        self.sizeComboBox.addItems(['/48', '/52', '/56', '/60', '/64'])
+        self.sizeComboBox.setCurrentIndex(2)
+        self.grid.addWidget(self.sizeComboBox,1,1)
+
+        poolLayout = QHBoxLayout()
+        for text, slot in (('New Pool', self._newPool), ('Open...', self._open), ('Save...', self._save), ('Bulk Allocate...', self._bulk)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            poolLayout.addWidget(button)
+        self.grid.addLayout(poolLayout,2,0,1,2)
+
+        # one customer at a time
+        self.grid.addWidget(QLabel('Customer ID'),3,0,1,2)
+        self.customerLineEdit = QLineEdit()
+        self.grid.addWidget(self.customerLineEdit,4,0,1,2)
+        customerLayout = QHBoxLayout()
+        for text, slot in (('Allocate', self._allocate), ('Release', self._release), ('Lookup', self._lookup)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            customerLayout.addWidget(button)
+        self.grid.addLayout(customerLayout,5,0,1,2)
+
+        self.resultLineEdit = QLineEdit()
+        self.resultLineEdit.setReadOnly(True)
+        self.grid.addWidget(self.resultLineEdit,6,0,1,2)
+        self.statusLabel = QLabel('')
+        self.grid.addWidget(self.statusLabel,7,0,1,2)
+
+        self._newPool()
+
+    def _updateStatus(self):
+        used, total = self.pool.utilization()
+        self.statusLabel.setText('{}: {} of {} /{} delegated ({:.2%})'.format(
+            self.pool.network(), used, total, self.pool.delegationlen, used / total))
+
+    def _newPool(self):
+        try:
+            self.pool = stcalc.DelegationPool(self.blockLineEdit.text().strip(), int(self.sizeComboBox.currentText()[1:]))
+        except ValueError as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+        self._updateStatus()
+
+    def _customer(self):
+        customer = self.customerLineEdit.text().strip()
+        if not customer:
+            QMessageBox.warning(self, self.windowTitle(), 'Enter a customer ID')
+        return customer
+
+    def _allocate(self):
+        customer = self._customer()
+        if customer:
+            start = self.pool.allocate(customer)
+            self.resultLineEdit.setText('Pool is full' if start is None else stcalc.formatNetwork(start, self.pool.delegationlen, self.pool.bits))
+            self._updateStatus()
+
+    def _release(self):
+        customer = self._customer()
+        if customer:
+            self.resultLineEdit.setText('Released' if self.pool.release(customer) else 'No delegation for ' + customer)
+            self._updateStatus()
+
+    def _lookup(self):
+        customer = self._customer()
+        if customer:
+            start = self.pool.lookup(customer)
+            self.resultLineEdit.setText('No delegation for ' + customer if start is None else stcalc.formatNetwork(start, self.pool.delegationlen, self.pool.bits))
+
+    # one customer ID per line
+    def _bulk(self):
+        path, filter = QFileDialog.getOpenFileName(self, 'Bulk Allocate', '', 'Text files (*.txt *.csv);;All files (*)')
+        if not path:
+            return
+        try:
+            with open(path) as f:
+                customers = [line.strip() for line in f if line.strip()]
+        except (OSError, UnicodeDecodeError) as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+        done = self.pool.allocateMany(customers)
+        self.resultLineEdit.setText('{} new delegations'.format(done))
+        self._updateStatus()
+
+    def _open(self):
+        path, filter = QFileDialog.getOpenFileName(self, 'Open Pool', '', 'Delegation pools (*.stp);;All files (*)')
+        if not path:
+            return
+        try:
+            self.pool = stcalc.DelegationPool.load(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+        self.blockLineEdit.setText(self.pool.network())
+        self.sizeComboBox.setCurrentText('/{}'.format(self.pool.delegationlen))
+        self._updateStatus()
+
+    def _save(self):
+        path, filter = QFileDialog.getSaveFileName(self, 'Save Pool', 'pool.stp', 'Delegation pools (*.stp);;All files (*)')
+        if path:
+            try:
+                self.pool.save(path)
+            except (OSError, ValueError) as e:
+                QMessageBox.warning(self, self.windowTitle(), str(e))
+
+
+class MySlaacDialog(MyListDialog):
+
+    def __init__(self, parent):
+        super().__init__(parent, 'SLAAC / EUI-64')
+        self.resize(480, 160)
+
+        self.grid.addWidget(QLabel('/64 Prefix'),0,0,1,2)
+        self.prefixLineEdit = QLineEdit('2001:db8::/64')
+        self.grid.addWidget(self.prefixLineEdit,1,0,1,2)
+
+        self.slaacButton = QPushButton('MAC List to Addresses...')
+        self.slaacButton.clicked.connect(self._slaac)
+        self.grid.addWidget(self.slaacButton,2,0)
+        self.macButton = QPushButton('Address List to MACs...')
+        self.macButton.clicked.connect(self._macs)
+        self.grid.addWidget(self.macButton,2,1)
+
+        self.statusLabel = QLabel('')
+        self.grid.addWidget(self.statusLabel,3,0,1,2)
+
+    def _slaac(self):
+        try:
+            start, prefixlen, bits = stcalc.parseNetwork(self.prefixLineEdit.text())
+        except ValueError as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return
+        if (bits != 128 or prefixlen > 64):
+            QMessageBox.warning(self, self.windowTitle(), 'SLAAC needs an IPv6 prefix of /64 or shorter')
+            return
+        inPath, outPath = self._paths('MAC List to Addresses', 'slaac.csv')
+        if outPath:
+            try:
+                written, skipped = stcalc.slaacFile(inPath, outPath, start)
+            except (OSError, UnicodeDecodeError) as e:
+                QMessageBox.warning(self, self.windowTitle(), str(e))
+                return
+            self.statusLabel.setText('{} addresses written, {} lines skipped'.format(written, skipped))
+
+    def _macs(self):
+        inPath, outPath = self._paths('Address List to MACs', 'macs.csv')
+        if outPath:
+            try:
+                written, skipped = stcalc.macFile(inPath, outPath)
+            except (OSError, UnicodeDecodeError) as e:
+                QMessageBox.warning(self, self.windowTitle(), str(e))
+                return
+            self.statusLabel.setText('{} addresses written, {} lines skipped'.format(written, skipped))
+
+class MyEmbeddingDialog(MyListDialog):
+
+    defaultPrefixes = {'mapped': '::ffff:0:0/96', 'compatible': '::/96', 'nat64': '64:ff9b::/96', 'teredo': '2001::/32',
+                       '6to4': '2002::/16', '6over4': 'fe80::/64', 'isatap': 'fe80::/64'}
+
+    def __init__(self, parent):
+        super().__init__(parent, 'IPv4 Embedding')
+        self.resize(480, 200)
+
+        self.grid.addWidget(QLabel('Embedding'),0,0)
+        self.kindComboBox = QComboBox()
+        self.kindComboBox.addItems(list(stcalc.EMBEDDINGS))
+        self.kindComboBox.setCurrentText('nat64')
+        self.kindComboBox.currentTextChanged.connect(lambda kind: self.prefixLineEdit.setText(self.defaultPrefixes[kind]))
+        self.grid.addWidget(self.kindComboBox,1,0)
+        self.grid.addWidget(QLabel('Prefix'),0,1)
+        self.prefixLineEdit = QLineEdit(self.defaultPrefixes['nat64'])
+        self.grid.addWidget(self.prefixLineEdit,1,1)
+
+        self.embedButton = QPushButton('IPv4 List to IPv6...')
+        self.embedButton.clicked.connect(self._embed)
+        self.grid.addWidget(self.embedButton,2,0)
+        self.extractButton = QPushButton('IPv6 List to IPv4...')
+        self.extractButton.clicked.connect(self._extract)
+        self.grid.addWidget(self.extractButton,2,1)
+
+        self.statusLabel = QLabel('')
+        self.grid.addWidget(self.statusLabel,3,0,1,2)
+
+    # (kind, prefix, prefix length) or None after a warning
+    def _embedding(self):
+        kind = self.kindComboBox.currentText()
+        try:
+            start, prefixlen, bits = stcalc.parseNetwork(self.prefixLineEdit.text() or '::/96')
+            if (bits != 128):
+                raise ValueError('the prefix must be IPv6')
+            stcalc.embedIPv4(0, kind, start, prefixlen if kind == 'nat64' else 96)
+        except ValueError as e:
+            QMessageBox.warning(self, self.windowTitle(), str(e))
+            return None
+        return kind, start, prefixlen if kind == 'nat64' else 96
+
+    def _embed(self):
+        embedding = self._embedding()
+        if embedding:
+            inPath, outPath = self._paths('IPv4 List to IPv6', embedding[0] + '.csv')
+            if outPath:
+                try:
+                    written, skipped = stcalc.embedFile(inPath, outPath, *embedding)
+                except (OSError, UnicodeDecodeError) as e:
+                    QMessageBox.warning(self, self.windowTitle(), str(e))
+                    return
+                self.statusLabel.setText('{} addresses written, {} lines skipped'.format(written, skipped))
+
+    def _extract(self):
+        embedding = self._embedding()
+        if embedding:
+            inPath, outPath = self._paths('IPv6 List to IPv4', 'ipv4.csv')
+            if outPath:
+                try:
+                    written, skipped = stcalc.extractIPv4File(inPath, outPath, *embedding)
+                except (OSError, UnicodeDecodeError) as e:
+                    QMessageBox.warning(self, self.windowTitle(), str(e))
+                    return
+                self.statusLabel.setText('{} addresses written, {} lines skipped'.format(written, skipped))
 
 
 class MyTabWidget(QWidget):
@@ -2272,6 +3908,12 @@ class MyTabWidget(QWidget):
         self.tabConversions = MyConversionsTab(self)
         self.tabs.addTab(self.tabConversions,'Conversions')
 
+        self.tabMap = MyMapTab(self)
+        self.tabs.addTab(self.tabMap,'Map')
+
+        self.tabTree = MyTreeTab(self)
+        self.tabs.addTab(self.tabTree,'Tree')
+
         self.tabs.setCurrentIndex(1)
 
         # Add tabs to widget
@@ -2290,20 +3932,18 @@ class MyTabWidget(QWidget):
 def ipValid(ip):
     return re.match(r'^(25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])\.(25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])\.(25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])\.(25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])$', ip)
 
-def ipv6Valid(ip):
-    #print ('ipaddr',ip)
-    match = re.search(r'^([a-fA-F0-9:]+)[\/ ]?',ip)
-    if match:
-        #print ('ipaddr', match.group(1))
-        ip = match.group(1)
-    else:
-        return
-
+# int of the address in 'addr', 'addr/len' or 'addr comment' text, or None
+def ipv6Parse(ip):
+    fields = ip.split('/')[0].split()
+    if not fields:
+        return None
     try:
-        ipaddress.ip_address(ip)
-        return True
-    except:
-        return False
+        return stcalc.parseIPv6(fields[0])
+    except ValueError:
+        return None
+
+def ipv6Valid(ip):
+    return ipv6Parse(ip) is not None
 
 def IP2Int(ip):
     o = [int(x) for x in ip.split('.')]
@@ -2325,12 +3965,7 @@ def Int2HexIP(ipnum):
     return '%(o1)s.%(o2)s.%(o3)s.%(o4)s' % locals()
 
 def wildcard_conversion(subnet):
-    wildcard = []
-    for x in subnet.split('.'):
-        component = 255 - int(x)
-        wildcard.append(str(component))
-    wildcard = '.'.join(wildcard)
-    return wildcard
+    return stcalc.formatAddr(stcalc.parseIPv4(subnet) ^ stcalc.ALL_BITS)
 
 def getBits(addr, mask):
 
@@ -2424,6 +4059,42 @@ def getSettings():
 
     return top,left,width,height,tab,darkMode
     
+# save a subnet table as CSV; whole splits are regenerated and formatted by
+# a pool of processes instead of from the table
+def exportSubnetTable(parent, table):
+    path, filter = QFileDialog.getSaveFileName(parent, 'Export Table', 'subnets.csv', 'CSV files (*.csv);;All files (*)')
+    if not path:
+        return
+    try:
+        if table.source:
+            stcalc.splitFile(*table.source, path)
+        else:
+            table.writeCSV(path)
+    except OSError as e:
+        QMessageBox.warning(parent, 'Export Table', str(e))
+
+# ask for a directory, PTR name template and name servers, then stream the
+# reverse zone files for network into it
+def exportReverseZones(parent, network):
+    directory = QFileDialog.getExistingDirectory(parent, 'Reverse Zone Directory for '+network)
+    if not directory:
+        return
+    template, ok = QInputDialog.getText(parent, 'Reverse DNS Zone', 'PTR name ({dashed} = address, {index} = offset):',
+                                        QLineEdit.Normal, 'host-{dashed}.example.com.')
+    if not ok:
+        return
+    nameservers, ok = QInputDialog.getText(parent, 'Reverse DNS Zone', 'Name servers:', QLineEdit.Normal, 'ns1.example.com.')
+    if not ok:
+        return
+
+    try:
+        # zones over 65536 addresses (IPv6 mostly) only get SOA/NS records
+        files = stcalc.writeReverseZones(network, directory, template, nameservers.split(), maxHosts=65536)
+    except (OSError, ValueError, KeyError, IndexError) as e:
+        QMessageBox.warning(parent, 'Reverse DNS Zone', str(e))
+        return
+    QMessageBox.information(parent, 'Reverse DNS Zone', 'Wrote {} file(s) to {}:\n{}'.format(len(files), directory, '\n'.join(files[:20])))
+
 def getMonospaceFont():
     preferred = ['Consolas', 'DejaVu Sans Mono', 'Monospace', 'Lucida Console', 'Monaco']
     for name in preferred:
@@ -0,0 +1,3111 @@
+#! /usr/bin/python3
+
+# stcalc - calculation engines behind the Subnet Transmogrifier tabs
+#
+# Everything in here works on plain integers and has no Qt dependency, so it
+# can be imported headless from scripts, batch jobs and worker processes.
+# st.py imports it for the GUI; run it directly to process a JSON-lines file
+# of batch jobs (python3 stcalc.py jobs.jsonl results.jsonl).
+
+import bisect
+import collections
+import csv
+import datetime
+import functools
+import heapq
+import io
+import ipaddress
+import itertools
+import json
+import mmap
+import multiprocessing
+import operator
+import os
+import re
+import shutil
+import struct
+import sys
+import time
+from array import array
+
+#-----------------
+# address helpers
+#-----------------
+
+# parse 'a.b.c.d/n' or 'x::/n' into (network int, prefix length, address bits)
+def parseNetwork(text, strict=False):
+    net = ipaddress.ip_network(text.strip(), strict=strict)
+    return int(net.network_address), net.prefixlen, net.max_prefixlen
+
+_dottedQuad = re.compile(r'(0|[1-9][0-9]{0,2})\.(0|[1-9][0-9]{0,2})\.(0|[1-9][0-9]{0,2})\.(0|[1-9][0-9]{0,2})')
+
+# dotted quad to int without building ipaddress objects, raises ValueError;
+# ASCII decimal octets without leading zeros, as ipaddress takes them
+def parseIPv4(text):
+    match = _dottedQuad.fullmatch(text)
+    if match is None:
+        raise ValueError('{!r} is not an IPv4 address'.format(text))
+    value = 0
+    for octet in map(int, match.groups()):
+        if (octet > 255):
+            raise ValueError('{!r} is not an IPv4 address'.format(text))
+        value = (value << 8) | octet
+    return value
+
+# address text to (int, bits)
+def parseAddr(text):
+    text = text.strip()
+    if ':' in text:
+        return parseIPv6(text), 128
+    return parseIPv4(text), 32
+
+def formatAddr(value, bits=32):
+    if (bits == 32):
+        return '{}.{}.{}.{}'.format(value >> 24, (value >> 16) & 255, (value >> 8) & 255, value & 255)
+    return formatIPv6(value)
+
+def formatNetwork(start, prefixlen, bits=32):
+    return '{}/{}'.format(formatAddr(start, bits), prefixlen)
+
+# text for a whole column of addresses; IPv4 goes through struct and
+# str.format without a Python call per value
+def formatAddrs(values, bits=32):
+    if (bits == 128):
+        return formatIPv6Many(values)
+    column = array('I', values)
+    if (sys.byteorder == 'little'):
+        column.byteswap()
+    return list(itertools.starmap('{}.{}.{}.{}'.format, struct.iter_unpack('4B', column.tobytes())))
+
+def blockSize(prefixlen, bits=32):
+    return 1 << (bits - prefixlen)
+
+# compact column of addresses: 4 bytes per IPv4 value, plain ints for IPv6
+def intArray(bits=32, values=()):
+    if (bits == 32):
+        return array('I', values)
+    return list(values)
+
+
+#-----------
+# IPv6 text
+#-----------
+
+# parsing and RFC 5952 formatting straight on 128-bit ints: the text is
+# validated with one regex, split with str methods and converted with a
+# single int(..., 16), which is several times faster than building
+# ipaddress.IPv6Address objects
+
+_ipv6Chars = re.compile('[0-9a-fA-F:]+')
+_four = itertools.repeat(4)
+_eightGroups = struct.Struct('>8H')
+_fullGroups = ':{:x}:{:x}:{:x}:{:x}:{:x}:{:x}:{:x}:{:x}:'.format
+_explodedGroups = ':'.join(['{:04x}'] * 8).format
+_zeroRuns = tuple(':' + '0:'*count for count in range(8, 1, -1))
+
+def _badIPv6(text):
+    return ValueError('{!r} is not an IPv6 address'.format(text))
+
+# IPv6 text without a zone to int
+def _ipv6Int(text):
+    original = text
+    if '.' in text:
+        head, colon, tail = text.rpartition(':')
+        if not colon:
+            raise _badIPv6(original)
+        try:
+            v4 = parseIPv4(tail)
+        except ValueError:
+            raise _badIPv6(original) from None
+        text = '{}:{:x}:{:x}'.format(head, v4 >> 16, v4 & 0xFFFF)
+    if not _ipv6Chars.fullmatch(text):
+        raise _badIPv6(original)
+
+    left, compressed, right = text.partition('::')
+    if compressed:
+        leftGroups = left.split(':') if left else []
+        rightGroups = right.split(':') if right else []
+        fill = 8 - len(leftGroups) - len(rightGroups)
+        if (fill < 1 or '' in leftGroups or '' in rightGroups):
+            raise _badIPv6(original)
+        digits = ''.join(map(str.zfill, leftGroups, _four)) + '0000'*fill + ''.join(map(str.zfill, rightGroups, _four))
+    else:
+        groups = text.split(':')
+        if (len(groups) != 8 or '' in groups):
+            raise _badIPv6(original)
+        digits = ''.join(map(str.zfill, groups, _four))
+    if (len(digits) != 32):
+        raise _badIPv6(original)
+    return int(digits, 16)
+
+# IPv6 text (compressed, exploded, with an IPv4 tail or a %zone) to (int, zone or None)
+def parseIPv6Zone(text):
+    text, percent, zone = text.strip().partition('%')
+    if (percent and not zone):
+        raise _badIPv6(text + percent)
+    return _ipv6Int(text), zone if percent else None
+
+# IPv6 text to int, dropping any zone ID; raises ValueError
+def parseIPv6(text):
+    return parseIPv6Zone(text)[0]
+
+def _parseIPv6OrNone(text):
+    try:
+        return parseIPv6Zone(text)[0]
+    except ValueError:
+        return None
+
+# list of ints for a batch of IPv6 texts, None for the invalid ones
+def parseIPv6Many(texts):
+    texts = texts if isinstance(texts, list) else list(texts)
+    try:
+        return list(map(parseIPv6, texts))
+    except ValueError:
+        return list(map(_parseIPv6OrNone, texts))
+
+# longest (first on ties) run of two or more zero groups becomes '::'
+def _compress(full):
+    for run in _zeroRuns:
+        if run in full:
+            full = full.replace(run, '::', 1)
+            break
+    return full[(0 if full.startswith('::') else 1):(None if full.endswith('::') else -1)]
+
+# RFC 5952 text; IPv4-mapped addresses get the mixed ::ffff:a.b.c.d form
+# unless mixed is False
+def formatIPv6(value, zone=None, mixed=True):
+    if (mixed and value >> 32 == 0xFFFF):
+        text = '::ffff:' + formatAddr(value & 0xFFFFFFFF)
+    else:
+        text = _compress(_fullGroups(*_eightGroups.unpack(value.to_bytes(16, 'big'))))
+    return text if zone is None else text + '%' + zone
+
+def explodeIPv6(value):
+    return _explodedGroups(*_eightGroups.unpack(value.to_bytes(16, 'big')))
+
+def _packIPv6(values):
+    return b''.join(map(operator.methodcaller('to_bytes', 16, 'big'), values))
+
+def formatIPv6Many(values, mixed=True):
+    values = values if isinstance(values, list) else list(values)
+    texts = list(map(_compress, itertools.starmap(_fullGroups, _eightGroups.iter_unpack(_packIPv6(values)))))
+    if mixed:
+        for index in itertools.compress(itertools.count(), map(0xFFFF.__eq__, map(operator.rshift, values, itertools.repeat(32)))):
+            texts[index] = '::ffff:' + formatAddr(values[index] & 0xFFFFFFFF)
+    return texts
+
+def explodeIPv6Many(values):
+    return list(itertools.starmap(_explodedGroups, _eightGroups.iter_unpack(_packIPv6(values))))
+
+
+#------------------------
+# prefix length metadata
+#------------------------
+
+# everything the tabs show about a prefix length, built once at import.
+# hosts leaves out the network and broadcast addresses of IPv4 blocks up
+# to /30; /31 and /32 (RFC 3021) and IPv6 blocks count every address.
+# Counts of 2^48 and up are shown as powers of two.
+PrefixInfo = collections.namedtuple('PrefixInfo',
+    'prefixlen bits mask wildcard size hosts maskText wildcardText sizeText hostsText label')
+
+def _countText(count):
+    return str(count) if count < 1 << 48 else '2^{}'.format(count.bit_length() - 1)
+
+def _prefixTable(bits):
+    table = []
+    for prefixlen in range(bits + 1):
+        size = blockSize(prefixlen, bits)
+        wildcard = size - 1
+        mask = ((1 << bits) - 1) ^ wildcard
+        hosts = size - 2 if (bits == 32 and prefixlen < 31) else size
+        maskText = formatAddr(mask, bits)
+        table.append(PrefixInfo(prefixlen, bits, mask, wildcard, size, hosts, maskText, formatAddr(wildcard, bits),
+                                _countText(size), _countText(hosts), '{}  (/{})'.format(maskText, prefixlen)))
+    return tuple(table)
+
+PREFIXES4 = _prefixTable(32)
+PREFIXES6 = _prefixTable(128)
+PREFIXES = {32: PREFIXES4, 128: PREFIXES6}
+
+_maskPrefixlens = {(info.bits, info.mask): info.prefixlen for info in PREFIXES4 + PREFIXES6}
+
+def prefixInfo(prefixlen, bits=32):
+    return PREFIXES[bits][prefixlen]
+
+# prefix length of a netmask int or text, ValueError if it is not contiguous
+def maskPrefixlen(mask, bits=32):
+    if isinstance(mask, str):
+        mask, bits = parseAddr(mask)
+    try:
+        return _maskPrefixlens[bits, mask]
+    except KeyError:
+        raise ValueError('{} is not a contiguous netmask'.format(formatAddr(mask, bits))) from None
+
+
+#--------------------
+# subnet result sets
+#--------------------
+
+class SubnetTable:
+
+    # a generated table kept as parallel columns: array('I') addresses and
+    # array('B') prefix lengths for IPv4 (17 bytes a row), int lists for
+    # IPv6. Text is only made for the rows being shown or exported.
+    # Iterating gives (start, prefixlen, bits, label) plan rows, so a table
+    # can go straight into planDiff.
+    header = 'subnet,label,mask,first,last,broadcast'
+
+    def __init__(self, bits=32):
+        self.bits = bits
+        self.starts = intArray(bits)
+        self.prefixlens = array('B')
+        self.firsts = intArray(bits)
+        self.lasts = intArray(bits)
+        self.broadcasts = intArray(bits)
+        self.labels = None
+        self.source = None      # (network, newprefix) for a whole split
+
+    # every /newprefix in network (or rows [first, last) of that split), each
+    # column built from a range in C
+    @classmethod
+    def split(cls, network, newprefix, first=0, last=None):
+        start, prefixlen, bits = parseNetwork(network)
+        if not (prefixlen <= newprefix <= bits):
+            raise ValueError('cannot split {} into /{}'.format(network, newprefix))
+        info = prefixInfo(newprefix, bits)
+        rows = 1 << (newprefix - prefixlen)
+        last = rows if last is None else min(last, rows)
+        end = start + last * info.size
+        start += first * info.size
+        skip = (info.size - info.hosts) // 2
+        table = cls(bits)
+        table.starts = intArray(bits, range(start, end, info.size))
+        table.prefixlens = array('B', [newprefix]) * len(table.starts)
+        table.firsts = intArray(bits, range(start + skip, end, info.size))
+        table.lasts = intArray(bits, range(start + info.size - 1 - skip, end, info.size))
+        table.broadcasts = intArray(bits, range(start + info.size - 1, end, info.size))
+        if (first == 0 and last == rows):
+            table.source = (network, newprefix)
+        return table
+
+    # from (start, prefixlen, bits[, label]) rows of one address family
+    @classmethod
+    def fromRows(cls, rows, bits=32):
+        table = cls(bits)
+        for row in rows:
+            if (row[2] != bits):
+                raise ValueError('{} is not an IPv{} prefix'.format(formatNetwork(*row[:3]), 4 if bits == 32 else 6))
+            table.append(row[0], row[1], row[3] if len(row) > 3 else '')
+        return table
+
+    def append(self, start, prefixlen, label=''):
+        info = prefixInfo(prefixlen, self.bits)
+        skip = (info.size - info.hosts) // 2
+        self.starts.append(start)
+        self.prefixlens.append(prefixlen)
+        self.firsts.append(start + skip)
+        self.lasts.append(start + info.size - 1 - skip)
+        self.broadcasts.append(start + info.size - 1)
+        if (self.labels is not None or label):
+            if self.labels is None:
+                self.labels = [''] * (len(self.starts) - 1)
+            self.labels.append(label)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, index):
+        return self.starts[index], self.prefixlens[index], self.bits, self.labels[index] if self.labels else ''
+
+    def __iter__(self):
+        labels = self.labels or itertools.repeat('')
+        return zip(self.starts, self.prefixlens, itertools.repeat(self.bits), labels)
+
+    def network(self, index):
+        return formatNetwork(self.starts[index], self.prefixlens[index], self.bits)
+
+    # broadcast is None for blocks without one: /31, /32 and all of IPv6
+    def broadcast(self, index):
+        info = prefixInfo(self.prefixlens[index], self.bits)
+        return self.broadcasts[index] if info.hosts < info.size else None
+
+    def nbytes(self):
+        columns = (self.starts, self.prefixlens, self.firsts, self.lasts, self.broadcasts)
+        if (self.bits == 32):
+            return sum(column.itemsize * len(column) for column in columns)
+        return sum(sys.getsizeof(column) + sum(map(sys.getsizeof, column)) for column in columns)
+
+    # CSV lines for rows [first, last), formatted a column at a time
+    def csvLines(self, first=0, last=None):
+        rows = slice(first, len(self) if last is None else last)
+        masks = [PREFIXES[self.bits][prefixlen].maskText for prefixlen in self.prefixlens[rows]]
+        broadcasts = formatAddrs(self.broadcasts[rows], self.bits)
+        for index, info in enumerate(map(PREFIXES[self.bits].__getitem__, self.prefixlens[rows])):
+            if (info.hosts == info.size):
+                broadcasts[index] = ''
+        columns = (formatAddrs(self.starts[rows], self.bits), self.prefixlens[rows], self.labels[rows] if self.labels else itertools.repeat(''),
+                   masks, formatAddrs(self.firsts[rows], self.bits), formatAddrs(self.lasts[rows], self.bits), broadcasts)
+        if not self.labels:
+            return list(map('{}/{},{},{},{},{},{}\n'.format, *columns))
+
+        # labels can hold commas and quotes, so labelled rows go through csv
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerows(zip(map('{}/{}'.format, *columns[:2]), *columns[2:]))
+        return buffer.getvalue().splitlines(True)
+
+    # the first column is the prefix, so an export loads back with loadPlan
+    def writeCSV(self, path, batch=1 << 16):
+        with open(path, 'w') as f:
+            f.write(self.header + '\n')
+            for first in range(0, len(self), batch):
+                f.writelines(self.csvLines(first, first + batch))
+
+# rows [first, last) of one network's split, written to a shard file
+def _splitShard(job):
+    network, newprefix, first, last, path, batch = job
+    table = SubnetTable.split(network, newprefix, first, last)
+    with open(path, 'w') as f:
+        for row in range(0, len(table), batch):
+            f.writelines(table.csvLines(row, row + batch))
+    return path
+
+# the splits of one or more networks into /newprefix as one CSV, the same as
+# SubnetTable.writeCSV would give. The rows are cut into shards that a pool
+# of processes formats into outPath.N files, which are appended to outPath in
+# order as they finish. Returns the number of rows written.
+def splitFile(networks, newprefix, outPath, processes=None, shardRows=1 << 20, batch=1 << 16):
+    if isinstance(networks, str):
+        networks = [networks]
+    jobs = []
+    for network in networks:
+        start, prefixlen, bits = parseNetwork(network)
+        if not (prefixlen <= newprefix <= bits):
+            raise ValueError('cannot split {} into /{}'.format(network, newprefix))
+        rows = 1 << (newprefix - prefixlen)
+        for first in range(0, rows, shardRows):
+            path = '{}.{}'.format(outPath, len(jobs))
+            jobs.append((network, newprefix, first, min(first + shardRows, rows), path, batch))
+
+    processes = processes or os.cpu_count() or 1
+    try:
+        with open(outPath, 'wb') as out:
+            out.write(SubnetTable.header.encode() + b'\n')
+            if (processes == 1 or len(jobs) <= 1):
+                for job in jobs:
+                    _appendShard(out, _splitShard(job))
+            else:
+                with multiprocessing.Pool(processes) as pool:
+                    for path in pool.imap(_splitShard, jobs):
+                        _appendShard(out, path)
+    finally:
+        for job in jobs:
+            if os.path.exists(job[4]):
+                os.remove(job[4])
+    return sum(job[3] - job[2] for job in jobs)
+
+def _appendShard(out, path):
+    with open(path, 'rb') as f:
+        shutil.copyfileobj(f, out, 1 << 20)
+    os.remove(path)
+
+
+#--------------------------------
+# IPAM free-space buddy allocator
+#--------------------------------
+
+class BuddyAllocator:
+
+    # free blocks are kept per prefix length (a set for O(1) buddy lookups plus
+    # a lazily pruned heap for lowest-address order), so allocate, release and
+    # the free-space queries never rescan the allocations
+    def __init__(self, network):
+        self.start, self.prefixlen, self.bits = parseNetwork(network)
+        self.free = [set() for x in range(self.bits+1)]
+        self.heaps = [[] for x in range(self.bits+1)]
+        self.allocated = {}     # start -> prefix length
+        self.freeSize = blockSize(self.prefixlen, self.bits)
+        self._addFree(self.start, self.prefixlen)
+
+    def __len__(self):
+        return len(self.allocated)
+
+    def __contains__(self, network):
+        start, prefixlen, bits = parseNetwork(network)
+        return self.allocated.get(start) == prefixlen
+
+    def _addFree(self, start, prefixlen):
+        self.free[prefixlen].add(start)
+        heapq.heappush(self.heaps[prefixlen], start)
+
+    def _removeFree(self, start, prefixlen):
+        self.free[prefixlen].discard(start)
+        heap = self.heaps[prefixlen]
+        if (len(heap) > 2*len(self.free[prefixlen]) + 64):   #too many stale entries, rebuild
+            heap[:] = self.free[prefixlen]
+            heapq.heapify(heap)
+
+    # lowest free block start at this prefix length, or None
+    def _lowestFree(self, prefixlen):
+        heap = self.heaps[prefixlen]
+        free = self.free[prefixlen]
+        while heap and heap[0] not in free:
+            heapq.heappop(heap)
+        if heap:
+            return heap[0]
+        return None
+
+    def _checkPrefix(self, start, prefixlen):
+        if (prefixlen < self.prefixlen or prefixlen > self.bits):
+            raise ValueError('prefix length /{} outside /{}-/{}'.format(prefixlen, self.prefixlen, self.bits))
+        if (start & (blockSize(prefixlen, self.bits)-1)):
+            raise ValueError('{} is not aligned to /{}'.format(formatAddr(start, self.bits), prefixlen))
+        if ((start ^ self.start) >> (self.bits-self.prefixlen)):
+            raise ValueError('{} is outside {}'.format(formatNetwork(start, prefixlen, self.bits), self.network()))
+
+    def network(self):
+        return formatNetwork(self.start, self.prefixlen, self.bits)
+
+    # allocate the next free /prefixlen (smallest fitting block first), returns the start or None
+    def allocate(self, prefixlen):
+        self._checkPrefix(self.start, prefixlen)
+
+        for level in range(prefixlen, self.prefixlen-1, -1):
+            start = self._lowestFree(level)
+            if start is not None:
+                break
+        else:
+            return None
+
+        self._removeFree(start, level)
+        while (level < prefixlen):      #split, keep the low half, free the high half
+            level += 1
+            self._addFree(start + blockSize(level, self.bits), level)
+
+        self.allocated[start] = prefixlen
+        self.freeSize -= blockSize(prefixlen, self.bits)
+        return start
+
+    # allocate a specific prefix, returns False if any of it is already in use
+    def allocatePrefix(self, start, prefixlen):
+        self._checkPrefix(start, prefixlen)
+
+        for level in range(prefixlen, self.prefixlen-1, -1):
+            block = start & ~(blockSize(level, self.bits)-1)
+            if block in self.free[level]:
+                break
+        else:
+            return False
+
+        self._removeFree(block, level)
+        while (level < prefixlen):      #split, free the half that does not hold the prefix
+            level += 1
+            half = blockSize(level, self.bits)
+            if (start & half):
+                self._addFree(block, level)
+                block += half
+            else:
+                self._addFree(block + half, level)
+
+        self.allocated[start] = prefixlen
+        self.freeSize -= blockSize(prefixlen, self.bits)
+        return True
+
+    # release an allocation and merge it with its free buddies
+    def release(self, start):
+        if start not in self.allocated:
+            raise ValueError('{} is not allocated'.format(formatAddr(start, self.bits)))
+
+        level = self.allocated.pop(start)
+        self.freeSize += blockSize(level, self.bits)
+
+        while (level > self.prefixlen):
+            buddy = start ^ blockSize(level, self.bits)
+            if buddy not in self.free[level]:
+                break
+            self._removeFree(buddy, level)
+            start = min(start, buddy)
+            level -= 1
+
+        self._addFree(start, level)
+
+    # (start, prefixlen) of the largest free block, lowest address first, or None
+    def largestFree(self):
+        for level in range(self.prefixlen, self.bits+1):
+            start = self._lowestFree(level)
+            if start is not None:
+                return start, level
+        return None
+
+    # number of free blocks at every prefix length that has any
+    def freeBlocks(self):
+        return {level: len(self.free[level]) for level in range(self.prefixlen, self.bits+1) if self.free[level]}
+
+    # per prefix length: 1 - (allocatable /n blocks) / (/n blocks if free space were contiguous)
+    def fragmentation(self):
+        frag = {}
+        available = 0
+        for level in range(self.prefixlen, self.bits+1):
+            available = available*2 + len(self.free[level])
+            ideal = self.freeSize >> (self.bits - level)
+            if ideal:
+                frag[level] = 1 - available/ideal
+        return frag
+
+    # 'allocated', 'free' or 'partial' for any block inside the parent
+    def blockState(self, start, prefixlen):
+        self._checkPrefix(start, prefixlen)
+
+        for level in range(prefixlen, self.prefixlen-1, -1):
+            block = start & ~(blockSize(level, self.bits)-1)
+            if block in self.free[level]:
+                return 'free'
+            if self.allocated.get(block) == level:
+                return 'allocated'
+        return 'partial'
+
+    # sorted (start, prefixlen) allocations
+    def allocations(self):
+        return sorted(self.allocated.items())
+
+
+#----------------------------
+# host-level bitset allocator
+#----------------------------
+
+_notFull = re.compile(b'[^\xff]')
+_notEmpty = re.compile(b'[^\x00]')
+
+def _popcount(data):
+    return bin(int.from_bytes(data, 'little')).count('1')
+
+# merge (first, last) ranges into a sorted list of disjoint ranges
+def mergeRanges(ranges):
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1]+1:
+            if last > merged[-1][1]:
+                merged[-1] = (merged[-1][0], last)
+        else:
+            merged.append((first, last))
+    return merged
+
+# yield (first, last, bits) from lines holding an address, 'first - last' or a CIDR block
+def parseHostRanges(lines):
+    for line in lines:
+        line = line.split('#')[0].strip()
+        if not line:
+            continue
+        if '-' in line:
+            first, last = line.split('-', 1)
+            first, bits = parseAddr(first)
+            last, lastBits = parseAddr(last)
+            if (bits != lastBits):
+                raise ValueError('{!r} mixes IPv4 and IPv6'.format(line))
+            yield first, last, bits
+        elif '/' in line:
+            start, prefixlen, bits = parseNetwork(line)
+            yield start, start + blockSize(prefixlen, bits) - 1, bits
+        else:
+            addr, bits = parseAddr(line)
+            yield addr, addr, bits
+
+
+class Bitset:
+
+    # one bit per slot, little-endian within each byte; the pad bits past the
+    # end are kept set so nextFree never lands on them
+    def __init__(self, size):
+        self.size = size
+        self.map = bytearray((size+7) >> 3)
+        self.used = 0
+        if (size & 7):
+            self.map[-1] = (0xFF << (size & 7)) & 0xFF
+
+    def __len__(self):
+        return self.size
+
+    def test(self, slot):
+        return bool(self.map[slot >> 3] & (1 << (slot & 7)))
+
+    def set(self, slot, value=True):
+        if not 0 <= slot < self.size:
+            raise ValueError('slot {} outside 0-{}'.format(slot, self.size-1))
+        mask = 1 << (slot & 7)
+        byte = self.map[slot >> 3]
+        if (bool(byte & mask) != value):
+            self.map[slot >> 3] = byte ^ mask
+            self.used += 1 if value else -1
+
+    # set or clear slots first..last inclusive, whole bytes at a time
+    def setRange(self, first, last, value=True):
+        if not 0 <= first <= last < self.size:
+            raise ValueError('slots {}-{} outside 0-{}'.format(first, last, self.size-1))
+        a, b = first >> 3, last >> 3
+        before = _popcount(self.map[a:b+1])
+        if (a == b):
+            self._apply(a, ((1 << (last-first+1)) - 1) << (first & 7), value)
+        else:
+            self._apply(a, (0xFF << (first & 7)) & 0xFF, value)
+            self._apply(b, 0xFF >> (7 - (last & 7)), value)
+            self.map[a+1:b] = (b'\xff' if value else b'\x00') * (b-a-1)
+        self.used += _popcount(self.map[a:b+1]) - before
+
+    def _apply(self, index, mask, value):
+        if value:
+            self.map[index] |= mask
+        else:
+            self.map[index] &= ~mask & 0xFF
+
+    # lowest clear slot >= start, or None; full bytes are skipped by the regex engine
+    def nextFree(self, start=0):
+        if (start >= self.size):
+            return None
+        index = start >> 3
+        byte = self.map[index] | ((1 << (start & 7)) - 1)
+        if (byte == 0xFF):
+            match = _notFull.search(self.map, index+1)
+            if match is None:
+                return None
+            index = match.start()
+            byte = self.map[index]
+        free = ~byte & 0xFF
+        return (index << 3) + (free & -free).bit_length() - 1
+
+    # number of set slots in first..last inclusive
+    def count(self, first=0, last=None):
+        if last is None:
+            last = self.size-1
+        a, b = first >> 3, last >> 3
+        if (a == b):
+            return _popcount(bytes([self.map[a] & (((1 << (last-first+1)) - 1) << (first & 7))]))
+        total = _popcount(self.map[a+1:b])
+        total += _popcount(bytes([self.map[a] & (0xFF << (first & 7)) & 0xFF]))
+        total += _popcount(bytes([self.map[b] & (0xFF >> (7 - (last & 7)))]))
+        return total
+
+
+class HostBitmap(Bitset):
+
+    # a /16 is 64K bits = 8 KB; the network and broadcast addresses are
+    # reserved up front for IPv4 blocks that have them
+    def __init__(self, network, reserveEnds=True):
+        self.start, self.prefixlen, self.bits = parseNetwork(network)
+        hostBits = self.bits - self.prefixlen
+        if (hostBits > 32):
+            raise ValueError('{} is too large for a host bitmap (max 2**32 addresses)'.format(network))
+        super().__init__(1 << hostBits)
+
+        self.reserved = 0
+        if (reserveEnds and prefixInfo(self.prefixlen, self.bits).hosts < self.size):
+            self.set(0)
+            self.set(self.size-1)
+            self.reserved = 2
+
+    def network(self):
+        return formatNetwork(self.start, self.prefixlen, self.bits)
+
+    def _slot(self, addr):
+        slot = addr - self.start
+        if not 0 <= slot < self.size:
+            raise ValueError('{} is outside {}'.format(formatAddr(addr, self.bits), self.network()))
+        return slot
+
+    def isUsed(self, addr):
+        return self.test(self._slot(addr))
+
+    def use(self, addr, value=True):
+        self.set(self._slot(addr), value)
+
+    def reserveRange(self, first, last, value=True):
+        self.setRange(self._slot(first), self._slot(last), value)
+
+    # reserve the addresses of an AddressSet that fall inside this block
+    def reserveSet(self, aset):
+        for first, last in aset.intervalsIn(self.start, self.start + self.size - 1):
+            self.reserveRange(first, last)
+
+    # lowest free host address >= after, or None
+    def nextFree(self, after=None):
+        slot = super().nextFree(0 if after is None else self._slot(after))
+        if slot is None:
+            return None
+        return self.start + slot
+
+    # import 'used' lines (addresses, ranges or CIDRs), returns the number of lines that hit this block
+    def loadUsed(self, lines):
+        hits = 0
+        end = self.start + self.size - 1
+        for first, last, bits in parseHostRanges(lines):
+            if (bits == self.bits and first <= end and last >= self.start):
+                self.reserveRange(max(first, self.start), min(last, end))
+                hits += 1
+        return hits
+
+    # (used hosts, usable hosts)
+    def utilization(self):
+        return self.used - self.reserved, self.size - self.reserved
+
+
+#-------------------------------------
+# containment / overlap join of prefix lists
+#-------------------------------------
+
+# parse lines of CIDR prefixes into (start, prefixlen, bits), skipping blanks and comments
+def parsePrefixList(lines):
+    prefixes = []
+    for line in lines:
+        line = line.split('#')[0].strip()
+        if line:
+            prefixes.append(parseNetwork(line.split()[0]))
+    return prefixes
+
+# CIDR blocks are either nested or disjoint, so one sorted pass with a stack
+# of the currently open blocks finds every containing pair: whatever is left
+# on the stack when a block starts contains it. Yields (outer, inner) items.
+def _nestedPairs(items):
+    stack = []
+    for item in sorted(items):      # (bits, start, -end, side, index)
+        bits, start, negEnd = item[:3]
+        while stack and (stack[-1][0] != bits or -stack[-1][2] < start):
+            stack.pop()
+        for outer in stack:
+            yield outer, item
+        stack.append(item)
+
+def _joinItems(prefixes, side):
+    return [(bits, start, -(start + blockSize(prefixlen, bits) - 1), side, index)
+            for index, (start, prefixlen, bits) in enumerate(prefixes)]
+
+# relate every entry of a to every entry of b it overlaps; returns sorted
+# (index in a, relation, index in b) with relation 'equal', 'inside' or 'contains'
+def prefixJoin(a, b):
+    result = []
+    for outer, inner in _nestedPairs(_joinItems(a, 0) + _joinItems(b, 1)):
+        if (outer[3] == inner[3]):
+            continue
+        equal = outer[1:3] == inner[1:3]
+        if (outer[3] == 0):
+            result.append((outer[4], 'equal' if equal else 'contains', inner[4]))
+        else:
+            result.append((inner[4], 'equal' if equal else 'inside', outer[4]))
+    result.sort()
+    return result
+
+# overlapping entries inside a single plan, as sorted (outer index, relation, inner index)
+def planOverlaps(prefixes):
+    result = []
+    for outer, inner in _nestedPairs(_joinItems(prefixes, 0)):
+        relation = 'duplicates' if outer[1:3] == inner[1:3] else 'contains'
+        result.append((outer[4], relation, inner[4]))
+    result.sort()
+    return result
+
+
+#---------------------
+# range to CIDR blocks
+#---------------------
+
+# minimal CIDR blocks covering first..last as (start, prefixlen): each block
+# is the largest one that is both aligned at first and fits in what is left
+def rangeToCIDRs(first, last, bits=32):
+    blocks = []
+    while (first <= last):
+        size = (last - first + 1).bit_length() - 1
+        if first:
+            size = min(size, (first & -first).bit_length() - 1)
+        blocks.append((first, bits - size))
+        first += 1 << size
+    return blocks
+
+# one input line to (first, last, bits) or None for blanks, comments and
+# headers. Accepts 'first - last', 'first last', 'start count' and RIR
+# delegated-stats records (registry|cc|ipv4|start|count|... where the ipv6
+# value is a prefix length)
+def parseRangeLine(line):
+    line = line.split('#')[0].strip()
+    if not line:
+        return None
+
+    if '|' in line:
+        fields = line.split('|')
+        if (len(fields) < 5 or fields[2] not in ('ipv4', 'ipv6') or fields[1] == '*'):
+            return None
+        start, bits = parseAddr(fields[3])
+        if (bits == 128):
+            return start, start + blockSize(int(fields[4]), 128) - 1, bits
+        return start, start + int(fields[4]) - 1, bits
+
+    fields = line.replace(',', ' ').replace(' - ', ' ').split()
+    if (len(fields) == 1 and '-' in fields[0]):
+        fields = fields[0].split('-')
+    if (len(fields) != 2):
+        raise ValueError('{!r} is not a range'.format(line))
+
+    first, bits = parseAddr(fields[0])
+    if fields[1].isdigit():
+        last = first + int(fields[1]) - 1
+    else:
+        last, lastBits = parseAddr(fields[1])
+        if (lastBits != bits):
+            raise ValueError('{!r} mixes address families'.format(line))
+    if (last < first or last >= 1 << bits):
+        raise ValueError('{!r} is not a valid range'.format(line))
+    return first, last, bits
+
+# stream (start, prefixlen, bits) blocks for every range line
+def rangesToCIDRs(lines):
+    for line in lines:
+        parsed = parseRangeLine(line)
+        if parsed is not None:
+            first, last, bits = parsed
+            for start, prefixlen in rangeToCIDRs(first, last, bits):
+                yield start, prefixlen, bits
+
+# convert a range file to a CIDR-per-line file without holding either in memory, returns the block count
+def convertRangeFile(inPath, outPath):
+    count = 0
+    with open(inPath) as src, open(outPath, 'w') as dst:
+        for start, prefixlen, bits in rangesToCIDRs(src):
+            dst.write(formatNetwork(start, prefixlen, bits) + '\n')
+            count += 1
+    return count
+
+
+#-------------------------
+# address set algebra
+#-------------------------
+
+class AddressSet:
+
+    # sorted, disjoint, non-adjacent [start, end] intervals in two parallel
+    # columns; every operation is a linear merge of those columns
+    def __init__(self, ranges=(), bits=32):
+        self.bits = bits
+        merged = mergeRanges(ranges)
+        self.starts = intArray(bits, [first for first, last in merged])
+        self.ends = intArray(bits, [last for first, last in merged])
+        self.sums = None
+
+    @classmethod
+    def _fromColumns(cls, bits, starts, ends):
+        result = cls(bits=bits)
+        result.starts = intArray(bits, starts)
+        result.ends = intArray(bits, ends)
+        return result
+
+    # from (start, prefixlen, bits) tuples, e.g. parsePrefixList output
+    @classmethod
+    def fromPrefixes(cls, prefixes, bits=32):
+        return cls([(start, start + blockSize(prefixlen, bits) - 1) for start, prefixlen, pbits in prefixes if pbits == bits], bits)
+
+    # from unsorted single addresses (e.g. extractFile output), runs become intervals
+    @classmethod
+    def fromAddresses(cls, addrs, bits=32):
+        addrs = sorted(set(addrs))
+        if not addrs:
+            return cls(bits=bits)
+        # a run ends wherever the gap to the next address is not 1; map/compress keep the loop in C
+        breaks = list(map((1).__ne__, map(operator.sub, addrs[1:], addrs)))
+        starts = intArray(bits, addrs[:1])
+        starts.extend(itertools.compress(addrs[1:], breaks))
+        ends = intArray(bits, itertools.compress(addrs, breaks))
+        ends.append(addrs[-1])
+        return cls._fromColumns(bits, starts, ends)
+
+    @classmethod
+    def fromNetwork(cls, network):
+        start, prefixlen, bits = parseNetwork(network)
+        return cls([(start, start + blockSize(prefixlen, bits) - 1)], bits)
+
+    def __repr__(self):
+        return 'AddressSet([{}])'.format(', '.join(formatNetwork(start, prefixlen, self.bits) for start, prefixlen in self.cidrs()))
+
+    def __eq__(self, other):
+        return self.bits == other.bits and list(self.starts) == list(other.starts) and list(self.ends) == list(other.ends)
+
+    def __bool__(self):
+        return len(self.starts) > 0
+
+    def __contains__(self, addr):
+        index = bisect.bisect_right(self.starts, addr) - 1
+        return index >= 0 and addr <= self.ends[index]
+
+    def intervals(self):
+        return zip(self.starts, self.ends)
+
+    # number of addresses
+    def size(self):
+        return sum(self.ends) - sum(self.starts) + len(self.starts)
+
+    # [(first, last)] intervals clipped to first..last
+    def intervalsIn(self, first, last):
+        low = bisect.bisect_left(self.ends, first)
+        high = bisect.bisect_right(self.starts, last)
+        if (low >= high):
+            return []
+        clipped = list(zip(self.starts[low:high], self.ends[low:high]))
+        clipped[0] = (max(clipped[0][0], first), clipped[0][1])
+        clipped[-1] = (clipped[-1][0], min(clipped[-1][1], last))
+        return clipped
+
+    # number of addresses inside first..last: two bisects on a running total of
+    # interval sizes, so counting per subnet never walks the addresses
+    def countRange(self, first, last):
+        if self.sums is None:
+            sums = itertools.accumulate((end - start + 1 for start, end in self.intervals()), initial=0)
+            self.sums = array('Q', sums) if self.bits == 32 else list(sums)
+        low = bisect.bisect_left(self.ends, first)
+        high = bisect.bisect_right(self.starts, last)
+        if (low >= high):
+            return 0
+        total = self.sums[high] - self.sums[low]
+        total -= max(0, first - self.starts[low])
+        total -= max(0, self.ends[high-1] - last)
+        return total
+
+    # addresses in each of count consecutive /prefixlen blocks from start
+    def blockCounts(self, start, prefixlen, count):
+        size = blockSize(prefixlen, self.bits)
+        return [self.countRange(start + i*size, start + (i+1)*size - 1) for i in range(count)]
+
+    # minimal CIDR blocks as (start, prefixlen)
+    def cidrs(self):
+        for first, last in self.intervals():
+            for block in rangeToCIDRs(first, last, self.bits):
+                yield block
+
+    def _check(self, other):
+        if (other.bits != self.bits):
+            raise ValueError('cannot combine IPv{} and IPv{} sets'.format(4 if self.bits == 32 else 6, 4 if other.bits == 32 else 6))
+
+    # everything in 0..2**bits-1 (or inside parent, a (start, end) pair) that is not in the set
+    def complement(self, parent=None):
+        low, high = parent or (0, (1 << self.bits) - 1)
+        starts, ends = [], []
+        for first, last in self.intervals():
+            if (last < low):
+                continue
+            if (first > high):
+                break
+            if (first > low):
+                starts.append(low)
+                ends.append(first - 1)
+            low = last + 1
+        if (low <= high):
+            starts.append(low)
+            ends.append(high)
+        return self._fromColumns(self.bits, starts, ends)
+
+    def union(self, other):
+        self._check(other)
+        starts, ends = [], []
+        a, b = self.intervals(), other.intervals()
+        for first, last in heapq.merge(a, b):
+            if ends and first <= ends[-1] + 1:
+                if (last > ends[-1]):
+                    ends[-1] = last
+            else:
+                starts.append(first)
+                ends.append(last)
+        return self._fromColumns(self.bits, starts, ends)
+
+    def intersection(self, other):
+        self._check(other)
+        starts, ends = [], []
+        i = j = 0
+        while (i < len(self.starts) and j < len(other.starts)):
+            first = max(self.starts[i], other.starts[j])
+            last = min(self.ends[i], other.ends[j])
+            if (first <= last):
+                starts.append(first)
+                ends.append(last)
+            if (self.ends[i] < other.ends[j]):
+                i += 1
+            else:
+                j += 1
+        return self._fromColumns(self.bits, starts, ends)
+
+    def difference(self, other):
+        self._check(other)
+        return self.intersection(other.complement())
+
+    def symmetricDifference(self, other):
+        return self.union(other).difference(self.intersection(other))
+
+    __or__ = union
+    __and__ = intersection
+    __sub__ = difference
+    __xor__ = symmetricDifference
+
+# what is left of a network after taking out a list of (start, prefixlen, bits) prefixes
+def excludePrefixes(network, prefixes):
+    block = AddressSet.fromNetwork(network)
+    return block - AddressSet.fromPrefixes(prefixes, block.bits)
+
+
+#------------------------------------
+# memory-mapped prefix table / set file
+#------------------------------------
+#
+# header (32 bytes, little-endian):
+#   magic 'STPT', version uint16, address bits uint8, kind uint8, count uint64, 16 pad bytes
+# then the columns, each count entries long:
+#   start, end   uint32 for IPv4, uint128 as (high uint64, low uint64) pairs for IPv6
+#   prefixlen    uint8, prefix tables only
+# prefix tables are sorted by (start, prefixlen), address sets by start
+
+FILE_MAGIC = b'STPT'
+FILE_VERSION = 1
+KIND_PREFIXES, KIND_SET, KIND_DELEGATIONS = 0, 1, 2
+_header = struct.Struct('<4sHBBQ16x')
+
+def _packColumn(values, bits):
+    if (bits == 32):
+        column = array('I', values)
+    else:
+        column = array('Q')
+        for value in values:
+            column.append(value >> 64)
+            column.append(value & 0xFFFFFFFFFFFFFFFF)
+    if (sys.byteorder != 'little'):
+        column.byteswap()
+    return column.tobytes()
+
+def _writeColumns(path, bits, kind, starts, ends, prefixes=None):
+    with open(path, 'wb') as f:
+        f.write(_header.pack(FILE_MAGIC, FILE_VERSION, bits, kind, len(starts)))
+        f.write(_packColumn(starts, bits))
+        f.write(_packColumn(ends, bits))
+        if prefixes is not None:
+            f.write(bytes(prefixes))
+
+# write (start, prefixlen, bits) prefixes of one family, returns the count
+def writePrefixTable(path, prefixes):
+    prefixes = sorted((start, prefixlen, bits) for start, prefixlen, bits in prefixes)
+    bits = prefixes[0][2] if prefixes else 32
+    if any(p[2] != bits for p in prefixes):
+        raise ValueError('a prefix table holds one address family')
+    _writeColumns(path, bits, KIND_PREFIXES,
+                  [p[0] for p in prefixes],
+                  [p[0] + blockSize(p[1], bits) - 1 for p in prefixes],
+                  [p[1] for p in prefixes])
+    return len(prefixes)
+
+def writeAddressSet(path, addressSet):
+    _writeColumns(path, addressSet.bits, KIND_SET, addressSet.starts, addressSet.ends)
+    return len(addressSet.starts)
+
+
+class _WideColumn:
+
+    # read-only view of a uint128 column stored as (high, low) uint64 pairs
+    def __init__(self, words):
+        self.words = words
+
+    def __len__(self):
+        return len(self.words) >> 1
+
+    def __getitem__(self, index):
+        if (index < 0):
+            index += len(self)
+        return (self.words[2*index] << 64) | self.words[2*index+1]
+
+
+class PrefixFile:
+
+    # the columns are memoryviews straight onto the mapping: opening is O(1)
+    # and lookups bisect the file in place without copying it
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:                      #empty file
+            self.file.close()
+            raise ValueError('{} is not a prefix table file'.format(path))
+        if (len(self.map) < _header.size):
+            self.close()
+            raise ValueError('{} is not a prefix table file'.format(path))
+        magic, version, self.bits, self.kind, self.count = _header.unpack_from(self.map)
+        if (magic != FILE_MAGIC or self.kind not in (KIND_PREFIXES, KIND_SET) or self.bits not in (32, 128)):
+            self.close()
+            raise ValueError('{} is not a prefix table file'.format(path))
+        if (version != FILE_VERSION):
+            self.close()
+            raise ValueError('{} has unsupported version {}'.format(path, version))
+        width = self.count * self.bits // 8
+        size = _header.size + 2*width + (self.count if self.kind == KIND_PREFIXES else 0)
+        if (len(self.map) != size):
+            actual = len(self.map)
+            self.close()
+            raise ValueError('{} is {} bytes, {} expected for {} entries'.format(path, actual, size, self.count))
+
+        self.views = [memoryview(self.map)]     #every view has to be released before the map can close
+        self.starts = self._column(_header.size, width)
+        self.ends = self._column(_header.size+width, width)
+        self.prefixlens = None
+        if (self.kind == KIND_PREFIXES):
+            self.prefixlens = self._view(_header.size+2*width, self.count)
+
+    def _view(self, offset, length, format=None):
+        view = self.views[0][offset:offset+length]
+        self.views.append(view)
+        if format:
+            view = view.cast(format)
+            self.views.append(view)
+        return view
+
+    def _column(self, offset, width):
+        format = 'I' if self.bits == 32 else 'Q'
+        if (sys.byteorder != 'little'):     #no zero-copy on big-endian hosts
+            column = array(format, self._view(offset, width).tobytes())
+            column.byteswap()
+        else:
+            column = self._view(offset, width, format)
+        if (self.bits == 32):
+            return column
+        return _WideColumn(column)
+
+    def close(self):
+        self.starts = self.ends = self.prefixlens = None
+        for view in reversed(getattr(self, 'views', [])):
+            view.release()
+        self.views = []
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if (self.kind == KIND_PREFIXES):
+            return self.starts[index], self.prefixlens[index], self.bits
+        return self.starts[index], self.ends[index]
+
+    # address sets: is addr inside one of the intervals
+    def __contains__(self, addr):
+        index = bisect.bisect_right(self.starts, addr) - 1
+        return index >= 0 and addr <= self.ends[index]
+
+    # prefix tables: index of the longest prefix holding addr, or None; one
+    # bisect per prefix length from /bits down
+    def longestMatch(self, addr):
+        for prefixlen in range(self.bits, -1, -1):
+            start = addr & ~(blockSize(prefixlen, self.bits) - 1)
+            index = bisect.bisect_left(self.starts, start)
+            while (index < self.count and self.starts[index] == start):
+                if (self.prefixlens[index] == prefixlen):
+                    return index
+                index += 1
+        return None
+
+    def toAddressSet(self):
+        result = AddressSet(bits=self.bits)
+        if (self.kind == KIND_SET):
+            result.starts = intArray(self.bits, self.starts)
+            result.ends = intArray(self.bits, self.ends)
+            return result
+        return AddressSet(zip(self.starts, self.ends), self.bits)
+
+# (start, prefixlen, bits) list from either a binary prefix table or a text file
+def loadPrefixes(path):
+    with open(path, 'rb') as f:
+        magic = f.read(len(FILE_MAGIC))
+    if (magic == FILE_MAGIC):
+        with PrefixFile(path) as table:
+            if (table.kind == KIND_SET):
+                return [(start, prefixlen, table.bits) for start, prefixlen in table.toAddressSet().cidrs()]
+            return [table[i] for i in range(len(table))]
+    with open(path) as f:
+        return parsePrefixList(f)
+
+
+#-------------------------
+# addressing plan diff
+#-------------------------
+
+_planComment = re.compile(r'\s#(\s.*)?$')
+
+# (prefix, label) of one plan line: 'prefix [label] [# comment]' when the
+# first word is a prefix, otherwise a CSV row whose first two columns are the
+# prefix and label. A quoted CSV label can run on over the next lines.
+def _planFields(line, lines):
+    fields = _planComment.sub('', line).split(None, 1)
+    try:
+        return parseNetwork(fields[0]), fields[1].strip() if len(fields) > 1 else ''
+    except ValueError:
+        if (',' not in line):
+            raise
+    while (line.count('"') % 2):
+        more = next(lines, None)
+        if more is None:
+            break
+        line += '\n' + more.rstrip('\r\n')
+    fields = next(csv.reader([line]))
+    return parseNetwork(fields[0].strip()), fields[1].strip() if len(fields) > 1 else ''
+
+# plan lines as above, '#' starts a comment line; a first line that does not
+# parse is taken as a header. Returns (start, prefixlen, bits, label) rows.
+def parsePlan(lines):
+    plan = []
+    lines = iter(lines)
+    for number, line in enumerate(lines):
+        line = line.strip()
+        if (not line or line[0] == '#'):
+            continue
+        try:
+            (start, prefixlen, bits), label = _planFields(line, lines)
+        except ValueError:
+            if (number == 0):
+                continue
+            raise
+        plan.append((start, prefixlen, bits, label))
+    return plan
+
+def loadPlan(path):
+    with open(path) as f:
+        return parsePlan(f)
+
+def _planKey(row):
+    return row[2], row[0], row[1]
+
+def _labelKey(row):
+    return row[2], row[0], row[1], row[3]
+
+# sorted merge of two row lists sorted on key: (only in a, only in b, matched pairs)
+def _mergeRows(a, b, key):
+    onlyA, onlyB, pairs = [], [], []
+    i = j = 0
+    while (i < len(a) or j < len(b)):
+        if (j == len(b) or (i < len(a) and key(a[i]) < key(b[j]))):
+            onlyA.append(a[i])
+            i += 1
+        elif (i == len(a) or key(b[j]) < key(a[i])):
+            onlyB.append(b[j])
+            j += 1
+        else:
+            pairs.append((a[i], b[j]))
+            i += 1
+            j += 1
+    return onlyA, onlyB, pairs
+
+# compare two plans with a sorted merge on (bits, start, prefixlen). Yields
+# (kind, old rows, new rows) in address order, kind being one of
+#   removed / added     no overlapping counterpart
+#   split               one old block now holds several new ones
+#   merged              one new block now holds several old ones
+#   resized             one old block grew or shrank into one new block
+#   relabeled           same block, new label
+#   moved               same label, unrelated address
+# every row is in at most one record; unchanged rows are not reported
+def planDiff(old, new):
+    old = sorted(old, key=_labelKey)
+    new = sorted(new, key=_labelKey)
+
+    # exact matches, label included, drop out in one merge pass; what is left
+    # at the same block only changed its label
+    removed, added, pairs = _mergeRows(old, new, _labelKey)
+    removed, added, pairs = _mergeRows(removed, added, _planKey)
+    records = [('relabeled', [oldRow], [newRow]) for oldRow, newRow in pairs]
+
+    # innermost container on the other side for every leftover row
+    rows = (removed, added)
+    items = _joinItems([row[:3] for row in removed], 0) + _joinItems([row[:3] for row in added], 1)
+    container = {}
+    for outer, inner in _nestedPairs(items):
+        if (outer[3] != inner[3]):
+            container[inner[3:5]] = outer[3:5]
+
+    children = {}
+    for inner, outer in container.items():
+        children.setdefault(outer, []).append(inner)
+
+    # outermost containers first; a row already in a record is neither a
+    # container nor a part again, so chained nesting (old /16 > new /20 >
+    # old /24) gives one resized record and leaves the /24 on its own
+    used = set()
+    for side, index in sorted(children, key=lambda key: _planKey(rows[key[0]][key[1]])):
+        if (side, index) in used:
+            continue
+        inner = [key for key in children[(side, index)] if key not in used]
+        if not inner:
+            continue
+        used.add((side, index))
+        used.update(inner)
+        inner = [rows[s][i] for s, i in sorted(inner)]
+        if (side == 0):
+            records.append(('split' if len(inner) > 1 else 'resized', [removed[index]], inner))
+        else:
+            records.append(('merged' if len(inner) > 1 else 'resized', inner, [added[index]]))
+
+    # what is left either moved (label match) or simply came or went
+    labels = {}
+    for index, row in enumerate(removed):
+        if ((0, index) not in used and row[3]):
+            labels.setdefault(row[3], []).append(index)
+    for index, row in enumerate(added):
+        if (1, index) in used:
+            continue
+        if labels.get(row[3]):
+            oldIndex = labels[row[3]].pop(0)
+            used.add((0, oldIndex))
+            records.append(('moved', [removed[oldIndex]], [row]))
+        else:
+            records.append(('added', [], [row]))
+    for index, row in enumerate(removed):
+        if (0, index) not in used:
+            records.append(('removed', [row], []))
+
+    records.sort(key=lambda record: _planKey((record[1] or record[2])[0]))
+    for record in records:
+        yield record
+
+def formatPlanRows(rows):
+    return ' '.join(formatNetwork(start, prefixlen, bits) for start, prefixlen, bits, label in rows)
+
+# label column of a diff record, old -> new for relabeled rows
+def planDiffLabel(kind, oldRows, newRows):
+    if (kind == 'relabeled'):
+        return '{} -> {}'.format(oldRows[0][3], newRows[0][3])
+    return (newRows or oldRows)[0][3]
+
+# stream diff records to a CSV file, returns a count per kind
+def writePlanDiff(records, path):
+    counts = {}
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(('change', 'old', 'new', 'label'))
+        for kind, oldRows, newRows in records:
+            writer.writerow((kind, formatPlanRows(oldRows), formatPlanRows(newRows), planDiffLabel(kind, oldRows, newRows)))
+            counts[kind] = counts.get(kind, 0) + 1
+    return counts
+
+
+#-------------------------------------
+# lossy prefix clustering of host lists
+#-------------------------------------
+
+# cover observed addresses with few prefixes. Starts from the exact minimal
+# cover and keeps merging the neighbouring pair whose common supernet pulls
+# in the fewest unobserved addresses (lazy min-heap over a linked list of
+# clusters). Stops once the next merge would exceed wasteBudget, but keeps
+# going while there are more than maxPrefixes clusters.
+# Returns sorted (start, prefixlen, observed) tuples.
+def clusterAddresses(addrs, bits=32, wasteBudget=0, maxPrefixes=None):
+    return clusterRanges(((addr, addr) for addr in addrs), bits, wasteBudget, maxPrefixes)
+
+# the same for (first, last) ranges of observed addresses, so a pasted /8
+# costs one block rather than 16M addresses. A merge costs O(log n): the
+# unobserved addresses under a supernet come from bisecting the sorted
+# starting blocks plus a Fenwick tree of the waste already inside clusters,
+# and the clusters a merge swallows are walked only once, as they die.
+def clusterRanges(ranges, bits=32, wasteBudget=0, maxPrefixes=None):
+    starts, plens, counts = [], [], []
+    for first, last in mergeRanges(ranges):
+        for start, prefixlen in rangeToCIDRs(first, last, bits):
+            starts.append(start)
+            plens.append(prefixlen)
+            counts.append(blockSize(prefixlen, bits))
+    if not starts:
+        return []
+
+    n = len(starts)
+    blockStarts = starts[:]
+    observedBefore = [0] + list(itertools.accumulate(counts))
+    wasteTree = [0] * (n + 1)       # Fenwick tree of cluster waste, at each cluster's first block
+
+    def addWaste(block, amount):
+        block += 1
+        while (block <= n):
+            wasteTree[block] += amount
+            block += block & -block
+
+    def wasteBefore(block):
+        total = 0
+        while (block > 0):
+            total += wasteTree[block]
+            block -= block & -block
+        return total
+
+    firstBlock = list(range(n))     # per cluster, the starting blocks it covers
+    lastBlock = list(range(n))
+    wastes = [0] * n
+    prev = list(range(-1, n-1))
+    nxt = list(range(1, n+1))
+    nxt[-1] = -1
+    alive = [True] * n
+
+    def supernet(left, right):
+        end = starts[right] + blockSize(plens[right], bits) - 1
+        prefixlen = bits - (starts[left] ^ end).bit_length()
+        return starts[left] & ~(blockSize(prefixlen, bits)-1), prefixlen
+
+    # clusters are aligned blocks, so any cluster meeting the supernet lies
+    # inside it: what it adds is its size less the observed addresses and
+    # the waste already inside
+    def mergeCost(left, right):
+        start, prefixlen = supernet(left, right)
+        end = start + blockSize(prefixlen, bits) - 1
+        lo = bisect.bisect_left(blockStarts, start, 0, firstBlock[left]+1)
+        hi = bisect.bisect_right(blockStarts, end, lastBlock[right])
+        return blockSize(prefixlen, bits) - (observedBefore[hi] - observedBefore[lo]) - (wasteBefore(hi) - wasteBefore(lo))
+
+    heap = [(mergeCost(i, i+1), i, i+1) for i in range(n-1)]
+    heapq.heapify(heap)
+    waste = 0
+    clusters = n
+
+    while heap:
+        cost, left, right = heap[0]
+        if not (alive[left] and alive[right] and nxt[left] == right):
+            heapq.heappop(heap)
+            continue
+        current = mergeCost(left, right)
+        if (current != cost):       #a neighbour changed since this was queued
+            heapq.heapreplace(heap, (current, left, right))
+            continue
+        if not (maxPrefixes is not None and clusters > maxPrefixes):
+            if (wasteBudget is None or waste + cost > wasteBudget):
+                break
+        heapq.heappop(heap)
+
+        start, prefixlen = supernet(left, right)
+        end = start + blockSize(prefixlen, bits) - 1
+        first = left
+        while (prev[first] != -1 and starts[prev[first]] >= start):
+            first = prev[first]
+        last = right
+        while (nxt[last] != -1 and starts[nxt[last]] <= end):
+            last = nxt[last]
+
+        merged = len(starts)
+        starts.append(start)
+        plens.append(prefixlen)
+        counts.append(0)
+        alive.append(True)
+        prev.append(prev[first])
+        nxt.append(nxt[last])
+        firstBlock.append(firstBlock[first])
+        lastBlock.append(lastBlock[last])
+        wastes.append(cost)
+
+        cluster = first
+        while True:
+            counts[merged] += counts[cluster]
+            wastes[merged] += wastes[cluster]
+            addWaste(firstBlock[cluster], -wastes[cluster])
+            alive[cluster] = False
+            clusters -= 1
+            if (cluster == last):
+                break
+            cluster = nxt[cluster]
+        addWaste(firstBlock[merged], wastes[merged])
+        clusters += 1
+        waste += cost
+
+        if (prev[merged] != -1):
+            nxt[prev[merged]] = merged
+            heapq.heappush(heap, (mergeCost(prev[merged], merged), prev[merged], merged))
+        if (nxt[merged] != -1):
+            prev[nxt[merged]] = merged
+            heapq.heappush(heap, (mergeCost(merged, nxt[merged]), merged, nxt[merged]))
+
+    return sorted((starts[i], plens[i], counts[i]) for i in range(len(starts)) if alive[i])
+
+
+#----------------------
+# reverse DNS zones
+#----------------------
+
+# 'd.c.b.a.in-addr.arpa.' / nibble '...ip6.arpa.' name of the first prefixlen bits of addr
+def reverseName(addr, prefixlen, bits=32):
+    if (bits == 32):
+        labels = [str((addr >> (24 - 8*x)) & 255) for x in range(prefixlen // 8)]
+        return '.'.join(reversed(labels) if labels else []) + ('.' if labels else '') + 'in-addr.arpa.'
+    labels = ['{:x}'.format((addr >> (124 - 4*x)) & 15) for x in range(prefixlen // 4)]
+    return '.'.join(reversed(labels)) + ('.' if labels else '') + 'ip6.arpa.'
+
+# zones that cover a network: octet (IPv4) or nibble (IPv6) aligned blocks;
+# IPv4 blocks longer than /24 get an RFC 2317 classless zone.
+# Returns (zone name, start, prefixlen) tuples.
+def reverseZones(start, prefixlen, bits=32):
+    if (bits == 32 and prefixlen > 24):
+        octet = start & 255
+        name = '{}/{}.{}'.format(octet, prefixlen, reverseName(start, 24))
+        return [(name, start, prefixlen)]
+
+    step = 8 if bits == 32 else 4
+    zonelen = -(-prefixlen // step) * step      #round up to the boundary
+    zones = []
+    for index in range(1 << (zonelen - prefixlen)):
+        zoneStart = start + index * blockSize(zonelen, bits)
+        zones.append((reverseName(zoneStart, zonelen, bits), zoneStart, zonelen))
+    return zones
+
+# owner name of addr relative to its zone, '@' for a single-address zone
+def _ptrOwner(addr, zonelen, bits):
+    if (bits == 32):
+        labels = [str((addr >> (24 - 8*x)) & 255) for x in range(min(zonelen // 8, 3), 4)]
+    else:
+        labels = ['{:x}'.format((addr >> (124 - 4*x)) & 15) for x in range(zonelen // 4, 32)]
+    return '.'.join(reversed(labels)) or '@'
+
+# stream the lines of one reverse zone. template is formatted per host with
+# {dashed} (address with . or : turned into -) and {index} (offset in the
+# zone); hosts restricts the PTRs to those addresses, otherwise every
+# address in the zone gets one
+def reverseZoneLines(zone, start, zonelen, bits=32, template='host-{dashed}.example.com.',
+                     nameservers=('ns1.example.com.',), hosts=None, ttl=3600, serial=None):
+    if serial is None:
+        serial = int(datetime.date.today().strftime('%Y%m%d01'))
+
+    yield '$ORIGIN {}'.format(zone)
+    yield '$TTL {}'.format(ttl)
+    yield '@ IN SOA {} hostmaster.{} ( {} 3600 900 1209600 {} )'.format(nameservers[0], nameservers[0].split('.', 1)[-1], serial, ttl)
+    for ns in nameservers:
+        yield '@ IN NS {}'.format(ns)
+
+    end = start + blockSize(zonelen, bits) - 1
+    if hosts is None:
+        hosts = range(start, end+1)
+    for addr in hosts:
+        if not start <= addr <= end:
+            continue
+        dashed = formatAddr(addr, bits).replace('.', '-').replace(':', '-')
+        yield '{} IN PTR {}'.format(_ptrOwner(addr, zonelen, bits), template.format(dashed=dashed, index=addr-start))
+
+# records for the parent zone(s): NS delegations, plus the RFC 2317 CNAMEs
+# for classless IPv4 blocks
+def delegationLines(start, prefixlen, bits=32, nameservers=('ns1.example.com.',)):
+    for zone, zoneStart, zonelen in reverseZones(start, prefixlen, bits):
+        for ns in nameservers:
+            yield '{} IN NS {}'.format(zone, ns)
+        if (bits == 32 and zonelen > 24):
+            for addr in range(zoneStart, zoneStart + blockSize(zonelen)):
+                yield '{} IN CNAME {}.{}'.format(reverseName(addr, 32), addr & 255, zone)
+
+# write one <zone>.zone file per covering zone plus delegation.txt into
+# directory, streaming every line. Zones with more than maxHosts addresses
+# (and no host list) are written without PTRs; maxHosts=None writes a PTR
+# for every address. Returns the file names.
+def writeReverseZones(network, directory, template='host-{dashed}.example.com.',
+                      nameservers=('ns1.example.com.',), hosts=None, maxHosts=1 << 16):
+    start, prefixlen, bits = parseNetwork(network)
+    files = []
+    for zone, zoneStart, zonelen in reverseZones(start, prefixlen, bits):
+        zoneHosts = hosts
+        if (zoneHosts is None and maxHosts is not None and blockSize(zonelen, bits) > maxHosts):
+            zoneHosts = ()
+        name = zone.rstrip('.').replace('/', '-') + '.zone'
+        with open(os.path.join(directory, name), 'w') as f:
+            for line in reverseZoneLines(zone, zoneStart, zonelen, bits, template, nameservers, zoneHosts):
+                f.write(line + '\n')
+        files.append(name)
+
+    with open(os.path.join(directory, 'delegation.txt'), 'w') as f:
+        for line in delegationLines(start, prefixlen, bits, nameservers):
+            f.write(line + '\n')
+    files.append('delegation.txt')
+    return files
+
+
+#----------------------------------
+# address extraction from log files
+#----------------------------------
+
+# candidates only; every match is validated with integer arithmetic
+_ipv4Scan = re.compile(rb'(?<![0-9.])([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})(?!\.?[0-9])')
+_ipv6Scan = re.compile(rb'(?<![0-9A-Fa-f:.])(?:[0-9A-Fa-f]{0,4}:){2,8}(?:[0-9]{1,3}(?:\.[0-9]{1,3}){3}|[0-9A-Fa-f]{0,4})(?![0-9A-Fa-f:])')
+
+# an IPv6 candidate without the colon of a word prefix ('inet6 addr:fe80::1'
+# matches from the colon), or None for times and MACs
+def _ipv6Candidate(match):
+    if (match[:1] == b':' and match[1:2] != b':'):
+        match = match[1:]
+    if (b'::' in match or match.count(b':') == 7 or b'.' in match):
+        return match.decode()
+    return None
+
+_hexTail = re.compile(rb'[0-9A-Fa-f:]*$')
+
+# whether an IPv4 match right after a colon is the tail of one of the
+# accepted dotted IPv6 candidates
+def _inIPv6(data, match, start, dotted):
+    head = data[max(start, match.start() - 40):match.start()]
+    return _ipv6Candidate(_hexTail.search(head)[0] + match[0]) in dotted
+
+# IPv4 ints (array('I')) and IPv6 ints (list) found in data[start:end]; the
+# dotted tail of an IPv6 address (::ffff:1.2.3.4) is not counted as IPv4
+def extractBuffer(data, start=0, end=None):
+    if end is None:
+        end = len(data)
+    candidates = [candidate for candidate in map(_ipv6Candidate, _ipv6Scan.findall(data, start, end)) if candidate]
+    values = parseIPv6Many(candidates)
+    v6 = [value for value in values if value is not None]
+    dotted = {candidate for candidate, value in zip(candidates, values) if value is not None and '.' in candidate}
+
+    if dotted:
+        octets = [match.groups() for match in _ipv4Scan.finditer(data, start, end)
+                  if not (data[match.start()-1:match.start()] == b':' and _inIPv6(data, match, start, dotted))]
+    else:
+        octets = _ipv4Scan.findall(data, start, end)
+
+    v4 = array('I')
+    append = v4.append
+    for a, b, c, d in octets:
+        a, b, c, d = int(a), int(b), int(c), int(d)
+        if (a | b | c | d) < 256:
+            append((a << 24) | (b << 16) | (c << 8) | d)
+    return v4, v6
+
+def _extractChunk(path, start, end):
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return extractBuffer(data, start, end)
+
+# byte offsets splitting a file into about count line-aligned chunks
+def _lineChunks(path, count):
+    size = os.path.getsize(path)
+    if not size:
+        return []
+    bounds = [0]
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for index in range(1, count):
+            cut = data.find(b'\n', max(size * index // count, bounds[-1]))
+            if (cut < 0):
+                break
+            if (cut + 1 > bounds[-1]):
+                bounds.append(cut + 1)
+    bounds.append(size)
+    return [(bounds[x], bounds[x+1]) for x in range(len(bounds)-1) if bounds[x] < bounds[x+1]]
+
+# scan a text file of any size for addresses; chunks are mmap'd and scanned
+# by a pool of processes. Returns (IPv4 array('I'), IPv6 list) in file order.
+def extractFile(path, processes=None, chunkSize=64 << 20):
+    processes = processes or os.cpu_count() or 1
+    chunks = max(processes, os.path.getsize(path) // chunkSize + 1)
+    jobs = [(path, start, end) for start, end in _lineChunks(path, chunks)]
+
+    v4 = array('I')
+    v6 = []
+    if (processes == 1 or len(jobs) == 1):
+        results = (_extractChunk(*job) for job in jobs)
+        for chunk4, chunk6 in results:
+            v4.extend(chunk4)
+            v6.extend(chunk6)
+        return v4, v6
+
+    with multiprocessing.Pool(processes) as pool:
+        for chunk4, chunk6 in pool.starmap(_extractChunk, jobs):
+            v4.extend(chunk4)
+            v6.extend(chunk6)
+    return v4, v6
+
+IPV4_CLASSES = ('Class A', 'Class B', 'Class C', 'Class D/Multicast', 'Class E/Experimental')
+
+# classful breakdown of IPv4 ints, from the leading bits as on the Classes tab
+def classifyIPv4(addrs):
+    counts = [0] * 5
+    for addr in addrs:
+        top = addr >> 28
+        counts[0 if top < 8 else 1 if top < 12 else 2 if top < 14 else 3 if top == 14 else 4] += 1
+    return dict(zip(IPV4_CLASSES, counts))
+
+
+#----------------------------
+# hierarchical heavy hitters
+#----------------------------
+
+class SpaceSaving:
+
+    # bounded top-k counter: at most capacity keys, each count an overestimate
+    # by no more than self.error. Two summaries merge into one with the same
+    # guarantee, so worker processes can each keep one and the parent adds them.
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counts = {}
+        self.error = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    # fold in exact counts for a batch, a {key: count} mapping
+    def update(self, counts):
+        error = 0
+        if (len(counts) > self.capacity):
+            kept = heapq.nlargest(self.capacity + 1, counts.items(), key=operator.itemgetter(1))
+            error = kept[-1][1]
+            counts = dict(kept[:-1])
+        self._combine(counts, error)
+
+    def merge(self, other):
+        self._combine(other.counts, other.error)
+
+    def _combine(self, counts, error):
+        # a key missing from one side may have had up to that side's error there
+        merged = {key: count + counts.get(key, error) for key, count in self.counts.items()}
+        for key, count in counts.items():
+            if key not in merged:
+                merged[key] = count + self.error
+        self.error += error
+        if (len(merged) > self.capacity):
+            kept = heapq.nlargest(self.capacity + 1, merged.items(), key=operator.itemgetter(1))
+            self.error = max(self.error, kept[-1][1])
+            merged = dict(kept[:-1])
+        self.counts = merged
+
+    # [(key, count)] largest first
+    def top(self, k=None):
+        if k is None:
+            return sorted(self.counts.items(), key=operator.itemgetter(1), reverse=True)
+        return heapq.nlargest(k, self.counts.items(), key=operator.itemgetter(1))
+
+
+class HeavyHitters:
+
+    # one SpaceSaving summary of prefix starts per prefix length; memory is
+    # capacity * len(levels) keys no matter how long the stream is
+    def __init__(self, bits=32, capacity=1000, levels=None):
+        self.bits = bits
+        self.levels = sorted(levels or (range(8, 33) if bits == 32 else list(range(16, 65, 4)) + [128]))
+        self.sketches = {prefixlen: SpaceSaving(capacity) for prefixlen in self.levels}
+        self.total = 0
+
+    # count a batch of address ints; every level is an exact Counter over the
+    # masked batch (map/Counter run in C), trimmed before it reaches the summary
+    def add(self, addrs):
+        self.total += len(addrs)
+        for prefixlen in self.levels:
+            mask = ((1 << self.bits) - 1) ^ (blockSize(prefixlen, self.bits) - 1)
+            self.sketches[prefixlen].update(collections.Counter(map(mask.__and__, addrs)))
+
+    def merge(self, other):
+        if (other.bits != self.bits or other.levels != self.levels):
+            raise ValueError('heavy hitter summaries do not match')
+        for prefixlen in self.levels:
+            self.sketches[prefixlen].merge(other.sketches[prefixlen])
+        self.total += other.total
+
+    # largest error of any count at prefixlen
+    def error(self, prefixlen):
+        return self.sketches[prefixlen].error
+
+    # [(start, count)] for the busiest /prefixlen blocks
+    def top(self, prefixlen, k=10):
+        return self.sketches[prefixlen].top(k)
+
+    # busiest blocks at the next level down inside start/prefixlen, [] at the bottom
+    def children(self, start, prefixlen, k=None):
+        index = self.levels.index(prefixlen) + 1
+        if (index == len(self.levels)):
+            return []
+        end = start + blockSize(prefixlen, self.bits) - 1
+        inside = [(child, count) for child, count in self.sketches[self.levels[index]].counts.items() if start <= child <= end]
+        inside.sort(key=operator.itemgetter(1), reverse=True)
+        return inside[:k] if k else inside
+
+    # hierarchical heavy hitters: (start, prefixlen, count, residual) for every
+    # block whose traffic, less that of heavy hitters below it, is >= threshold
+    def hierarchical(self, threshold):
+        found = []
+        below = []      # (start, end, count) of hitters already reported underneath
+        for prefixlen in reversed(self.levels):
+            size = blockSize(prefixlen, self.bits)
+            level = []
+            for start, count in self.sketches[prefixlen].counts.items():
+                if (count < threshold):
+                    continue
+                residual = count - sum(hit for first, last, hit in below if start <= first and last < start + size)
+                if (residual >= threshold):
+                    found.append((start, prefixlen, count, residual))
+                    level.append((start, start + size - 1, count))
+            # only the outermost hitters count against the levels above
+            below = level + [hit for hit in below if not any(first <= hit[0] and hit[1] <= last for first, last, count in level)]
+        found.sort(key=lambda hit: (hit[1], hit[0]))
+        return found
+
+def _heavyChunk(path, start, end, capacity, batchSize):
+    hitters4, hitters6 = HeavyHitters(32, capacity), HeavyHitters(128, capacity)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        while start < end:
+            cut = data.find(b'\n', min(start + batchSize, end - 1), end)
+            cut = end if cut < 0 else cut + 1
+            v4, v6 = extractBuffer(data, start, cut)
+            hitters4.add(v4)
+            hitters6.add(v6)
+            start = cut
+    return hitters4, hitters6
+
+# heavy hitter summaries (IPv4, IPv6) for every address in a text file; each
+# worker summarizes its chunk in batches and the summaries are merged here
+def heavyHittersFile(path, capacity=1000, processes=None, chunkSize=64 << 20, batchSize=8 << 20):
+    processes = processes or os.cpu_count() or 1
+    chunks = max(processes, os.path.getsize(path) // chunkSize + 1)
+    jobs = [(path, start, end, capacity, batchSize) for start, end in _lineChunks(path, chunks)]
+
+    hitters4, hitters6 = HeavyHitters(32, capacity), HeavyHitters(128, capacity)
+    if (processes == 1 or len(jobs) <= 1):
+        results = (_heavyChunk(*job) for job in jobs)
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.starmap(_heavyChunk, jobs)
+    for chunk4, chunk6 in results:
+        hitters4.merge(chunk4)
+        hitters6.merge(chunk6)
+    return hitters4, hitters6
+
+
+#-----------------------
+# multicast MAC mapping
+#-----------------------
+
+# (multicast prefix, MAC prefix, bits of the group copied into the MAC) by address width
+MULTICAST_MACS = {
+    32: ((0xe << 28, 4), 0x01005e000000, 23),
+    128: ((0xff << 120, 8), 0x333300000000, 32),
+}
+
+def isMulticast(addr, bits=32):
+    (prefix, prefixlen), base, low = MULTICAST_MACS[bits]
+    return addr >> (bits - prefixlen) == prefix >> (bits - prefixlen)
+
+# Ethernet MAC (int) a multicast group is sent to
+def multicastMAC(addr, bits=32):
+    if not isMulticast(addr, bits):
+        raise ValueError('{} is not a multicast address'.format(formatAddr(addr, bits)))
+    (prefix, prefixlen), base, low = MULTICAST_MACS[bits]
+    return base | (addr & ((1 << low) - 1))
+
+def formatMAC(mac):
+    return ':'.join('{:02x}'.format((mac >> shift) & 255) for shift in range(40, -8, -8))
+
+# group addresses that share a MAC: ([(mac, [groups])] sorted by MAC, number of
+# non-multicast addresses skipped). The masking and counting run through
+# map/Counter/compress so millions of groups stay out of the Python loop.
+def multicastCollisions(addrs, bits=32):
+    (prefix, prefixlen), base, low = MULTICAST_MACS[bits]
+    shift = bits - prefixlen
+    groups = set(addrs)
+    total = len(groups)
+    groups = sorted(itertools.compress(groups, map((prefix >> shift).__eq__, map(operator.rshift, groups, itertools.repeat(shift)))))
+    skipped = total - len(groups)
+
+    mask = (1 << low) - 1
+    keys = list(map(mask.__and__, groups))
+    shared = {key for key, count in collections.Counter(keys).items() if count > 1}
+    collisions = collections.defaultdict(list)
+    for key, group in zip(itertools.compress(keys, map(shared.__contains__, keys)),
+                          itertools.compress(groups, map(shared.__contains__, keys))):
+        collisions[base | key].append(group)
+    return sorted(collisions.items()), skipped
+
+# the same for (first, last) group ranges of any size, worked out on the
+# intervals: a range spanning 2^low groups (2^23 for IPv4) hits every MAC,
+# so per-MAC counts come from a sweep over the MAC key space, never from the
+# addresses. Returns (rows, MACs shared, groups sharing them, non-multicast
+# addresses skipped); rows are (mac, group count, first few groups) for up to
+# limit MACs.
+def multicastRangeCollisions(ranges, bits=32, limit=1024, shown=8):
+    (prefix, prefixlen), base, low = MULTICAST_MACS[bits]
+    blockFirst, blockLast = prefix, prefix + blockSize(prefixlen, bits) - 1
+    keys = 1 << low
+    intervals, skipped = [], 0
+    for first, last in mergeRanges(ranges):
+        clipped = (max(first, blockFirst), min(last, blockLast))
+        if (clipped[0] > clipped[1]):
+            skipped += last - first + 1
+            continue
+        skipped += (last - first + 1) - (clipped[1] - clipped[0] + 1)
+        intervals.append(clipped)
+
+    # every key gets count // keys, plus one over a (wrapping) run of the rest
+    everywhere = 0
+    events = collections.Counter()
+    for first, last in intervals:
+        wraps, rest = divmod(last - first + 1, keys)
+        everywhere += wraps
+        start = first & (keys - 1)
+        if (start + rest <= keys):
+            events[start] += 1
+            events[start + rest] -= 1
+        else:
+            events[start] += 1
+            events[keys] -= 1
+            events[0] += 1
+            events[start + rest - keys] -= 1
+
+    shared = []     # (first key, end key, groups per key) runs with collisions
+    running = 0
+    positions = sorted(events) + [keys]
+    previous = 0
+    for position in positions:
+        if (position > previous and everywhere + running > 1):
+            shared.append((previous, min(position, keys), everywhere + running))
+        if (position < keys):
+            running += events[position]
+        previous = max(previous, position)
+    macs = sum(end - start for start, end, count in shared)
+    groups = sum((end - start) * count for start, end, count in shared)
+
+    starts = [first for first, last in intervals]
+    candidates = 1 << (bits - prefixlen - low)
+    rows = []
+    for start, end, count in shared:
+        for key in range(start, min(end, start + limit - len(rows))):
+            rows.append((base | key, count, _keyGroups(intervals, starts, key, keys, candidates, blockFirst, shown)))
+        if (len(rows) >= limit):
+            break
+    return rows, macs, groups, skipped
+
+# the first few groups in intervals whose low bits are key
+def _keyGroups(intervals, starts, key, keys, candidates, blockFirst, count):
+    found = []
+    if (candidates <= len(intervals)):
+        for addr in range(blockFirst | key, blockFirst + candidates * keys, keys):
+            index = bisect.bisect_right(starts, addr) - 1
+            if (index >= 0 and addr <= intervals[index][1]):
+                found.append(addr)
+                if (len(found) == count):
+                    break
+        return found
+    for first, last in intervals:
+        addr = first + ((key - first) & (keys - 1))
+        while (addr <= last and len(found) < count):
+            found.append(addr)
+            addr += keys
+        if (len(found) == count):
+            break
+    return sorted(found)
+
+
+#-------------------
+# Hilbert curve map
+#-------------------
+
+# special-purpose blocks (RFC 6890 and friends) drawn on the map
+SPECIAL_RANGES = {
+    32: ('0.0.0.0/8', '10.0.0.0/8', '100.64.0.0/10', '127.0.0.0/8', '169.254.0.0/16', '172.16.0.0/12',
+         '192.0.0.0/24', '192.0.2.0/24', '192.88.99.0/24', '192.168.0.0/16', '198.18.0.0/15',
+         '198.51.100.0/24', '203.0.113.0/24', '224.0.0.0/4', '240.0.0.0/4'),
+    128: ('::/128', '::1/128', '::ffff:0:0/96', '64:ff9b::/96', '100::/64', '2001::/32', '2001:db8::/32',
+          '2002::/16', 'fc00::/7', 'fe80::/10', 'fec0::/10', 'ff00::/8'),
+}
+
+# cell d of an order-n curve (2**n cells a side) to (x, y), one level per step
+def _hilbertPointSlow(d, order):
+    x = y = 0
+    side = 1
+    while side < (1 << order):
+        rx = 1 & (d >> 1)
+        ry = 1 & (d ^ rx)
+        if (ry == 0):
+            if (rx == 1):
+                x, y = side - 1 - x, side - 1 - y
+            x, y = y, x
+        x += side * rx
+        y += side * ry
+        d >>= 2
+        side <<= 1
+    return x, y
+
+# the eight ways a square sub-curve can be turned, on a side n box
+_turns = (
+    lambda x, y, n: (x, y),
+    lambda x, y, n: (y, x),
+    lambda x, y, n: (n - 1 - x, n - 1 - y),
+    lambda x, y, n: (n - 1 - y, n - 1 - x),
+    lambda x, y, n: (n - 1 - x, y),
+    lambda x, y, n: (x, n - 1 - y),
+    lambda x, y, n: (y, n - 1 - x),
+    lambda x, y, n: (n - 1 - y, x),
+)
+
+# top-down lookup table, 4 levels (8 bits of d) per step: for every turn
+# state and byte, the 16x16 position and the turn the rest of the curve takes
+def _hilbertTable():
+    base = [_hilbertPointSlow(d, 4) for d in range(256)]
+    probe = [(x, y) for x in (0, 1, 5) for y in (0, 3)]
+    compose = [[next(u for u in range(8) if all(_turns[u](x, y, 16) == _turns[s](*_turns[t](x, y, 16), 16) for x, y in probe))
+                for t in range(8)] for s in range(8)]
+    table = [[None] * 256 for s in range(8)]
+    for c in range(256):
+        bx, by = base[c]
+        points = {e: _hilbertPointSlow((c << 8) | e, 8) for e in (0, 1, 2, 100)}
+        turn = next(t for t in range(8) if all(points[e] == (16*bx + _turns[t](*base[e], 16)[0], 16*by + _turns[t](*base[e], 16)[1]) for e in points))
+        for s in range(8):
+            table[s][c] = (_turns[s](bx, by, 16), compose[s][turn])
+    return table
+
+_hilbert = _hilbertTable()
+
+# cell d of an order-n curve (2**n cells a side) to (x, y)
+def hilbertPoint(d, order):
+    chunks = (order + 3) // 4
+    x = y = state = 0
+    for shift in range(8 * chunks - 8, -8, -8):
+        (bx, by), state = _hilbert[state][(d >> shift) & 255]
+        x = (x << 4) | bx
+        y = (y << 4) | by
+    # every level the table adds above the curve's own transposes it
+    if (4 * chunks - order) % 2:
+        x, y = y, x
+    return x, y
+
+# (x, y) of an order-n curve back to the cell number
+def hilbertIndex(x, y, order):
+    d = 0
+    last = (1 << order) - 1
+    side = 1 << order >> 1
+    while side:
+        rx = 1 if x & side else 0
+        ry = 1 if y & side else 0
+        d += side * side * ((3 * rx) ^ ry)
+        if (ry == 0):
+            if (rx == 1):
+                x, y = last - x, last - y
+            x, y = y, x
+        side >>= 1
+    return d
+
+
+class HilbertMap:
+
+    # pixel geometry of a block laid out on a Hilbert curve. The whole block is
+    # 2**order cells a side; the view is square (x, y) of the 4**level squares
+    # it splits into, side pixels across, one pixel per cell. Views keep the
+    # whole block's orientation so panning and zooming line up.
+    def __init__(self, network, size=1024, level=0, x=0, y=0):
+        self.start, self.prefixlen, self.bits = parseNetwork(network)
+        hostbits = self.bits - self.prefixlen
+        self.maxLevel = hostbits // 2
+        self.level = min(level, self.maxLevel)
+        self.order = min(size.bit_length() - 1 + self.level, self.maxLevel)
+        self.side = 1 << (self.order - self.level)
+        self.cellShift = hostbits - 2 * self.order
+
+        self.x, self.y = x, y
+        self.x0, self.y0 = x * self.side, y * self.side
+        viewCells = self.side * self.side
+        self.firstCell = hilbertIndex(x, y, self.level) * viewCells
+        self.first = self.start + (self.firstCell << self.cellShift)
+        self.last = self.first + (viewCells << self.cellShift) - 1
+
+    # (first, last) addresses shown by pixel px, py
+    def cellAt(self, px, py):
+        cell = hilbertIndex(self.x0 + px, self.y0 + py, self.order)
+        first = self.start + (cell << self.cellShift)
+        return first, first + (1 << self.cellShift) - 1
+
+    def _square(self, cell, span):
+        px, py = hilbertPoint(cell, self.order)
+        return (px - px % span) - self.x0, (py - py % span) - self.y0
+
+    # (x, y, width, height) pixel rectangles covering first..last; every
+    # aligned run of cells is a square or a 2:1 rectangle, so a range costs a
+    # few rectangles however many pixels it covers
+    def rects(self, first, last):
+        first, last = max(first, self.first), min(last, self.last)
+        if (first > last):
+            return []
+        rects = []
+        cellFirst = (first - self.start) >> self.cellShift
+        cellLast = (last - self.start) >> self.cellShift
+        for cell, prefixlen in rangeToCIDRs(cellFirst, cellLast, 2 * self.order):
+            exponent = 2 * self.order - prefixlen
+            span = 1 << (exponent // 2)
+            x, y = self._square(cell, span)
+            if (exponent % 2):
+                x2, y2 = self._square(cell + span * span, span)
+                x, y, width, height = min(x, x2), min(y, y2), span + abs(x2 - x), span + abs(y2 - y)
+            else:
+                width = height = span
+            rects.append((x, y, width, height))
+        return rects
+
+    # observed host density: (rectangles of fully used cells, [(px, py, fraction)]
+    # for partly used ones) from an AddressSet. Intervals inside one cell,
+    # the usual case for host lists, are just summed per cell.
+    def density(self, hosts):
+        full = []
+        counts = collections.defaultdict(int)
+        shift, cellSize = self.cellShift, 1 << self.cellShift
+        for first, last in hosts.intervalsIn(self.first, self.last):
+            cellFirst = (first - self.start) >> shift
+            cellLast = (last - self.start) >> shift
+            if (cellFirst == cellLast):
+                counts[cellFirst] += last - first + 1
+                continue
+            if (first - self.start) % cellSize:
+                counts[cellFirst] += cellSize - (first - self.start) % cellSize
+                cellFirst += 1
+            if (last - self.start + 1) % cellSize:
+                counts[cellLast] += (last - self.start) % cellSize + 1
+                cellLast -= 1
+            if (cellFirst <= cellLast):
+                full.extend(self.rects(self.start + (cellFirst << shift), self.start + ((cellLast + 1) << shift) - 1))
+        cells = []
+        for cell, count in counts.items():
+            px, py = hilbertPoint(cell, self.order)
+            cells.append((px - self.x0, py - self.y0, count / cellSize))
+        return full, cells
+
+
+#-------------------
+# prefix delegation
+#-------------------
+
+_poolHeader = struct.Struct('<QQBBI2x')       #start high, low, prefixlen, delegationlen, cursor
+
+class DelegationPool:
+
+    # customer prefixes of one size carved from a provider block: a Bitset of
+    # slots (2 MB for the 16M /56s of a /32) and a customer id -> slot dict.
+    # Allocation is next-fit from a cursor, so it is O(1) amortized.
+    def __init__(self, network, delegationlen):
+        self.start, self.prefixlen, self.bits = parseNetwork(network)
+        if not self.prefixlen <= delegationlen <= self.bits:
+            raise ValueError('/{} delegations do not fit in {}'.format(delegationlen, self.network()))
+        if (delegationlen - self.prefixlen > 32):
+            raise ValueError('{} has more than 2**32 /{} delegations'.format(self.network(), delegationlen))
+        self.delegationlen = delegationlen
+        self.slots = Bitset(1 << (delegationlen - self.prefixlen))
+        self.customers = {}
+        self.cursor = 0
+
+    def __len__(self):
+        return len(self.customers)
+
+    def __contains__(self, customer):
+        return customer in self.customers
+
+    def network(self):
+        return formatNetwork(self.start, self.prefixlen, self.bits)
+
+    def _prefix(self, slot):
+        return self.start + (slot << (self.bits - self.delegationlen))
+
+    def _slot(self, start):
+        slot = (start - self.start) >> (self.bits - self.delegationlen)
+        if not (0 <= slot < len(self.slots) and self._prefix(slot) == start):
+            raise ValueError('{} is not a /{} in {}'.format(formatAddr(start, self.bits), self.delegationlen, self.network()))
+        return slot
+
+    def _nextFree(self):
+        slot = self.slots.nextFree(self.cursor)
+        if (slot is None and self.cursor):
+            slot = self.slots.nextFree(0)
+        return slot
+
+    # delegate a prefix to customer (or the given start), returns its start;
+    # a customer that already has one gets it back, None when the pool is full
+    def allocate(self, customer, start=None):
+        if customer in self.customers:
+            return self._prefix(self.customers[customer])
+        if start is None:
+            slot = self._nextFree()
+            if slot is None:
+                return None
+            self.cursor = slot + 1
+        else:
+            slot = self._slot(start)
+            if self.slots.test(slot):
+                raise ValueError('{} is already delegated'.format(formatNetwork(start, self.delegationlen, self.bits)))
+        self.slots.set(slot)
+        self.customers[customer] = slot
+        return self._prefix(slot)
+
+    # delegate to many new customers at once, a whole free run per step;
+    # returns how many got a prefix before the pool ran out
+    def allocateMany(self, customers):
+        customers = [customer for customer in dict.fromkeys(customers) if customer not in self.customers]
+        done = 0
+        while done < len(customers):
+            slot = self._nextFree()
+            if slot is None:
+                break
+            count = min(self._freeRun(slot), len(customers) - done)
+            self.slots.setRange(slot, slot + count - 1)
+            self.customers.update(zip(customers[done:done+count], range(slot, slot + count)))
+            self.cursor = slot + count
+            done += count
+        return done
+
+    # number of free slots from slot on: bit by bit to a byte boundary, then
+    # empty bytes are skipped by the regex engine
+    def _freeRun(self, slot):
+        size = len(self.slots)
+        end = slot + 1
+        while end & 7 and end < size and not self.slots.test(end):
+            end += 1
+        if (end & 7 == 0 and end < size):
+            match = _notEmpty.search(self.slots.map, end >> 3)
+            end = match.start() << 3 if match else size
+            while end < size and not self.slots.test(end):
+                end += 1
+        return min(end, size) - slot
+
+    # return a customer's prefix to the pool, False if it had none
+    def release(self, customer):
+        slot = self.customers.pop(customer, None)
+        if slot is None:
+            return False
+        self.slots.set(slot, False)
+        return True
+
+    # start of a customer's prefix, or None
+    def lookup(self, customer):
+        slot = self.customers.get(customer)
+        return None if slot is None else self._prefix(slot)
+
+    def isDelegated(self, start):
+        return self.slots.test(self._slot(start))
+
+    # (delegated, total) prefixes
+    def utilization(self):
+        return self.slots.used, len(self.slots)
+
+    # header, pool geometry and cursor, the bitmap, a uint32 slot column and the
+    # customer ids as a JSON list, so ids keep their type and any character
+    def save(self, path):
+        for customer in self.customers:
+            if not isinstance(customer, (str, int)):
+                raise ValueError('customer id {!r} is not a string or integer'.format(customer))
+        slots = array('I', self.customers.values())
+        if (sys.byteorder != 'little'):
+            slots.byteswap()
+        with open(path, 'wb') as f:
+            f.write(_header.pack(FILE_MAGIC, FILE_VERSION, self.bits, KIND_DELEGATIONS, len(self.customers)))
+            f.write(_poolHeader.pack(self.start >> 64, self.start & 0xFFFFFFFFFFFFFFFF, self.prefixlen, self.delegationlen,
+                                     self.cursor % len(self.slots)))
+            f.write(self.slots.map)
+            f.write(slots.tobytes())
+            f.write(json.dumps(list(self.customers), separators=(',', ':')).encode())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if (len(data) < _header.size + _poolHeader.size):
+            raise ValueError('{} is not a delegation pool file'.format(path))
+        magic, version, bits, kind, count = _header.unpack_from(data)
+        if (magic != FILE_MAGIC or kind != KIND_DELEGATIONS or bits not in (32, 128)):
+            raise ValueError('{} is not a delegation pool file'.format(path))
+        if (version != FILE_VERSION):
+            raise ValueError('{} is format version {}, expected {}'.format(path, version, FILE_VERSION))
+        high, low, prefixlen, delegationlen, cursor = _poolHeader.unpack_from(data, _header.size)
+        pool = cls(formatNetwork((high << 64) | low, prefixlen, bits), delegationlen)
+        pool.cursor = cursor if cursor < len(pool.slots) else 0
+
+        offset = _header.size + _poolHeader.size
+        if (len(data) < offset + len(pool.slots.map) + 4*count):
+            raise ValueError('{} is truncated'.format(path))
+        pool.slots.map[:] = data[offset:offset+len(pool.slots.map)]
+        pool.slots.used = pool.slots.count()
+        offset += len(pool.slots.map)
+        slots = array('I', data[offset:offset+4*count])
+        if (sys.byteorder != 'little'):
+            slots.byteswap()
+        customers = json.loads(data[offset+4*count:].decode())
+        if not (isinstance(customers, list) and len(customers) == count == len(slots)):
+            raise ValueError('{} has a damaged customer list'.format(path))
+        pool.customers = dict(zip(customers, slots))
+        return pool
+
+
+#----------------
+# EUI-64 / SLAAC
+#----------------
+
+NO_MAC = 0xFFFFFFFFFFFFFFFF     # interface ID that was not built from a MAC
+
+_flipUL = bytes(byte ^ 0x02 for byte in range(256))
+_macSeparators = b':-. \t\r'
+_macDigits = re.compile('[0-9a-fA-F]{12}')
+
+def parseMAC(text):
+    digits = text.strip().translate(str.maketrans('', '', ':-. '))
+    if not _macDigits.fullmatch(digits):
+        raise ValueError('{!r} is not a MAC address'.format(text))
+    return int(digits, 16)
+
+# modified EUI-64 interface ID of a MAC: U/L bit flipped, FFFE in the middle
+def macToInterfaceID(mac):
+    return (((mac >> 24) << 40) | (0xFFFE << 24) | (mac & 0xFFFFFF)) ^ (0x02 << 56)
+
+# MAC an interface ID was built from, or None if it is not EUI-64 based
+def interfaceIDToMAC(iid):
+    if ((iid >> 24) & 0xFFFF != 0xFFFE):
+        return None
+    iid ^= 0x02 << 56
+    return ((iid >> 40) << 24) | (iid & 0xFFFFFF)
+
+def formatInterfaceID(iid):
+    return iid.to_bytes(8, 'big').hex(':')
+
+def slaacAddress(prefix, mac):
+    return (prefix & ~0xFFFFFFFFFFFFFFFF) | macToInterfaceID(mac)
+
+# array('Q') <-> 8-byte big-endian records
+def _bigEndian(values):
+    column = array('Q', values)
+    if (sys.byteorder == 'little'):
+        column.byteswap()
+    return column.tobytes()
+
+def _fromBigEndian(data):
+    column = array('Q')
+    column.frombytes(data)
+    if (sys.byteorder == 'little'):
+        column.byteswap()
+    return column
+
+# the bulk conversions move bytes with strided slice assignment and flip the
+# U/L bit with bytes.translate, so no Python code runs per entry
+
+# array('Q') of MACs to array('Q') of interface IDs
+def interfaceIDs(macs):
+    data = _bigEndian(macs)
+    count = len(data) >> 3
+    out = bytearray(len(data))
+    out[0::8] = data[2::8].translate(_flipUL)
+    out[1::8] = data[3::8]
+    out[2::8] = data[4::8]
+    out[3::8] = b'\xff' * count
+    out[4::8] = b'\xfe' * count
+    out[5::8] = data[5::8]
+    out[6::8] = data[6::8]
+    out[7::8] = data[7::8]
+    return _fromBigEndian(out)
+
+# array('Q') of interface IDs to array('Q') of MACs, NO_MAC where there is none
+def interfaceMACs(iids):
+    data = _bigEndian(iids)
+    out = bytearray(len(data))
+    out[2::8] = data[0::8].translate(_flipUL)
+    out[3::8] = data[1::8]
+    out[4::8] = data[2::8]
+    out[5::8] = data[5::8]
+    out[6::8] = data[6::8]
+    out[7::8] = data[7::8]
+    macs = _fromBigEndian(out)
+    for column, marker in ((data[3::8], rb'[^\xff]'), (data[4::8], rb'[^\xfe]')):
+        for match in re.finditer(marker, column):
+            macs[match.start()] = NO_MAC
+    return macs
+
+# SLAAC addresses (ints) for a /64 prefix and an array of MACs
+def slaacAddresses(prefix, macs):
+    return list(map((prefix & ~0xFFFFFFFFFFFFFFFF).__or__, interfaceIDs(macs)))
+
+# MACs behind IPv6 address ints, NO_MAC for non EUI-64 interface IDs
+def addressMACs(addrs):
+    return interfaceMACs(map(0xFFFFFFFFFFFFFFFF.__and__, addrs))
+
+# MAC text lines (first field of each) to (array('Q'), skipped line count)
+def _packMACs(lines):
+    digits = [line.split(b',')[0].translate(None, _macSeparators) for line in lines]
+    good = [field for field in digits if len(field) == 12]
+    try:
+        data = bytes.fromhex(b''.join(good).decode('ascii'))
+    except ValueError:
+        good = [field for field in good if not field.strip(b'0123456789abcdefABCDEF')]
+        data = bytes.fromhex(b''.join(good).decode('ascii'))
+    out = bytearray(len(good) * 8)
+    for index in range(6):
+        out[index+2::8] = data[index::6]
+    return _fromBigEndian(out), len(lines) - len(good) - digits.count(b'')
+
+def _readLines(path, batch):
+    with open(path, 'rb') as f:
+        while True:
+            lines = f.readlines(batch)
+            if not lines:
+                break
+            yield [line.strip() for line in lines]
+
+# stream a MAC list into 'mac,address' lines for a /64; returns (written, skipped)
+def slaacFile(inPath, outPath, prefix, batch=4 << 20):
+    prefix &= ~0xFFFFFFFFFFFFFFFF
+    head = _fullGroups(*_eightGroups.unpack(prefix.to_bytes(16, 'big'))).rsplit(':', 5)[0] + ':{:x}:{:x}:{:x}:{:x}:'
+    written = skipped = 0
+    with open(outPath, 'w') as out:
+        for lines in _readLines(inPath, batch):
+            macs, bad = _packMACs(lines)
+            iids = _bigEndian(interfaceIDs(macs))
+            macText = _bigEndian(macs).hex(':')
+            addrs = map(_compress, itertools.starmap(head.format, struct.iter_unpack('>4H', iids)))
+            out.write(''.join('{},{}\n'.format(macText[24*index+6:24*index+23], addr) for index, addr in enumerate(addrs)))
+            written += len(macs)
+            skipped += bad
+    return written, skipped
+
+# stream IPv6 address lines into 'address,mac' lines, mac empty when the
+# interface ID is not EUI-64; returns (written, skipped)
+def macFile(inPath, outPath, batch=4 << 20):
+    written = skipped = 0
+    with open(outPath, 'w') as out:
+        for lines in _readLines(inPath, batch):
+            texts, addrs = [], []
+            for line in lines:
+                text = line.split(b',')[0].decode('ascii', 'replace').strip()
+                if not text:
+                    continue
+                try:
+                    addrs.append(parseIPv6(text))
+                except ValueError:
+                    skipped += 1
+                    continue
+                texts.append(text)
+            macText = _bigEndian(addressMACs(addrs)).hex(':')
+            out.write(''.join('{},{}\n'.format(text, '' if macText[24*index:24*index+5] == 'ff:ff' else macText[24*index+6:24*index+23])
+                              for index, text in enumerate(texts)))
+            written += len(texts)
+    return written, skipped
+
+
+#---------------------------------
+# IPv4 addresses embedded in IPv6
+#---------------------------------
+
+NAT64_PREFIX = 0x0064FF9B << 96     # 64:ff9b::/96 well-known prefix
+NAT64_PREFIXLENS = (32, 40, 48, 56, 64, 96)
+
+# kind -> (default prefix, shift of the IPv4 field, bits the kind fixes).
+# Bits outside the fixed ones and the IPv4 field come from the caller's
+# prefix, e.g. the /64 of an ISATAP address or the server of a Teredo one.
+EMBEDDINGS = {
+    'mapped':     (0xFFFF << 32, 0, (1 << 128) - 1),
+    'compatible': (0, 0, (1 << 128) - 1),
+    'nat64':      (NAT64_PREFIX, 0, None),
+    'teredo':     (0x20010000 << 96, 0, 0xFFFFFFFF << 96),
+    '6to4':       (0x2002 << 112, 80, 0xFFFF << 112),
+    '6over4':     (0xFE80 << 112, 0, 0xFFFFFFFFFFFFFFFF),
+    'isatap':     ((0xFE80 << 112) | (0x5EFE << 32), 0, 0xFDFFFFFFFFFFFFFF),
+}
+
+# (base, check mask, parts, inverted) for an embedding, where parts are
+# (IPv4 shift, mask, IPv6 shift) pieces of the IPv4 field.  RFC 6052 NAT64
+# prefixes shorter than /96 split the IPv4 address around bits 64-71.
+def _embedding(kind, prefix=None, prefixlen=96):
+    try:
+        default, shift, fixed = EMBEDDINGS[kind]
+    except KeyError:
+        raise ValueError('unknown IPv4 embedding {!r}'.format(kind)) from None
+    parts = ((0, 0xFFFFFFFF, shift),)
+
+    if (kind == 'nat64'):
+        if prefixlen not in NAT64_PREFIXLENS:
+            raise ValueError('NAT64 prefix length must be one of {}'.format(NAT64_PREFIXLENS))
+        fixed = ((1 << prefixlen) - 1) << (128 - prefixlen)
+        if (prefixlen <= 64):
+            head = min(32, 64 - prefixlen)
+            tail = 32 - head
+            fixed |= 0xFF << 56
+            parts = tuple(part for part in ((tail, (1 << head) - 1, 64), (0, (1 << tail) - 1, 56 - tail)) if part[1])
+        if prefix is not None:
+            default = prefix & fixed
+        prefix = None
+
+    field = 0
+    for v4shift, mask, v6shift in parts:
+        field |= mask << v6shift
+    check = fixed & ~field
+    base = (default & check) | ((default if prefix is None else prefix) & ~fixed & ~field)
+    return base, check, parts, kind == 'teredo'
+
+def embedIPv4(v4, kind='nat64', prefix=None, prefixlen=96):
+    base, check, parts, inverted = _embedding(kind, prefix, prefixlen)
+    if inverted:
+        v4 ^= 0xFFFFFFFF
+    for v4shift, mask, v6shift in parts:
+        base |= ((v4 >> v4shift) & mask) << v6shift
+    return base
+
+# IPv4 address carried by an IPv6 one, assuming it is of that kind
+def extractIPv4(v6, kind='nat64', prefixlen=96):
+    base, check, parts, inverted = _embedding(kind, None, prefixlen)
+    v4 = 0
+    for v4shift, mask, v6shift in parts:
+        v4 |= ((v6 >> v6shift) & mask) << v4shift
+    return v4 ^ 0xFFFFFFFF if inverted else v4
+
+def isEmbedding(v6, kind='nat64', prefix=None, prefixlen=96):
+    base, check, parts, inverted = _embedding(kind, prefix, prefixlen)
+    return v6 & check == base & check
+
+# (kind, IPv4 int) for the embedding an address uses, or None.  6over4 and
+# IPv4-compatible interface IDs look like any small number, so those two only
+# count under fe80::/64 and ::/96.
+def findEmbedding(v6):
+    for kind in ('mapped', 'nat64', 'teredo', '6to4', 'isatap'):
+        if isEmbedding(v6, kind):
+            return kind, extractIPv4(v6, kind)
+    if (v6 >> 32 == 0xFE80 << 80):
+        return '6over4', v6 & 0xFFFFFFFF
+    if (v6 >> 32 == 0 and v6 > 1):
+        return 'compatible', v6
+    return None
+
+# (server, flags, port, client) of a Teredo address, port and client de-obfuscated
+def teredoFields(v6):
+    return (v6 >> 64) & 0xFFFFFFFF, (v6 >> 48) & 0xFFFF, ((v6 >> 32) & 0xFFFF) ^ 0xFFFF, (v6 & 0xFFFFFFFF) ^ 0xFFFFFFFF
+
+# the prefix to embed Teredo clients under for a server, port and flags
+def teredoPrefix(server, port=0, flags=0):
+    return (0x20010000 << 96) | (server << 64) | (flags << 48) | ((port ^ 0xFFFF) << 32)
+
+# the bulk versions chain shifts and masks through map, so the per-address
+# work happens in C; IPv4 columns are array('I'), IPv6 ones lists of ints
+
+def embedIPv4Many(v4s, kind='nat64', prefix=None, prefixlen=96):
+    base, check, parts, inverted = _embedding(kind, prefix, prefixlen)
+    if inverted:
+        v4s = map(0xFFFFFFFF.__xor__, v4s)
+    if (len(parts) == 1):
+        v4shift, mask, v6shift = parts[0]
+        return list(map(base.__or__, map(operator.lshift, v4s, itertools.repeat(v6shift))))
+    v4s = array('I', v4s)
+    pieces = [map(operator.lshift, map(mask.__and__, map(operator.rshift, v4s, itertools.repeat(v4shift))), itertools.repeat(v6shift))
+              for v4shift, mask, v6shift in parts]
+    return list(map(base.__or__, map(operator.or_, *pieces)))
+
+def extractIPv4Many(v6s, kind='nat64', prefixlen=96):
+    base, check, parts, inverted = _embedding(kind, None, prefixlen)
+    if (len(parts) > 1 and not isinstance(v6s, (list, array))):
+        v6s = list(v6s)
+    pieces = [map(mask.__and__, map(operator.rshift, v6s, itertools.repeat(v6shift))) for v4shift, mask, v6shift in parts]
+    if (len(parts) == 1):
+        v4s = pieces[0]
+    else:
+        v4s = map(operator.or_, *(map(operator.lshift, piece, itertools.repeat(part[0])) for piece, part in zip(pieces, parts)))
+    if inverted:
+        v4s = map(0xFFFFFFFF.__xor__, v4s)
+    return array('I', v4s)
+
+# which of the addresses really are of that kind
+def embeddingMask(v6s, kind='nat64', prefix=None, prefixlen=96):
+    base, check, parts, inverted = _embedding(kind, prefix, prefixlen)
+    return list(map((base & check).__eq__, map(check.__and__, v6s)))
+
+# first field of each line parsed with parse, as (texts, ints, skipped)
+def _parseLines(lines, parse):
+    texts, values, skipped = [], [], 0
+    for line in lines:
+        text = line.split(b',')[0].decode('ascii', 'replace').strip()
+        if not text:
+            continue
+        try:
+            values.append(parse(text))
+        except ValueError:
+            skipped += 1
+            continue
+        texts.append(text)
+    return texts, values, skipped
+
+# stream IPv4 address lines into 'ipv4,ipv6' lines; returns (written, skipped).
+# Addresses with the IPv4 address in the last 32 bits are written in the
+# mixed notation RFC 5952 recommends for them, e.g. 64:ff9b::192.0.2.1.
+def embedFile(inPath, outPath, kind='nat64', prefix=None, prefixlen=96, batch=4 << 20):
+    base, check, parts, inverted = _embedding(kind, prefix, prefixlen)
+    mixed = parts == ((0, 0xFFFFFFFF, 0),) and not inverted
+    head = formatIPv6(base | 0xFFFFFFFF, mixed=False)[:-9]
+    written = skipped = 0
+    with open(outPath, 'w') as out:
+        for lines in _readLines(inPath, batch):
+            texts, v4s, bad = _parseLines(lines, parseIPv4)
+            if mixed:
+                out.write(''.join('{},{}{}\n'.format(text, head, formatAddr(v4)) for text, v4 in zip(texts, v4s)))
+            else:
+                v6s = embedIPv4Many(v4s, kind, prefix, prefixlen)
+                out.write(''.join('{},{}\n'.format(text, formatAddr(v6, 128)) for text, v6 in zip(texts, v6s)))
+            written += len(texts)
+            skipped += bad
+    return written, skipped
+
+# stream IPv6 address lines into 'ipv6,ipv4' lines, ipv4 empty when the
+# address is not of that kind; returns (written, skipped)
+def extractIPv4File(inPath, outPath, kind='nat64', prefix=None, prefixlen=96, batch=4 << 20):
+    written = skipped = 0
+    with open(outPath, 'w') as out:
+        for lines in _readLines(inPath, batch):
+            texts, v6s, bad = _parseLines(lines, parseIPv6)
+            v4s = extractIPv4Many(v6s, kind, prefixlen)
+            matches = embeddingMask(v6s, kind, prefix, prefixlen)
+            out.write(''.join('{},{}\n'.format(text, formatAddr(v4) if match else '') for text, v4, match in zip(texts, v4s, matches)))
+            written += len(texts)
+            skipped += bad
+    return written, skipped
+
+
+#--------------------
+# wildcard-mask ACLs
+#--------------------
+
+# IPv4 access lists as routers write them: ordered permit/deny entries of an
+# address and a wildcard whose set bits are "don't care", so the wildcard
+# need not be contiguous. An address matches an entry when
+# (addr | wildcard) == (address | wildcard); the first match wins and
+# anything left over is denied.
+
+ALL_BITS = 0xFFFFFFFF
+
+def formatWildcard(value, wildcard):
+    if (wildcard == ALL_BITS):
+        return 'any'
+    if (wildcard == 0):
+        return 'host ' + formatAddr(value)
+    return '{} {}'.format(formatAddr(value & ~wildcard), formatAddr(wildcard))
+
+# (value, wildcard, fields used) from the front of fields: 'any',
+# 'host a.b.c.d', 'a.b.c.d w.x.y.z', 'a.b.c.d/n' or a bare address
+def _wildcardFields(fields):
+    if (fields[0] == 'any'):
+        return 0, ALL_BITS, 1
+    if (fields[0] == 'host'):
+        return parseIPv4(fields[1]), 0, 2
+    if '/' in fields[0]:
+        start, prefixlen, bits = parseNetwork(fields[0])
+        if (bits != 32):
+            raise ValueError('{!r} is not an IPv4 prefix'.format(fields[0]))
+        return start, blockSize(prefixlen) - 1, 1
+    value = parseIPv4(fields[0])
+    if (len(fields) > 1 and fields[1].count('.') == 3):
+        wildcard = parseIPv4(fields[1])
+        return value & ~wildcard, wildcard, 2
+    return value, 0, 1
+
+def parseWildcard(text):
+    fields = text.split()
+    try:
+        value, wildcard, used = _wildcardFields(fields)
+    except IndexError:
+        used = -1
+    if (used != len(fields)):
+        raise ValueError('{!r} is not an address and wildcard'.format(text))
+    return value, wildcard
+
+# (permit, value, wildcard) entries from standard ACL text: 'permit ...' and
+# 'deny ...' lines, optionally after 'access-list NAME' or a sequence
+# number; remarks, '!' comments and 'ip access-list' headers are skipped
+def parseACL(lines):
+    entries = []
+    for number, line in enumerate(lines, 1):
+        fields = line.split('!')[0].split()
+        if (fields[:1] == ['access-list']):
+            fields = fields[2:]
+        if (fields and fields[0].isdigit()):
+            fields = fields[1:]
+        if (not fields or fields[0] in ('remark', 'ip')):
+            continue
+        try:
+            if (fields[0] not in ('permit', 'deny')):
+                raise ValueError
+            value, wildcard, used = _wildcardFields(fields[1:])
+            if (fields[1+used:] not in ([], ['log'], ['log-input'])):
+                raise ValueError
+        except (IndexError, ValueError):
+            raise ValueError('line {}: {!r} is not a standard ACL entry'.format(number, line.strip()))
+        entries.append((fields[0] == 'permit', value, wildcard))
+    return entries
+
+# the fewest (value, wildcard) pairs this finds that match exactly the
+# addresses in ranges ((first, last) pairs or an AddressSet). Starts from
+# the CIDR blocks and keeps merging two entries with the same wildcard whose
+# values differ in one cared-about bit, smallest wildcards first; with
+# contiguous=True only merges that stay CIDR blocks are made.
+def wildcardCover(ranges, contiguous=False):
+    if isinstance(ranges, AddressSet):
+        ranges = ranges.intervals()
+    groups = collections.defaultdict(set)
+    for first, last in mergeRanges(ranges):
+        for start, prefixlen in rangeToCIDRs(first, last):
+            groups[blockSize(prefixlen) - 1].add(start)
+
+    cover = []
+    queue = [(bin(wildcard).count('1'), wildcard) for wildcard in groups]
+    heapq.heapify(queue)
+    while queue:
+        free, wildcard = heapq.heappop(queue)
+        values = groups.pop(wildcard)
+        bits = [wildcard + 1] if contiguous else [1 << x for x in range(32) if not wildcard >> x & 1]
+        for bit in bits:
+            if (bit > ALL_BITS):
+                break
+            pairs = [value for value in values if not value & bit and value | bit in values]
+            if not pairs:
+                continue
+            merged = groups.get(wildcard | bit)
+            if merged is None:
+                merged = groups[wildcard | bit] = set()
+                heapq.heappush(queue, (free + 1, wildcard | bit))
+            for value in pairs:
+                values.discard(value)
+                values.discard(value | bit)
+                merged.add(value)
+        cover.extend((value, wildcard) for value in values)
+    return sorted(cover)
+
+class WildcardACL:
+
+    # entries are kept as columns; matching works on groups of entries that
+    # share a wildcard, {care mask: {address & care: first entry index}}, so
+    # a lookup is one dict probe per distinct wildcard rather than per entry
+    def __init__(self, entries=()):
+        self.permits = array('B')
+        self.values = array('I')
+        self.wildcards = array('I')
+        self._groups = None
+        for permit, value, wildcard in entries:
+            self.append(permit, value, wildcard)
+
+    @classmethod
+    def fromLines(cls, lines):
+        return cls(parseACL(lines))
+
+    # a permit (or deny) list for exactly the addresses in ranges
+    @classmethod
+    def fromRanges(cls, ranges, permit=True, contiguous=False):
+        return cls((permit, value, wildcard) for value, wildcard in wildcardCover(ranges, contiguous))
+
+    def append(self, permit, value, wildcard):
+        self.permits.append(bool(permit))
+        self.values.append(value & ~wildcard & ALL_BITS)
+        self.wildcards.append(wildcard)
+        self._groups = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return bool(self.permits[index]), self.values[index], self.wildcards[index]
+
+    def lines(self):
+        return ['{} {}'.format('permit' if permit else 'deny', formatWildcard(value, wildcard))
+                for permit, value, wildcard in zip(self.permits, self.values, self.wildcards)]
+
+    def _compiled(self):
+        if self._groups is None:
+            groups = {}
+            for index, value, wildcard in zip(itertools.count(), self.values, self.wildcards):
+                groups.setdefault(wildcard ^ ALL_BITS, {}).setdefault(value, index)
+            self._groups = list(groups.items())
+        return self._groups
+
+    # first matching entry index for every address (array('I'), len(self)
+    # for the implicit deny); one pass in C per distinct wildcard
+    def match(self, addrs):
+        addrs = addrs if isinstance(addrs, array) else array('I', addrs)
+        none = len(self)
+        best = None
+        for care, firsts in self._compiled():
+            hits = map(firsts.get, map(care.__and__, addrs), itertools.repeat(none))
+            best = array('I', hits if best is None else map(min, best, hits))
+        return best if best is not None else array('I', [none]) * len(addrs)
+
+    # array('B') of 1 for permitted addresses, 0 for denied
+    def permitted(self, addrs):
+        actions = self.permits + array('B', [0])
+        return array('B', map(actions.__getitem__, self.match(addrs)))
+
+    # matches per entry, with the implicit deny as one more count at the end
+    def hitCounts(self, addrs):
+        counts = collections.Counter(self.match(addrs))
+        return [counts[index] for index in range(len(self) + 1)]
+
+    # split a node cube (fixed value, free bits) on the highest free bit the
+    # first active entry cares about, keeping the entries each half still meets
+    def _split(self, value, free, active):
+        bit = 1 << (((self.wildcards[active[0]] ^ ALL_BITS) & free).bit_length() - 1)
+        for half in (value, value | bit):
+            yield half, free & ~bit, [index for index in active if not ((self.values[index] ^ half) & bit & ~self.wildcards[index])]
+
+    def _covers(self, index, free):
+        return not (self.wildcards[index] ^ ALL_BITS) & free
+
+    # does every address of the node get permit from the active entries? The
+    # entries deciding it are added to takers
+    def _uniform(self, value, free, active, permit, takers):
+        stack = [(value, free, active)]
+        while stack:
+            value, free, active = stack.pop()
+            if not active or self._covers(active[0], free):
+                taker = active[0] if active else len(self)
+                if (bool(active) and bool(self.permits[taker])) != permit:
+                    return False
+                takers.add(taker)
+            else:
+                stack.extend(self._split(value, free, active))
+        return True
+
+    # (index, 'shadowed', earlier entries matching first) for entries that
+    # can never match and (index, 'redundant', entries or len(self) for the
+    # implicit deny that would take over) for entries whose removal alone
+    # changes nothing. Works on cubes of the address space split only where
+    # entries partly overlap, so non-contiguous wildcards are no harder.
+    def check(self):
+        reached = [False] * len(self)
+        redundant = [True] * len(self)
+        shadowers = collections.defaultdict(set)
+        takers = collections.defaultdict(set)
+        stack = [(0, ALL_BITS, list(range(len(self))))]
+        while stack:
+            value, free, active = stack.pop()
+            if not active:
+                continue
+            if not self._covers(active[0], free):
+                stack.extend(self._split(value, free, active))
+                continue
+            owner = active[0]
+            reached[owner] = True
+            for index in active[1:]:
+                shadowers[index].add(owner)
+            if redundant[owner]:
+                redundant[owner] = self._uniform(value, free, active[1:], bool(self.permits[owner]), takers[owner])
+
+        findings = []
+        for index in range(len(self)):
+            if not reached[index]:
+                findings.append((index, 'shadowed', sorted(shadowers[index])))
+            elif redundant[index]:
+                findings.append((index, 'redundant', sorted(takers[index])))
+        return findings
+
+# hit counts for an ACL over a file of addresses (one per line, first CSV
+# field), read in batches; returns (counts, skipped lines)
+def aclHitsFile(acl, path, batch=4 << 20):
+    counts = [0] * (len(acl) + 1)
+    skipped = 0
+    for lines in _readLines(path, batch):
+        texts, addrs, bad = _parseLines(lines, parseIPv4)
+        counts = list(map(operator.add, counts, acl.hitCounts(addrs)))
+        skipped += bad
+    return counts, skipped
+
+
+#-----------------------
+# JSON-lines batch jobs
+#-----------------------
+
+# one job per input line, {"job": kind, ...} with the kinds below doing what
+# the matching tab shows. Each output line is {"line", "id" (when given),
+# "job", "result" or "error", "seconds"}, in input order. Jobs run in batches
+# on long-lived pool processes, so imports and the caches here stay warm.
+
+_jobNetwork = functools.lru_cache(maxsize=1 << 16)(parseNetwork)
+_negativeHosts = {bits: [-info.hosts for info in table] for bits, table in PREFIXES.items()}
+
+def _jobAddr(job, key='address'):
+    value = job[key]
+    if isinstance(value, int):
+        if not (0 <= value < 1 << 32):
+            raise ValueError('{} is not an IPv4 address'.format(value))
+        return value
+    return parseIPv4(value)
+
+# {"network", "newprefix" or "subnets", "limit"}: the first limit subnets
+def _splitJob(job):
+    start, prefixlen, bits = _jobNetwork(job['network'])
+    if 'newprefix' in job:
+        newprefix = int(job['newprefix'])
+    else:
+        subnets = int(job['subnets'])
+        if (subnets <= 0):
+            raise ValueError('subnets must be at least 1, not {}'.format(subnets))
+        newprefix = prefixlen + (subnets - 1).bit_length()
+    if not (prefixlen <= newprefix <= bits):
+        raise ValueError('cannot split {} into /{}'.format(job['network'], newprefix))
+    info = PREFIXES[bits][newprefix]
+    count = 1 << (newprefix - prefixlen)
+    shown = min(count, int(job.get('limit', 256)))
+    return {'count': count, 'size': info.size, 'hosts': info.hosts, 'mask': info.maskText,
+            'subnets': [formatNetwork(start + x*info.size, newprefix, bits) for x in range(shown)]}
+
+# {"network"}: the block's range as on the CIDR tab, or {"first", "last"}:
+# the fewest CIDR blocks covering an address range
+def _cidrJob(job):
+    if 'network' in job:
+        start, prefixlen, bits = _jobNetwork(job['network'])
+        info = PREFIXES[bits][prefixlen]
+        return {'network': formatNetwork(start, prefixlen, bits), 'first': formatAddr(start, bits),
+                'last': formatAddr(start + info.size - 1, bits), 'size': info.size, 'mask': info.maskText,
+                'wildcard': info.wildcardText}
+    first, bits = parseAddr(job['first'])
+    last, lastBits = parseAddr(job['last'])
+    if (bits != lastBits or first > last):
+        raise ValueError('bad range {} - {}'.format(job['first'], job['last']))
+    return {'cidrs': [formatNetwork(start, prefixlen, bits) for start, prefixlen in rangeToCIDRs(first, last, bits)]}
+
+# {"address"}: classful breakdown as on the Classes tab
+def _classifyJob(job):
+    value = _jobAddr(job)
+    top = value >> 28
+    name = IPV4_CLASSES[0 if top < 8 else 1 if top < 12 else 2 if top < 14 else 3 if top == 14 else 4]
+    special = {0: '"This" host', 1: '"This" network', 0xFFFFFFFF: 'Broadcast'}.get(value)
+    if (value >> 24 == 127):
+        special = 'Loopback'
+    classful = 8 if top < 8 else 16 if top < 12 else 24 if top < 14 else None
+    result = {'class': name, 'special': special, 'private': ipaddress.IPv4Address(value).is_private,
+              'network': formatNetwork(value >> (32-classful) << (32-classful), classful) if classful else None}
+    if isMulticast(value):
+        result['mac'] = formatMAC(multicastMAC(value))
+    return result
+
+# {"address" or "value"}: the Conversions tab formats
+def _convertJob(job):
+    value = job.get('value')
+    if isinstance(value, str):
+        value = int(value, 0)
+    value = _jobAddr(job) if value is None else _jobAddr({'address': value})
+    binary = '{:032b}'.format(value)
+    return {'dotted': formatAddr(value), 'decimal': value, 'hex': '0x{:08x}'.format(value),
+            'dottedHex': '.'.join('{:02x}'.format(octet) for octet in value.to_bytes(4, 'big')),
+            'binary': binary, 'dottedBinary': '.'.join(binary[x:x+8] for x in range(0, 32, 8))}
+
+# {"network", "hosts": [counts]}: smallest fitting subnet for each count,
+# placed largest first; null where the network has no room left
+def _vlsmJob(job):
+    start, prefixlen, bits = _jobNetwork(job['network'])
+    pool = BuddyAllocator(job['network'])
+    hosts = [int(count) for count in job['hosts']]
+    results = [None] * len(hosts)
+    for index in sorted(range(len(hosts)), key=hosts.__getitem__, reverse=True):
+        fit = bisect.bisect_right(_negativeHosts[bits], -hosts[index]) - 1     #longest prefix with enough hosts
+        if (fit < prefixlen):
+            continue
+        block = pool.allocate(fit)
+        if block is not None:
+            results[index] = formatNetwork(block, fit, bits)
+    return {'subnets': results, 'free': pool.freeSize}
+
+# {"address", "prefixlen"}: what the IPv6 tab decodes
+def _ipv6Job(job):
+    value, zone = parseIPv6Zone(job['address'])
+    top = value >> 118
+    kind = ('unspecified' if value == 0 else 'loopback' if value == 1 else 'multicast' if value >> 120 == 0xFF
+            else 'link-local' if top == 0x3FA else 'site-local' if top == 0x3FB else 'unique local' if value >> 121 == 0x7E
+            else 'global')
+    result = {'compressed': formatIPv6(value, zone), 'exploded': explodeIPv6(value), 'type': kind,
+              'reverse': reverseName(value, 128, 128)}
+    if 'prefixlen' in job:
+        prefixlen = int(job['prefixlen'])
+        if not (0 <= prefixlen <= 128):
+            raise ValueError('bad IPv6 prefix length {}'.format(prefixlen))
+        result['network'] = formatNetwork(value >> (128-prefixlen) << (128-prefixlen), prefixlen, 128)
+    embedding = findEmbedding(value)
+    if embedding:
+        result['embedding'], v4 = embedding[0], formatAddr(embedding[1])
+        result['ipv4'] = v4
+        if (embedding[0] == 'teredo'):
+            server, flags, port, client = teredoFields(value)
+            result['teredo'] = {'server': formatAddr(server), 'flags': flags, 'port': port, 'client': formatAddr(client)}
+    return result
+
+JOB_KINDS = {
+    'split': _splitJob,
+    'cidr': _cidrJob,
+    'classify': _classifyJob,
+    'convert': _convertJob,
+    'vlsm': _vlsmJob,
+    'ipv6': _ipv6Job,
+}
+
+# run one decoded job, returns its result or raises ValueError
+def runJob(job):
+    if not isinstance(job, dict):
+        raise ValueError('a job must be a JSON object')
+    kind = job.get('job')
+    if not (isinstance(kind, str) and kind in JOB_KINDS):
+        raise ValueError('unknown job {!r}'.format(kind))
+    try:
+        return JOB_KINDS[kind](job)
+    except KeyError as e:
+        raise ValueError('missing {}'.format(e))
+    except (TypeError, AttributeError, ArithmeticError) as e:
+        raise ValueError(str(e))
+
+# {"result": ...} or {"error": ...} for each decoded job
+def runJobs(jobs):
+    records = []
+    for job in jobs:
+        try:
+            records.append({'result': runJob(job)})
+        except ValueError as e:
+            records.append({'error': str(e)})
+    return records
+
+# (output text, jobs, errors) for a batch of (line number, text) pairs
+def _runBatch(lines):
+    out = []
+    errors = 0
+    for number, line in lines:
+        started = time.perf_counter()
+        record = {'line': number}
+        try:
+            job = json.loads(line)
+            if isinstance(job, dict):
+                if 'id' in job:
+                    record['id'] = job['id']
+                record['job'] = job.get('job')
+            record['result'] = runJob(job)
+        except ValueError as e:
+            record['error'] = str(e)
+            errors += 1
+        record['seconds'] = round(time.perf_counter() - started, 6)
+        out.append(json.dumps(record))
+    return '\n'.join(out) + '\n' if out else '', len(out), errors
+
+def _jobBatches(f, batchLines):
+    lines = ((number, line) for number, line in enumerate(f, 1) if line.strip())
+    while True:
+        batch = list(itertools.islice(lines, batchLines))
+        if not batch:
+            return
+        yield batch
+
+# run a JSON-lines job file into a JSON-lines result file, in input order.
+# Batches go to a pool of processes with at most a few per process in flight,
+# so memory stays flat for any number of jobs. Returns (jobs, errors).
+def runJobFile(inPath, outPath, processes=None, batchLines=2000):
+    processes = processes or os.cpu_count() or 1
+    with open(inPath) as f, open(outPath, 'w') as out:
+        batches = _jobBatches(f, batchLines)
+        if (processes == 1):
+            return _writeResults(out, map(_runBatch, batches))
+        with multiprocessing.Pool(processes) as pool:
+            return _writeResults(out, _ordered(pool, _runBatch, batches, 4 * processes))
+
+def _writeResults(out, results):
+    jobs = errors = 0
+    for text, count, failed in results:
+        out.write(text)
+        jobs += count
+        errors += failed
+    return jobs, errors
+
+# pool.imap with a bounded number of tasks in flight
+def _ordered(pool, func, items, window):
+    pending = collections.deque()
+    for item in items:
+        pending.append(pool.apply_async(func, (item,)))
+        if (len(pending) >= window):
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Run a JSON-lines file of calculator jobs ({}).'.format(', '.join(JOB_KINDS)))
+    parser.add_argument('jobs', help='input, one JSON job per line')
+    parser.add_argument('results', help='output, one JSON result per line')
+    parser.add_argument('-p', '--processes', type=int, help='worker processes (default: one per CPU)')
+    parser.add_argument('-b', '--batch', type=int, default=2000, help='jobs per worker batch')
+    args = parser.parse_args()
+    started = time.perf_counter()
+    jobs, errors = runJobFile(args.jobs, args.results, args.processes, args.batch)
+    print ('{} jobs, {} errors, {:.3f} s'.format(jobs, errors, time.perf_counter() - started), file=sys.stderr)
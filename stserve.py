@@ -0,0 +1,201 @@
+#! /usr/bin/python3
+
+# stserve - the stcalc batch job kinds as a resident local JSON service
+#
+#   python3 stserve.py                      http://127.0.0.1:8642/
+#   python3 stserve.py --unix /tmp/st.sock  HTTP over a Unix socket
+#
+#   POST /        one job ({"job": "split", ...}) or a list of them; each
+#                 answer is {"result": ...} or {"error": ...}
+#   GET  /stats   requests, batch sizes and latency percentiles
+#
+# Jobs that arrive together are answered from one runJobs call on the event
+# loop; jobs that enumerate a lot go to a process pool so they never hold
+# up the small ones.
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import signal
+import sys
+import time
+
+import stcalc
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large'}
+
+class JobServer:
+
+    def __init__(self, maxBatch=256, delay=0, heavyRows=4096, processes=None, samples=100000, maxBody=16 << 20):
+        self.maxBatch = maxBatch
+        self.delay = delay              # seconds to wait for a batch to fill, 0 = just yield once
+        self.heavyRows = heavyRows
+        self.maxBody = maxBody
+        self.executor = concurrent.futures.ProcessPoolExecutor(processes)
+        self.queue = asyncio.Queue()
+        self.latencies = collections.deque(maxlen=samples)
+        self.requests = self.jobs = self.batches = self.offloaded = 0
+        self.started = time.perf_counter()
+
+    # splits and VLSM fits big enough to be worth a trip to another process
+    def _heavy(self, job):
+        try:
+            if (job.get('job') == 'split'):
+                return int(job.get('limit', 256)) > self.heavyRows
+            if (job.get('job') == 'vlsm'):
+                return len(job['hosts']) > self.heavyRows // 64
+        except (AttributeError, KeyError, TypeError, ValueError):
+            pass
+        return False
+
+    async def submit(self, job):
+        self.jobs += 1
+        if self._heavy(job):
+            self.offloaded += 1
+            try:
+                records = await asyncio.get_running_loop().run_in_executor(self.executor, stcalc.runJobs, [job])
+            except Exception as e:
+                return {'error': 'internal error: {!r}'.format(e)}
+            return records[0]
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((job, future))
+        return await future
+
+    # take whatever is queued (up to maxBatch) and answer it in one call
+    async def batcher(self):
+        while True:
+            batch = [await self.queue.get()]
+            await asyncio.sleep(self.delay)
+            while (len(batch) < self.maxBatch and not self.queue.empty()):
+                batch.append(self.queue.get_nowait())
+            self.batches += 1
+            try:
+                records = stcalc.runJobs([job for job, future in batch])
+            except Exception:           #a bug in a job kind must not stop the batcher or fail the others
+                records = list(map(self._runOne, (job for job, future in batch)))
+            for (job, future), record in zip(batch, records):
+                if not future.done():
+                    future.set_result(record)
+
+    def _runOne(self, job):
+        try:
+            return stcalc.runJobs([job])[0]
+        except Exception as e:
+            return {'error': 'internal error: {!r}'.format(e)}
+
+    async def _handle(self, method, path, body):
+        if (path == '/stats'):
+            return (200, self.stats()) if method == 'GET' else (405, {'error': 'use GET'})
+        if (path != '/'):
+            return 404, {'error': 'no such path {}'.format(path)}
+        if (method != 'POST'):
+            return 405, {'error': 'use POST'}
+        try:
+            jobs = json.loads(body)
+        except ValueError as e:
+            return 400, {'error': str(e)}
+        if isinstance(jobs, list):
+            return 200, list(await asyncio.gather(*map(self.submit, jobs)))
+        record = await self.submit(jobs)
+        return (400 if 'error' in record else 200), record
+
+    # HTTP/1.1 with keep-alive, just enough for local clients
+    async def connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                started = time.perf_counter()
+                lines = head.decode('latin-1').split('\r\n')
+                headers = dict((name.strip().lower(), value.strip()) for name, sep, value in
+                               (line.partition(':') for line in lines[1:] if line))
+                try:
+                    method, path, version = lines[0].split(' ', 2)
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    status, payload, version, length = 400, {'error': 'bad request line or headers'}, 'HTTP/1.0', 0
+                else:
+                    if (length < 0):
+                        status, payload, version, length = 400, {'error': 'bad Content-Length'}, 'HTTP/1.0', 0
+                    elif (length > self.maxBody):
+                        status, payload, version, length = 413, {'error': 'body over {} bytes'.format(self.maxBody)}, 'HTTP/1.0', 0
+                    else:
+                        body = await reader.readexactly(length)
+                        status, payload = await self._handle(method, path.partition('?')[0], body)
+
+                data = json.dumps(payload).encode()
+                keepAlive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: {}\r\n\r\n'.format(
+                    status, REASONS[status], len(data), 'keep-alive' if keepAlive else 'close').encode() + data)
+                await writer.drain()
+                self.requests += 1
+                self.latencies.append(time.perf_counter() - started)
+                if not keepAlive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    # counts plus latency percentiles (ms) over the last samples requests
+    def stats(self):
+        latencies = sorted(self.latencies)
+        def percentile(p):
+            return round(latencies[min(len(latencies)-1, int(len(latencies) * p))] * 1000, 3) if latencies else None
+        return {'requests': self.requests, 'jobs': self.jobs, 'batches': self.batches, 'offloaded': self.offloaded,
+                'meanBatch': round((self.jobs - self.offloaded) / self.batches, 1) if self.batches else None,
+                'uptime': round(time.perf_counter() - self.started, 1),
+                'p50': percentile(0.5), 'p90': percentile(0.9), 'p99': percentile(0.99), 'max': percentile(1)}
+
+async def report(server, every):
+    while True:
+        await asyncio.sleep(every)
+        print (json.dumps(server.stats()), file=sys.stderr, flush=True)
+
+async def serve(args):
+    server = JobServer(args.batch, args.delay / 1000, args.heavy_rows, args.processes)
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:     #Windows
+        pass
+    tasks = [asyncio.create_task(server.batcher())]
+    if args.report:
+        tasks.append(asyncio.create_task(report(server, args.report)))
+    if args.unix:
+        listener = await asyncio.start_unix_server(server.connection, args.unix)
+        where = args.unix
+    else:
+        listener = await asyncio.start_server(server.connection, args.host, args.port, backlog=1024)
+        where = 'http://{}:{}/'.format(args.host, listener.sockets[0].getsockname()[1])
+    print ('serving {} on {}'.format(', '.join(stcalc.JOB_KINDS), where), file=sys.stderr, flush=True)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+        server.executor.shutdown(cancel_futures=True)
+        if (args.unix and os.path.exists(args.unix)):
+            os.remove(args.unix)
+        print (json.dumps(server.stats()), file=sys.stderr)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the stcalc job kinds as local JSON over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8642, help='0 picks a free port')
+    parser.add_argument('--unix', help='listen on this Unix socket path instead')
+    parser.add_argument('--batch', type=int, default=256, help='most jobs answered per batch')
+    parser.add_argument('--delay', type=float, default=0, help='ms to let a batch fill')
+    parser.add_argument('--heavy-rows', type=int, default=4096, help='split rows that go to the process pool')
+    parser.add_argument('--processes', type=int, help='process pool size (default: one per CPU)')
+    parser.add_argument('--report', type=float, help='print stats to stderr every so many seconds')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass